@@ -0,0 +1,2 @@
+from makeelf.compare import diff
+from makeelf.link import merge
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+## \file __main__.py
+#  \brief Entry point for python -m makeelf
+import sys
+from makeelf.cli import main
+
+sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+## \file archive.py
+#  \brief Reading of static libraries, i.e. ar archives
+#  \details Archive is mapped into memory and members are views of that
+#  mapping, so nothing is copied. Members are parsed as ELF only when used and
+#  global symbol index is used to find member defining a symbol without
+#  parsing any member. GNU and BSD long names are supported
+import io
+import mmap
+import struct
+from makeelf.elf import ELF
+
+## Signature of ar archive
+MAGIC = b'!<arch>\n'
+
+## Signature of thin archive, which does not contain its members
+THIN_MAGIC = b'!<thin>\n'
+
+## Size of member header
+HEADER_SIZE = 60
+
+## Terminator of member header
+FMAG = b'`\n'
+
+
+class Member:
+    """Single file stored in archive
+
+    data is zero-copy view of member content, elf is member parsed as ELF on
+    first access"""
+
+    def __init__(self, name, offset, data, date=0, uid=0, gid=0, mode=0):
+        self.name = name
+        self.offset = offset
+        self.data = data
+        self.date = date
+        self.uid = uid
+        self.gid = gid
+        self.mode = mode
+        self._elf = None
+
+    def __repr__(self):
+        return '%s(%r, %d, %d bytes)' % (type(self).__name__, self.name,
+                self.offset, len(self.data))
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def elf(self):
+        """Member parsed as ELF object, sections are views of archive"""
+        if self._elf is None:
+            self._elf, _ = ELF.from_bytes(self.data)
+        return self._elf
+
+
+def _number(field, base=10):
+    field = bytes(field).strip()
+    return int(field, base) if len(field) > 0 else 0
+
+
+def _symbol_index(data, wordsize):
+    """Parses GNU symbol index, returns dict of symbol name to offset of
+    member header"""
+    fmt = '>Q' if wordsize == 8 else '>I'
+    count, = struct.unpack_from(fmt, data, 0)
+    offsets = struct.unpack_from('>%d%s' % (count, fmt[1]), data, wordsize)
+    names = bytes(data[wordsize * (count + 1):]).split(b'\0')
+    ret = {}
+    for name, offset in zip(names, offsets):
+        # first member wins, the same as for linker
+        ret.setdefault(name.decode('utf-8', 'replace'), offset)
+    return ret
+
+
+class Archive:
+    """Static library mapped into memory
+
+    Usable as context manager. Members are found by scanning member headers
+    once, when first needed"""
+
+    def __init__(self, path):
+        with io.open(path, 'rb') as fp:
+            try:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file cannot be mapped
+                self._mmap = b''
+        self._view = memoryview(self._mmap)
+        if self._view[:len(THIN_MAGIC)] == THIN_MAGIC:
+            raise Exception('Thin archives are not supported')
+        if self._view[:len(MAGIC)] != MAGIC:
+            raise Exception('%s is not an ar archive' % path)
+
+        self.path = path
+        ## Dictionary of symbol name to offset of member defining it
+        self.symbols = {}
+        self._long_names = b''
+        self._members = None
+        self._by_offset = {}
+
+        # special members are at the beginning of archive
+        offset = len(MAGIC)
+        while offset + HEADER_SIZE <= len(self._view):
+            raw_name, start, size = self._header(offset)
+            if raw_name == b'/':
+                self.symbols = _symbol_index(self._view[start:start + size], 4)
+            elif raw_name == b'/SYM64/':
+                self.symbols = _symbol_index(self._view[start:start + size], 8)
+            elif raw_name == b'//':
+                self._long_names = bytes(self._view[start:start + size])
+            else:
+                break
+            offset = start + size + size % 2
+        self._first = offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Releases mapping of archive
+
+        Mapping is kept as long as any member data or parsed member is in use"""
+        self._view.release()
+        if isinstance(self._mmap, mmap.mmap):
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+
+    def _header(self, offset):
+        """Returns raw name, offset of content and size of member at offset"""
+        hdr = self._view[offset:offset + HEADER_SIZE]
+        if len(hdr) < HEADER_SIZE or hdr[58:60] != FMAG:
+            raise Exception('Malformed member header at offset %d' % offset)
+        return bytes(hdr[:16]).rstrip(b' '), offset + HEADER_SIZE, \
+                _number(hdr[48:58])
+
+    def member_at(self, offset):
+        """Returns Member, whose header starts at offset"""
+        member = self._by_offset.get(offset)
+        if member is not None:
+            return member
+
+        raw_name, start, size = self._header(offset)
+        hdr = self._view[offset:offset + HEADER_SIZE]
+        data = self._view[start:start + size]
+        if raw_name.startswith(b'#1/'):
+            # BSD name, stored at the beginning of content
+            name_len = _number(raw_name[3:])
+            name = bytes(data[:name_len]).rstrip(b'\0')
+            data = data[name_len:]
+        elif raw_name.startswith(b'/') and raw_name[1:].isdigit():
+            # GNU long name, terminated by '/\n'
+            off = int(raw_name[1:])
+            end = self._long_names.find(b'/\n', off)
+            name = self._long_names[off:end if end != -1 else None]
+        else:
+            name = raw_name[:-1] if raw_name.endswith(b'/') else raw_name
+
+        member = Member(name.decode('utf-8', 'replace'), offset, data,
+                _number(hdr[16:28]), _number(hdr[28:34]), _number(hdr[34:40]),
+                _number(hdr[40:48], 8))
+        self._by_offset[offset] = member
+        return member
+
+    @property
+    def members(self):
+        """List of all members, in archive order"""
+        if self._members is None:
+            self._members = []
+            offset = self._first
+            while offset + HEADER_SIZE <= len(self._view):
+                member = self.member_at(offset)
+                _, start, size = self._header(offset)
+                if not member.name.startswith('__.SYMDEF'):
+                    self._members.append(member)
+                offset = start + size + size % 2
+        return self._members
+
+    def __len__(self):
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __getitem__(self, key):
+        """Returns member by index or by name"""
+        if isinstance(key, str):
+            for member in self.members:
+                if member.name == key:
+                    return member
+            raise KeyError(key)
+        return self.members[key]
+
+    def find(self, symbol):
+        """Returns Member defining symbol, or None
+
+        Only global symbol index is consulted, members are not parsed"""
+        offset = self.symbols.get(symbol)
+        if offset is None:
+            return None
+        return self.member_at(offset)
+
+
+def open(path):
+    """Opens ar archive, returns Archive object"""
+    return Archive(path)
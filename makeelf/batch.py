@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+## \file batch.py
+#  \brief Parallel analysis of many ELF files
+#  \details Files are parsed in worker processes and only compact summaries,
+#  made of plain tuples, are sent back to the caller
+import os
+import struct
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, \
+        FIRST_COMPLETED
+from makeelf.elf import *
+
+## Fields that can be requested from \link analyze \endlink
+FIELDS = ('header', 'sections', 'build_id', 'symbols')
+
+## \class Summary
+#  \brief Summary of single file
+#  \details header is tuple of (bits, little, e_type, e_machine, e_entry,
+#  e_phnum, e_shnum), sections is tuple of (name, sh_type, sh_flags, sh_addr,
+#  sh_offset, sh_size) tuples, build_id is hex string and symbols is tuple of
+#  entry counts in .symtab and .dynsym. Fields that were not requested are
+#  None. If file could not be parsed, error contains the reason.
+Summary = namedtuple('Summary', ['path', 'error', 'header', 'sections',
+    'build_id', 'symbols'])
+
+## Type of GNU build-id note
+NT_GNU_BUILD_ID = 3
+
+
+def _build_id(note, little):
+    """Finds build-id in body of SHT_NOTE section"""
+    endian = '<' if little else '>'
+    off = 0
+    while off + 12 <= len(note):
+        namesz, descsz, n_type = struct.unpack_from(endian + 'III', note, off)
+        off += 12
+        name = note[off:off + namesz]
+        off += (namesz + 3) & ~3
+        desc = note[off:off + descsz]
+        off += (descsz + 3) & ~3
+        if n_type == NT_GNU_BUILD_ID and name == b'GNU\0':
+            return desc.hex()
+    return None
+
+
+def load(path):
+    """Returns ELF object of file, with section contents read on first use
+
+    Raises if file is not an ELF file"""
+    elf, _ = ELF.from_file(path, load_sections=False)
+    if elf.Elf.Ehdr.e_ident.EI_MAG != b'\x7fELF':
+        raise Exception('Not an ELF file')
+    return elf
+
+
+def summarize(path, fields=FIELDS):
+    """Returns Summary of single file
+
+    Only headers and sections, that are needed to compute requested fields
+    are read from the file"""
+    elf = load(path)
+    Ehdr = elf.Elf.Ehdr
+    Shdr_a = elf.Elf.Shdr_table
+    little = elf.little
+
+    header = sections = build_id = symbols = None
+    if 'header' in fields:
+        header = (elf.Elf.bits, little, int(Ehdr.e_type), int(Ehdr.e_machine),
+                Ehdr.e_entry, Ehdr.e_phnum, Ehdr.e_shnum)
+
+    if 'sections' in fields:
+        sections = tuple((name, int(s.sh_type), s.sh_flags, s.sh_addr,
+            s.sh_offset, s.sh_size) for name, s in
+            zip(elf.get_section_names(), Shdr_a))
+
+    if 'build_id' in fields:
+        for i, s in enumerate(Shdr_a):
+            if s.sh_type == SHT.SHT_NOTE:
+                build_id = _build_id(bytes(elf.Elf.sections[i]), little)
+                if build_id is not None:
+                    break
+
+    if 'symbols' in fields:
+        Sym_len = len(elf._Sym_class()())
+        counts = {SHT.SHT_SYMTAB: 0, SHT.SHT_DYNSYM: 0}
+        for s in Shdr_a:
+            if s.sh_type in counts:
+                counts[s.sh_type] += s.sh_size // (s.sh_entsize or Sym_len)
+        symbols = (counts[SHT.SHT_SYMTAB], counts[SHT.SHT_DYNSYM])
+
+    return Summary(path, None, header, sections, build_id, symbols)
+
+
+def _summarize_safe(path, fields):
+    try:
+        return summarize(path, fields)
+    except Exception as e:
+        return Summary(path, '%s: %s' % (type(e).__name__, e), None, None,
+                None, None)
+
+
+def _summarize_chunk(paths, fields):
+    return [_summarize_safe(path, fields) for path in paths]
+
+
+def analyze(paths, fields=FIELDS, workers=None, chunksize=64):
+    """Analyzes many ELF files in parallel
+
+    Yields Summary for every path, in order of completion.
+    Files that could not be parsed are reported with error field set, instead
+    of breaking the whole scan. If workers is 0, files are parsed in current
+    process."""
+    fields = tuple(fields)
+    for field in fields:
+        if field not in FIELDS:
+            raise Exception('Unknown field %s, expected one of %s' % (field,
+                ', '.join(FIELDS)))
+
+    if workers == 0:
+        for path in paths:
+            yield _summarize_safe(path, fields)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        chunk = []
+        limit = 4 * (workers or os.cpu_count() or 1)
+        for path in paths:
+            chunk.append(path)
+            if len(chunk) < chunksize:
+                continue
+            pending.add(executor.submit(_summarize_chunk, chunk, fields))
+            chunk = []
+            # do not let the queue of submitted chunks grow without bounds
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        if len(chunk) > 0:
+            pending.add(executor.submit(_summarize_chunk, chunk, fields))
+        for future in as_completed(pending):
+            yield from future.result()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+## \file bench/__init__.py
+#  \brief Benchmarks of parsing, serialization and editing
+#  \details Every benchmark is timed several times and then run once more with
+#  tracemalloc enabled, to find peak memory usage without distorting timings.
+#  Results can be saved as JSON and compared between versions of the library
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+import makeelf.synth
+from makeelf.elf import *
+
+## \class Result
+#  \brief Outcome of single benchmark
+#  \details params is dict of benchmark parameters, times is list of
+#  durations of every run in seconds, best and mean are derived from it and
+#  peak is peak memory allocated during single run, in bytes
+Result = namedtuple('Result', ['name', 'params', 'times', 'best', 'mean',
+    'peak'])
+
+## Default numbers of sections in benchmarked files
+SECTIONS = (10, 100, 1000)
+
+## Default numbers of symbols in benchmarked files
+SYMBOLS = (100, 1000, 10000)
+
+## Size of content of each appended section, in bytes
+SECTION_SIZE = 256
+
+
+def _from_bytes(sections, symbols):
+    b = bytes(makeelf.synth.generate(sections, symbols))
+    return lambda: Elf32.from_bytes(b)
+
+
+def _serialize(sections, symbols):
+    elf = makeelf.synth.generate(sections, symbols)
+    return lambda: bytes(elf)
+
+
+def _append_section(sections, symbols):
+    data = bytes(SECTION_SIZE)
+    def run():
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        for i in range(sections):
+            elf.append_section('.s%d' % i, data, 0)
+    return run
+
+
+def _append_symbol(sections, symbols):
+    def run():
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        sec_id = elf.append_section('.text', bytes(SECTION_SIZE), 0)
+        for i in range(symbols):
+            elf.append_symbol('sym%d' % i, sec_id, 0, 1)
+    return run
+
+
+def _get_section_by_name(sections, symbols):
+    elf = makeelf.synth.generate(sections)
+    # last section is the slowest to find
+    names = ['.sect%d' % i for i in range(sections - 1, -1, -1)][:100]
+    def run():
+        for name in names:
+            elf.get_section_by_name(name)
+    return run
+
+
+def _codec(sections, symbols):
+    sym = Elf32_Sym(1, 2, 3, 4, 5, 6, little=True)
+    b = bytes(sym) * symbols
+    def run():
+        table = Elf32_Sym.table_from_bytes(b, 0, symbols, True)
+        b''.join(bytes(s) for s in table)
+    return run
+
+
+## Benchmarks: setup function taking number of sections and symbols and
+#  returning function to be timed, and names of parameters it depends on
+BENCHMARKS = {
+        'from_bytes': (_from_bytes, ('sections', 'symbols')),
+        'serialize': (_serialize, ('sections', 'symbols')),
+        'append_section': (_append_section, ('sections',)),
+        'append_symbol': (_append_symbol, ('symbols',)),
+        'get_section_by_name': (_get_section_by_name, ('sections',)),
+        'codec': (_codec, ('symbols',)),
+        }
+
+
+def measure(func, repeat=5):
+    """Times func repeat times and measures its peak memory usage
+
+    Returns tuple of list of durations and peak memory in bytes"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run(names=None, sections=SECTIONS, symbols=SYMBOLS, repeat=5):
+    """Runs benchmarks over all combinations of parameters
+
+    Yields Result of every benchmark. Each benchmark is run only for values of
+    parameters it depends on"""
+    for name in names or sorted(BENCHMARKS):
+        setup, depends = BENCHMARKS[name]
+        grid = [{}]
+        for param, values in (('sections', sections), ('symbols', symbols)):
+            if param in depends:
+                grid = [dict(p, **{param: v}) for p in grid for v in values]
+        for params in grid:
+            func = setup(params.get('sections', 1), params.get('symbols', 1))
+            times, peak = measure(func, repeat)
+            yield Result(name, params, times, min(times),
+                    sum(times) / len(times), peak)
+
+
+def save(results, fp):
+    """Writes results as JSON to file object fp"""
+    json.dump({
+        'python': sys.version,
+        'platform': platform.platform(),
+        'results': [r._asdict() for r in results],
+        }, fp, indent=1)
+
+
+def load(fp):
+    """Reads results written by \\link save \\endlink"""
+    return [Result(**r) for r in json.load(fp)['results']]
+
+
+def compare(old, new):
+    """Compares two lists of results
+
+    Returns list of (name, params, old best, new best, ratio) tuples of
+    benchmarks present in both lists, ratio above 1 means new is slower"""
+    key = lambda r: (r.name, tuple(sorted(r.params.items())))
+    old = {key(r): r for r in old}
+    ret = []
+    for r in new:
+        o = old.get(key(r))
+        if o is not None:
+            ret.append((r.name, r.params, o.best, r.best,
+                r.best / o.best if o.best else float('inf')))
+    return ret
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+## \file bench/__main__.py
+#  \brief Entry point of benchmark suite, run with python3 -m makeelf.bench
+import argparse
+import sys
+from makeelf.bench import *
+
+
+def _ints(s):
+    return tuple(int(v) for v in s.split(','))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m makeelf.bench',
+            description='Benchmark parsing, serialization and editing')
+    parser.add_argument('names', nargs='*', metavar='benchmark',
+            help='benchmarks to run, one of: %s' % ', '.join(sorted(
+                BENCHMARKS)))
+    parser.add_argument('--sections', type=_ints, default=SECTIONS,
+            help='comma separated numbers of sections')
+    parser.add_argument('--symbols', type=_ints, default=SYMBOLS,
+            help='comma separated numbers of symbols')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--output', help='save results as JSON')
+    parser.add_argument('--compare', metavar='JSON',
+            help='compare with results saved earlier')
+    args = parser.parse_args(argv)
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark %s' % name)
+
+    results = []
+    for r in run(args.names, args.sections, args.symbols, args.repeat):
+        params = ' '.join('%s=%d' % p for p in sorted(r.params.items()))
+        print('%-20s %-28s best %10.6fs mean %10.6fs peak %10d B' % (r.name,
+            params, r.best, r.mean, r.peak))
+        results.append(r)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            save(results, fp)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            old = load(fp)
+        for name, params, old_best, new_best, ratio in compare(old, results):
+            params = ' '.join('%s=%d' % p for p in sorted(params.items()))
+            print('%-20s %-28s %10.6fs -> %10.6fs x%.2f' % (name, params,
+                old_best, new_best, ratio))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
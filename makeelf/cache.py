@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+## \file cache.py
+#  \brief Persistent cache of parsed ELF files
+#  \details Snapshot of a file holds its raw header tables, digests of all
+#  sections and columns of symbol tables, in a compact binary format. It is
+#  stored under a key derived from identity of the file, i.e. its path, size,
+#  modification time and inode, or from hash of its content. Loaded object
+#  reads section contents from the file only when they are used. Snapshots are
+#  written to temporary files and atomically renamed, so several processes can
+#  share one cache directory. Least recently used snapshots are evicted when
+#  cache exceeds its size limit
+import array
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+## Signature and format version of snapshot files
+MAGIC = b'MKELFC\x01\n'
+
+## Extension of snapshot files
+SUFFIX = '.snap'
+
+## Default limit of total size of cache directory
+MAX_SIZE = 256 << 20
+
+## Digest algorithm of section contents stored in snapshots
+ALGORITHM = 'sha256'
+
+
+def _blob(b):
+    return struct.pack('<I', len(b)) + b
+
+
+class _Reader:
+    """Sequential reader of snapshot fields"""
+
+    def __init__(self, b):
+        self.b = b
+        self.off = 0
+
+    def unpack(self, fmt):
+        ret = struct.unpack_from(fmt, self.b, self.off)
+        self.off += struct.calcsize(fmt)
+        return ret
+
+    def blob(self):
+        size, = self.unpack('<I')
+        ret = self.b[self.off:self.off + size]
+        if len(ret) != size:
+            raise Exception('Truncated snapshot')
+        self.off += size
+        return ret
+
+
+def snapshot(elf):
+    """Serializes headers, digests and symbol columns of ELF to bytes
+
+    Digests are computed for every section, so each section is read once"""
+    import makeelf.digest
+    from makeelf.elf import SHT
+
+    Elf = elf.Elf
+    parts = [MAGIC, struct.pack('<B?', Elf.bits, sys.byteorder == 'little')]
+    parts.append(_blob(bytes(Elf.Ehdr)))
+    parts.append(_blob(b''.join(bytes(Phdr) for Phdr in Elf.Phdr_table)))
+    parts.append(_blob(b''.join(bytes(Shdr) for Shdr in Elf.Shdr_table)))
+
+    digests = makeelf.digest.section_digests(Elf, ALGORITHM)
+    parts.append(_blob(b''.join(bytes.fromhex(d) for d in digests)))
+
+    tables = [i for i, Shdr in enumerate(Elf.Shdr_table) if Shdr.sh_type in
+            [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]]
+    parts.append(struct.pack('<I', len(tables)))
+    for idx in tables:
+        columns = elf.table_columns(idx, workers=0)
+        parts.append(struct.pack('<IB', idx, len(columns)))
+        for name, col in columns.items():
+            parts.append(struct.pack('<B', len(name)) + name.encode() +
+                    col.typecode.encode() + _blob(col.tobytes()))
+
+    b = b''.join(parts)
+    return b + struct.pack('<I', zlib.crc32(b))
+
+
+def restore(b, filename, file=None):
+    """Builds ELF object from snapshot, with sections read from filename
+
+    file is _SharedFile, sections are read from, opened by name if None"""
+    from makeelf.elf import ELF, SHT, _FileSection, _SharedFile, _elf_class
+
+    if b[:len(MAGIC)] != MAGIC or len(b) < len(MAGIC) + 4 or \
+            struct.unpack_from('<I', b, len(b) - 4)[0] != \
+            zlib.crc32(b[:-4]):
+        raise Exception('Corrupted snapshot')
+    r = _Reader(b[:-4])
+    r.off = len(MAGIC)
+    bits, native_little = r.unpack('<B?')
+    if native_little != (sys.byteorder == 'little'):
+        raise Exception('Snapshot made on machine of other byte order')
+
+    Ehdr_b = r.blob()
+    cls = _elf_class(Ehdr_b)
+    Ehdr, _ = cls.Ehdr_class.from_bytes(Ehdr_b)
+    little = Ehdr.little
+    Phdr_b = r.blob()
+    Phdr_table = cls.Phdr_class.table_from_bytes(Phdr_b, 0, len(Phdr_b) //
+            len(cls.Phdr_class()), little)
+    Shdr_b = r.blob()
+    Shdr_table = cls.Shdr_class.table_from_bytes(Shdr_b, 0, len(Shdr_b) //
+            len(cls.Shdr_class()), little)
+    if file is None:
+        file = _SharedFile(filename)
+    sections = [b'' if Shdr.sh_type == SHT.SHT_NOBITS else
+            _FileSection(filename, Shdr.sh_offset, Shdr.sh_size, file) for
+            Shdr in Shdr_table]
+
+    ret = ELF(None, None, None, None)
+    ret.Elf = cls(Ehdr, Phdr_table, Shdr_table, sections, little=little)
+    ret.little = little
+
+    # content of lazily read section never changes, so the section itself is
+    # key of cached values
+    digests = r.blob()
+    size = hashlib.new(ALGORITHM).digest_size
+    for i, section in enumerate(sections):
+        digest = digests[i * size:(i + 1) * size]
+        if len(digest) == size:
+            ret.Elf._digests[(i, ALGORITHM)] = (section, digest.hex())
+
+    count, = r.unpack('<I')
+    for _ in range(count):
+        idx, nfields = r.unpack('<IB')
+        columns = {}
+        for _ in range(nfields):
+            name_len, = r.unpack('<B')
+            name = r.b[r.off:r.off + name_len].decode()
+            r.off += name_len
+            typecode = r.b[r.off:r.off + 1].decode()
+            r.off += 1
+            col = array.array(typecode)
+            col.frombytes(r.blob())
+            columns[name] = col
+        ret.Elf._columns[idx] = (sections[idx], columns)
+
+    ret._wrap_compressed()
+    return ret
+
+
+class Cache:
+    """Directory of snapshots, bounded in size
+
+    If by_content is True, snapshots are keyed by hash of file content, which
+    survives copying and touching files, but requires reading whole file on
+    every open. Otherwise path, size, modification time and inode are used"""
+
+    def __init__(self, directory, max_size=MAX_SIZE, by_content=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.by_content = by_content
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, filename, fd=None):
+        """Returns name of snapshot of file, as hex string
+
+        If fd is given, it is descriptor of file opened for reading, which is
+        used instead of file currently named filename"""
+        h = hashlib.sha256()
+        if self.by_content:
+            fp = os.open(filename, os.O_RDONLY) if fd is None else fd
+            try:
+                offset = 0
+                while True:
+                    chunk = os.pread(fp, 1 << 20, offset)
+                    if len(chunk) == 0:
+                        break
+                    h.update(chunk)
+                    offset += len(chunk)
+            finally:
+                if fd is None:
+                    os.close(fp)
+        else:
+            st = os.stat(filename) if fd is None else os.fstat(fd)
+            h.update(repr((os.path.realpath(filename), st.st_size,
+                st.st_mtime_ns, st.st_ino, st.st_dev)).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """Returns snapshot stored under key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fp:
+                b = fp.read()
+            # modification time orders snapshots for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return b
+
+    def put(self, key, b):
+        """Stores snapshot atomically and evicts old ones, if needed"""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(b)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def discard(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Removes least recently used snapshots, until cache fits in limit"""
+        with open(os.path.join(self.directory, 'lock'), 'wb') as lock:
+            # evicting processes wait for each other, readers never wait
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_size:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def load(self, filename):
+        """Returns ELF object of file, from snapshot if there is one
+
+        Otherwise file is parsed and its snapshot is stored"""
+        from makeelf.elf import ELF, _SharedFile
+
+        # snapshot and sections refer to the same open file
+        file = _SharedFile(filename)
+        key = self.key(filename, file.fd)
+        b = self.get(key)
+        if b is not None:
+            try:
+                return restore(b, filename, file)
+            except Exception:
+                # unusable snapshot is replaced below
+                self.discard(key)
+
+        elf = ELF._from_fd(file.fd, filename)
+        self.put(key, snapshot(elf))
+        return elf
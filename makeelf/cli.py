@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+## \file cli.py
+#  \brief readelf-like command line interface
+#  \details Files are loaded without section contents, so every subcommand
+#  reads only those sections it displays
+import argparse
+import json
+import os
+import sys
+from makeelf.elf import *
+from makeelf.batch import load
+from makeelf.digest import section_bytes
+
+
+def _string(strtab, off):
+    end = strtab.find(b'\0', off)
+    if end == -1:
+        end = len(strtab)
+    return strtab[off:end].decode('utf-8', 'replace')
+
+
+def _enum_name(enum, value):
+    try:
+        return enum(int(value)).name
+    except ValueError:
+        return hex(int(value))
+
+
+def _headers(elf):
+    Ehdr = elf.Elf.Ehdr
+    return {
+            'class': 'ELF%d' % elf.Elf.bits,
+            'data': 'little' if elf.little else 'big',
+            'osabi': _enum_name(ELFOSABI, Ehdr.e_ident.EI_OSABI),
+            'type': _enum_name(ET, Ehdr.e_type),
+            'machine': _enum_name(EM, Ehdr.e_machine),
+            'version': Ehdr.e_version,
+            'entry': Ehdr.e_entry,
+            'phoff': Ehdr.e_phoff,
+            'shoff': Ehdr.e_shoff,
+            'flags': Ehdr.e_flags,
+            'ehsize': Ehdr.e_ehsize,
+            'phentsize': Ehdr.e_phentsize,
+            'phnum': Ehdr.e_phnum,
+            'shentsize': Ehdr.e_shentsize,
+            'shnum': Ehdr.e_shnum,
+            'shstrndx': Ehdr.e_shstrndx,
+            }
+
+
+def _sections(elf):
+    names = elf.get_section_names()
+    return [{
+        'index': i,
+        'name': names[i],
+        'type': _enum_name(SHT, Shdr.sh_type),
+        'flags': Shdr.sh_flags,
+        'addr': Shdr.sh_addr,
+        'offset': Shdr.sh_offset,
+        'size': Shdr.sh_size,
+        'link': Shdr.sh_link,
+        'info': Shdr.sh_info,
+        'addralign': Shdr.sh_addralign,
+        'entsize': Shdr.sh_entsize,
+        } for i, Shdr in enumerate(elf.Elf.Shdr_table)]
+
+
+def _segments(elf):
+    return [{
+        'index': i,
+        'type': _enum_name(PT, Phdr.p_type),
+        'offset': Phdr.p_offset,
+        'vaddr': Phdr.p_vaddr,
+        'paddr': Phdr.p_paddr,
+        'filesz': Phdr.p_filesz,
+        'memsz': Phdr.p_memsz,
+        'flags': Phdr.p_flags,
+        'align': Phdr.p_align,
+        } for i, Phdr in enumerate(elf.Elf.Phdr_table)]
+
+
+def _symbols(elf):
+    Sym = elf._Sym_class()
+    Shdr_table = elf.Elf.Shdr_table
+    names = elf.get_section_names()
+    ret = []
+    for i, Shdr in enumerate(Shdr_table):
+        if Shdr.sh_type not in [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]:
+            continue
+        strtab = b''
+        if Shdr.sh_link < len(Shdr_table):
+            strtab = section_bytes(elf.Elf, Shdr.sh_link)
+        b = section_bytes(elf.Elf, i)
+        entsize = Shdr.sh_entsize or len(Sym())
+        for j, sym in enumerate(Sym.table_from_bytes(b, 0,
+                len(b) // entsize, elf.little, entsize)):
+            ret.append({
+                'table': names[i],
+                'index': j,
+                'name': _string(strtab, sym.st_name),
+                'value': sym.st_value,
+                'size': sym.st_size,
+                'type': _enum_name(STT, sym.st_info & 0xf),
+                'bind': _enum_name(STB, sym.st_info >> 4),
+                'visibility': _enum_name(STV, sym.st_other & 0x3),
+                'shndx': sym.st_shndx,
+                })
+    return ret
+
+
+## Tags, whose value is an offset into dynamic string table
+_DT_STRINGS = [DT.DT_NEEDED, DT.DT_SONAME, DT.DT_RPATH, DT.DT_RUNPATH]
+
+
+def _dynamic(elf):
+    Dyn = Elf64_Dyn if elf.Elf.bits == 64 else Elf32_Dyn
+    Shdr_table = elf.Elf.Shdr_table
+    ret = []
+    for i, Shdr in enumerate(Shdr_table):
+        if Shdr.sh_type != SHT.SHT_DYNAMIC:
+            continue
+        strtab = b''
+        if Shdr.sh_link < len(Shdr_table):
+            strtab = section_bytes(elf.Elf, Shdr.sh_link)
+        b = section_bytes(elf.Elf, i)
+        entsize = Shdr.sh_entsize or len(Dyn(d_val=0))
+        for dyn in Dyn.table_from_bytes(b, 0, len(b) // entsize,
+                elf.little, entsize):
+            entry = {'tag': _enum_name(DT, dyn.d_tag), 'value': dyn.d_val}
+            if dyn.d_tag in _DT_STRINGS:
+                entry['string'] = _string(strtab, dyn.d_val)
+            ret.append(entry)
+            if dyn.d_tag == DT.DT_NULL:
+                break
+    return ret
+
+
+def _print_headers(result):
+    for key, value in result.items():
+        if isinstance(value, int):
+            value = hex(value)
+        print('  %-12s %s' % (key + ':', value))
+
+
+## Columns printed as decimal numbers in text output
+_DECIMAL = ['index', 'link', 'info', 'shndx']
+
+
+def _print_table(rows, columns):
+    print(('  ' + ' '.join('%-*s' % (width, name) for name, width in
+        columns)).rstrip())
+    for row in rows:
+        cells = []
+        for name, width in columns:
+            value = row.get(name, '')
+            if isinstance(value, int) and name not in _DECIMAL:
+                value = hex(value)
+            cells.append('%-*s' % (width, value))
+        print('  ' + ' '.join(cells).rstrip())
+
+
+## Subcommands: function extracting data and columns of text output
+COMMANDS = {
+        'headers': (_headers, None),
+        'sections': (_sections, [('index', 4), ('name', 20), ('type', 14),
+            ('addr', 18), ('offset', 10), ('size', 10), ('flags', 5),
+            ('link', 4), ('info', 4), ('addralign', 9)]),
+        'segments': (_segments, [('index', 4), ('type', 14), ('offset', 10),
+            ('vaddr', 18), ('paddr', 18), ('filesz', 10), ('memsz', 10),
+            ('flags', 5), ('align', 8)]),
+        'symbols': (_symbols, [('table', 8), ('index', 6), ('value', 18),
+            ('size', 8), ('type', 11), ('bind', 10), ('visibility', 11),
+            ('shndx', 6), ('name', 0)]),
+        'dynamic': (_dynamic, [('tag', 18), ('value', 18), ('string', 0)]),
+        }
+
+
+def _paths(args):
+    for path in args.files:
+        yield path
+    if args.stdin:
+        for line in sys.stdin:
+            line = line.rstrip('\n')
+            if line:
+                yield line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='makeelf',
+            description='Display information about ELF files')
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('files', nargs='*', metavar='file')
+    parser.add_argument('--json', action='store_true',
+            help='print one JSON object per file')
+    parser.add_argument('--stdin', action='store_true',
+            help='read additional file names from standard input')
+    args = parser.parse_intermixed_args(argv)
+
+    try:
+        return _run(args)
+    except BrokenPipeError:
+        # reader of our output went away, e.g. head, do not complain
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+
+def _run(args):
+    func, columns = COMMANDS[args.command]
+    status = 0
+    for path in _paths(args):
+        try:
+            result = func(load(path))
+        except Exception as e:
+            print('makeelf: %s: %s' % (path, e), file=sys.stderr)
+            status = 1
+            continue
+
+        if args.json:
+            print(json.dumps({'file': path, args.command: result}))
+        else:
+            print('File: %s' % path)
+            if columns is None:
+                _print_headers(result)
+            else:
+                _print_table(result, columns)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
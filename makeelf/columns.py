@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+## \file columns.py
+#  \brief Column-oriented decoding of symbol and relocation tables
+#  \details Every field of table is decoded into its own array.array. Aligned
+#  fields are copied with strided memoryview assignment, so no Python object
+#  is created per entry. Huge tables can be split into chunks decoded by
+#  worker processes: table is read from shared memory or from file mapped by
+#  every worker and results are written directly into shared column arrays,
+#  so only names of shared blocks and integers are sent to workers
+import array
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python older than 3.8, tables are decoded in calling process
+    shared_memory = None
+
+## Tables of at least that many entries are decoded in worker processes,
+#  unless number of workers is given explicitly
+PARALLEL_THRESHOLD = 1 << 20
+
+## array.array type codes of struct format characters
+_TYPECODES = {}
+for _fmt in 'bBhHiIqQ':
+    for _code in [_fmt, _fmt.replace('i', 'l').replace('I', 'L')]:
+        if array.array(_code).itemsize == struct.calcsize(_fmt):
+            _TYPECODES[_fmt] = _code
+            break
+
+
+def fields(cls):
+    """Returns list of (name, offset, format character) of record class"""
+    return [(name,) + cls.layout.field(name, cls.bits) for name in
+            cls.layout.names(cls.bits)]
+
+
+def _decode_chunk(src, columns, cls, little, entsize, first, count):
+    """Decodes count records, starting with record number first, from
+    memoryview src into dict of name to memoryview of column"""
+    swap = little != (sys.byteorder == 'little')
+    src = src[first * entsize:(first + count) * entsize]
+    rows = None
+    for name, off, fmt in fields(cls):
+        size = struct.calcsize(fmt)
+        dst = columns[name][first:first + count]
+        if off % size == 0 and entsize % size == 0 and len(src) % size == 0:
+            # strided copy, done entirely in C
+            step = entsize // size
+            dst[:] = src.cast(_TYPECODES[fmt])[off // size::step]
+            if swap and size > 1:
+                tmp = array.array(_TYPECODES[fmt])
+                tmp.frombytes(dst.cast('B'))
+                tmp.byteswap()
+                dst[:] = tmp
+            continue
+        if rows is None:
+            rows = list(cls.layout.codec(cls.bits, little).iter_unpack(src))\
+                    if entsize == cls.layout.size(cls.bits) else \
+                    [cls.layout.codec(cls.bits, little).unpack_from(src, i *
+                        entsize) for i in range(count)]
+        idx = cls.layout.names(cls.bits).index(name)
+        dst[:] = array.array(_TYPECODES[fmt], [row[idx] for row in rows])
+
+
+def _allocate(cls, count):
+    columns = {}
+    for name, _, fmt in fields(cls):
+        columns[name] = array.array(_TYPECODES[fmt], bytes(count *
+            struct.calcsize(fmt)))
+    return columns
+
+
+def decode(b, cls, count=None, little=False, entsize=None, offset=0):
+    """Decodes table of records of class cls from buffer b
+
+    Returns dict of field name to array.array with values of that field"""
+    entsize = entsize or cls.layout.size(cls.bits)
+    view = memoryview(b)[offset:]
+    if count is None:
+        count = len(view) // entsize
+    columns = _allocate(cls, count)
+    if count > 0:
+        _decode_chunk(view.cast('B'), {name: memoryview(col) for name, col in
+            columns.items()}, cls, little, entsize, 0, count)
+    return columns
+
+
+def _worker(source, offset, column_names, cls, little, entsize, first, count):
+    """Decodes single chunk in worker process
+
+    source is tuple of 'shm' and name of shared memory block or of 'file' and
+    path of file"""
+    blocks = []
+    views = []
+    mapping = None
+    try:
+        if source[0] == 'shm':
+            blocks.append(shared_memory.SharedMemory(source[1]))
+            buf = blocks[-1].buf
+        else:
+            with open(source[1], 'rb') as fp:
+                mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            buf = memoryview(mapping)
+        views.append(buf[offset:])
+        columns = {}
+        for name, shm_name in column_names.items():
+            blocks.append(shared_memory.SharedMemory(shm_name))
+            views.append(blocks[-1].buf.cast(_TYPECODES[cls.layout.field(name,
+                cls.bits)[1]]))
+            columns[name] = views[-1]
+        _decode_chunk(views[0], columns, cls, little, entsize, first, count)
+    finally:
+        for view in views:
+            view.release()
+        if mapping is not None:
+            buf.release()
+            mapping.close()
+        for shm in blocks:
+            shm.close()
+    return count
+
+
+def decode_parallel(source, cls, count=None, little=False, entsize=None,
+        offset=0, workers=None, chunk=None):
+    """Decodes table like decode, in worker processes
+
+    source is bytes-like object, copied once to shared memory, or path of
+    file, mapped by every worker, in which case offset is offset of table in
+    file. Table is split into chunks, by default one per worker. Without
+    shared memory support table is decoded by decode instead"""
+    entsize = entsize or cls.layout.size(cls.bits)
+    if shared_memory is None:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as fp:
+                fp.seek(offset)
+                source = fp.read(-1 if count is None else count * entsize)
+            offset = 0
+        return decode(source, cls, count, little, entsize, offset)
+    owned = []
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            if count is None:
+                count = (os.path.getsize(source) - offset) // entsize
+            src = ('file', os.fspath(source))
+        else:
+            view = memoryview(source).cast('B')[offset:]
+            if count is None:
+                count = len(view) // entsize
+            shm = shared_memory.SharedMemory(create=True,
+                    size=max(count * entsize, 1))
+            owned.append(shm)
+            shm.buf[:count * entsize] = view[:count * entsize]
+            src = ('shm', shm.name)
+            offset = 0
+
+        column_names = {}
+        for name, _, fmt in fields(cls):
+            shm = shared_memory.SharedMemory(create=True,
+                    size=max(count * struct.calcsize(fmt), 1))
+            owned.append(shm)
+            column_names[name] = shm.name
+
+        workers = workers or os.cpu_count() or 1
+        chunk = chunk or max(-(-count // workers), 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_worker, src, offset, column_names,
+                cls, little, entsize, first, min(chunk, count - first)) for
+                first in range(0, count, chunk)]
+            for future in futures:
+                future.result()
+
+        # results are moved out of shared memory, so blocks can be freed
+        columns = {}
+        for shm, (name, _, fmt) in zip(owned[-len(column_names):],
+                fields(cls)):
+            col = array.array(_TYPECODES[fmt])
+            col.frombytes(shm.buf[:count * struct.calcsize(fmt)])
+            columns[name] = col
+        return columns
+    finally:
+        for shm in owned:
+            shm.close()
+            shm.unlink()
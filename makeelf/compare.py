@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+## \file compare.py
+#  \brief Structural comparison of two ELF objects
+#  \details Sections are matched by name, segments by type and virtual address
+#  and symbols by name. Contents are compared using digests first, so only
+#  sections that really differ are compared byte by byte
+from collections import namedtuple
+import makeelf.digest
+from makeelf.elf import *
+
+## \class Change
+#  \brief Single difference between two objects
+#  \details kind is one of 'header', 'section', 'segment', 'symbol' or
+#  'content', name identifies changed item, e.g. section name. If item is
+#  present only in one object, field is None and old or new is None. For
+#  'content' changes field is offset of first differing byte and old and new
+#  are content digests
+Change = namedtuple('Change', ['kind', 'name', 'field', 'old', 'new'])
+
+## Fields of headers, that only describe placement in file
+_OFFSETS = ['e_phoff', 'e_shoff', 'sh_offset', 'p_offset']
+
+## Size of blocks compared at once, when searching for first difference
+_BLOCK = 1 << 16
+
+
+def _first_difference(a, b):
+    """Returns offset of first byte that differs between a and b"""
+    a = memoryview(a)
+    b = memoryview(b)
+    size = min(len(a), len(b))
+    for block in range(0, size, _BLOCK):
+        if a[block:block + _BLOCK] != b[block:block + _BLOCK]:
+            for off in range(block, min(block + _BLOCK, size)):
+                if a[off] != b[off]:
+                    return off
+    return size
+
+
+def _match(keys_a, keys_b):
+    """Pairs indexes of equal keys, n-th occurrence with n-th occurrence
+
+    Returns list of (index_a, index_b) tuples, where one of indexes is None
+    if key is present only in one of lists"""
+    positions = {}
+    for i, key in enumerate(keys_b):
+        positions.setdefault(key, []).append(i)
+    ret = []
+    for i, key in enumerate(keys_a):
+        candidates = positions.get(key)
+        if candidates:
+            ret.append((i, candidates.pop(0)))
+        else:
+            ret.append((i, None))
+    for candidates in positions.values():
+        for j in candidates:
+            ret.append((None, j))
+    return ret
+
+
+def _fields(obj, names, offsets):
+    return [(name, getattr(obj, name)) for name in names
+            if offsets or name not in _OFFSETS]
+
+
+def _compare_fields(changes, kind, name, a, b, names, offsets):
+    for (field, old), (_, new) in zip(_fields(a, names, offsets),
+            _fields(b, names, offsets)):
+        if old != new:
+            changes.append(Change(kind, name, field, old, new))
+
+
+def _symbols(elf, names):
+    """Returns list of (key, symbol) tuples of every symbol table
+
+    Key is tuple of table name and symbol name. Section index of symbol is
+    replaced by name of the section, so renumbering is not reported"""
+    Sym = elf._Sym_class()
+    ret = []
+    for i, Shdr in enumerate(elf.Elf.Shdr_table):
+        if Shdr.sh_type not in [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]:
+            continue
+        strtab = b''
+        if Shdr.sh_link < len(elf.Elf.sections):
+            strtab = makeelf.digest.section_bytes(elf.Elf, Shdr.sh_link)
+        b = makeelf.digest.section_bytes(elf.Elf, i)
+        entsize = Shdr.sh_entsize or len(Sym())
+        for sym in Sym.table_from_bytes(b, 0, len(b) // entsize, elf.little,
+                entsize):
+            end = strtab.find(b'\0', sym.st_name)
+            sym_name = strtab[sym.st_name:end if end != -1 else None]
+            shndx = int(sym.st_shndx)
+            if 0 < shndx < len(names):
+                shndx = names[shndx]
+            ret.append(((names[i], sym_name.decode('utf-8', 'replace')),
+                (sym.st_value, sym.st_size, sym.st_info, sym.st_other, shndx)))
+    return ret
+
+
+def diff(a, b, offsets=False):
+    """Compares two ELF objects
+
+    Returns list of Change tuples, empty if objects are equivalent. Fields
+    describing only placement in file are compared only if offsets is True.
+    Headers are compared as they are, so objects modified after parsing should
+    be serialized first, to update counts and sizes"""
+    changes = []
+
+    # ELF header
+    Ehdr_names = ['e_type', 'e_machine', 'e_version', 'e_entry', 'e_phoff',
+            'e_shoff', 'e_flags', 'e_ehsize', 'e_phentsize', 'e_phnum',
+            'e_shentsize', 'e_shnum']
+    if a.Elf.bits != b.Elf.bits:
+        changes.append(Change('header', 'EI_CLASS', 'EI_CLASS', a.Elf.bits,
+            b.Elf.bits))
+    if a.little != b.little:
+        changes.append(Change('header', 'EI_DATA', 'EI_DATA', a.little,
+            b.little))
+    _compare_fields(changes, 'header', 'Ehdr', a.Elf.Ehdr, b.Elf.Ehdr,
+            Ehdr_names, offsets)
+
+    # section headers
+    names_a = a.get_section_names()
+    names_b = b.get_section_names()
+    digests_a = makeelf.digest.section_digests(a.Elf)
+    digests_b = makeelf.digest.section_digests(b.Elf)
+    Shdr_names = ['sh_type', 'sh_flags', 'sh_addr', 'sh_offset', 'sh_size',
+            'sh_info', 'sh_addralign', 'sh_entsize']
+    for i, j in _match(names_a, names_b):
+        if j is None:
+            changes.append(Change('section', names_a[i], None, names_a[i],
+                None))
+            continue
+        if i is None:
+            changes.append(Change('section', names_b[j], None, None,
+                names_b[j]))
+            continue
+        name = names_a[i]
+        Shdr_a = a.Elf.Shdr_table[i]
+        Shdr_b = b.Elf.Shdr_table[j]
+        _compare_fields(changes, 'section', name, Shdr_a, Shdr_b, Shdr_names,
+                offsets)
+
+        # sh_link is index of other section, compare names instead
+        link_a = names_a[Shdr_a.sh_link] if Shdr_a.sh_link < len(names_a) \
+                else Shdr_a.sh_link
+        link_b = names_b[Shdr_b.sh_link] if Shdr_b.sh_link < len(names_b) \
+                else Shdr_b.sh_link
+        if link_a != link_b:
+            changes.append(Change('section', name, 'sh_link', link_a, link_b))
+
+        # contents
+        if digests_a[i] != digests_b[j]:
+            off = _first_difference(makeelf.digest.section_bytes(a.Elf, i),
+                    makeelf.digest.section_bytes(b.Elf, j))
+            changes.append(Change('content', name, off, digests_a[i],
+                digests_b[j]))
+
+    # program headers
+    Phdr_names = ['p_type', 'p_offset', 'p_vaddr', 'p_paddr', 'p_filesz',
+            'p_memsz', 'p_flags', 'p_align']
+    keys_a = [(int(p.p_type), p.p_vaddr) for p in a.Elf.Phdr_table]
+    keys_b = [(int(p.p_type), p.p_vaddr) for p in b.Elf.Phdr_table]
+    for i, j in _match(keys_a, keys_b):
+        if j is None:
+            changes.append(Change('segment', hex(keys_a[i][1]), None,
+                keys_a[i], None))
+        elif i is None:
+            changes.append(Change('segment', hex(keys_b[j][1]), None, None,
+                keys_b[j]))
+        else:
+            _compare_fields(changes, 'segment', hex(keys_a[i][1]),
+                    a.Elf.Phdr_table[i], b.Elf.Phdr_table[j], Phdr_names,
+                    offsets)
+
+    # symbols
+    symbols_a = _symbols(a, names_a)
+    symbols_b = _symbols(b, names_b)
+    Sym_names = ['st_value', 'st_size', 'st_info', 'st_other', 'st_shndx']
+    for i, j in _match([key for key, _ in symbols_a],
+            [key for key, _ in symbols_b]):
+        if j is None:
+            key, _ = symbols_a[i]
+            changes.append(Change('symbol', '%s:%s' % key, None, key[1], None))
+        elif i is None:
+            key, _ = symbols_b[j]
+            changes.append(Change('symbol', '%s:%s' % key, None, None, key[1]))
+        else:
+            key, old = symbols_a[i]
+            _, new = symbols_b[j]
+            for field, old_val, new_val in zip(Sym_names, old, new):
+                if old_val != new_val:
+                    changes.append(Change('symbol', '%s:%s' % key, field,
+                        old_val, new_val))
+
+    return changes
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+## \file digest.py
+#  \brief Content digests of sections and segments
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from makeelf.elfstruct import *
+from makeelf.flat import _Source
+
+## Sections of at least that many bytes are hashed in a thread pool
+#  \details hashlib releases GIL while hashing large buffers, so such sections
+#  are really hashed in parallel
+PARALLEL_THRESHOLD = 1 << 20
+
+
+def section_bytes(Elf, idx):
+    """Returns content of section as bytes
+
+    Content is converted with bytes(), so for immutable contents the very same
+    object is returned each time. SHT_NOBITS sections have no content"""
+    if Elf.Shdr_table[idx].sh_type == SHT.SHT_NOBITS:
+        return b''
+    section = Elf.sections[idx]
+    if isinstance(section, list):
+        return b''.join(bytes(e) for e in section)
+    return bytes(section)
+
+
+def _hexdigest(algorithm, data):
+    h = hashlib.new(algorithm)
+    h.update(data)
+    return h.hexdigest()
+
+
+def _immutable(section):
+    """Tells if content of section object can never change
+
+    Only such contents are keys of cached digests. Structured contents, e.g.
+    symbol tables or lists, are modified in place"""
+    from makeelf.elf import _FileSection
+    return type(section) is bytes or isinstance(section, _FileSection)
+
+
+def section_digests(Elf, algorithm='sha256', workers=None):
+    """Returns list of digests of every section content, in section order
+
+    Digests of immutable contents are cached on Elf object and reused as long
+    as section content is the same object, so only replaced sections are
+    hashed again. Sections of at least PARALLEL_THRESHOLD bytes are hashed by
+    up to workers threads, unless workers is 0"""
+    cache = Elf._digests
+    ret = [None] * len(Elf.sections)
+    jobs = []
+    for i, section in enumerate(Elf.sections):
+        nobits = Elf.Shdr_table[i].sh_type == SHT.SHT_NOBITS
+        cached = cache.get((i, algorithm))
+        if cached is not None and cached[0] is section and not nobits:
+            ret[i] = cached[1]
+            continue
+        blob = section_bytes(Elf, i)
+        if workers != 0 and len(blob) >= PARALLEL_THRESHOLD:
+            jobs.append((i, blob))
+        else:
+            ret[i] = _hexdigest(algorithm, blob)
+            if _immutable(section) and not nobits:
+                cache[(i, algorithm)] = (section, ret[i])
+
+    if len(jobs) > 0:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            digests = executor.map(_hexdigest, [algorithm] * len(jobs),
+                    [memoryview(blob) for i, blob in jobs])
+            for (i, blob), digest in zip(jobs, digests):
+                ret[i] = digest
+                section = Elf.sections[i]
+                if _immutable(section):
+                    cache[(i, algorithm)] = (section, digest)
+    return ret
+
+
+def segment_digests(Elf, algorithm='sha256'):
+    """Returns list of digests of PT_LOAD segments, in program header order
+
+    Digest covers p_filesz bytes of file image at p_offset. Image is not
+    serialized, segments are hashed from views of headers and section
+    contents. For segments of other types None is returned"""
+    source = None
+    ret = []
+    for Phdr in Elf.Phdr_table:
+        if Phdr.p_type != PT.PT_LOAD:
+            ret.append(None)
+            continue
+        if source is None:
+            source = _Source(Elf)
+        h = hashlib.new(algorithm)
+        for part in source.parts(Phdr.p_offset, Phdr.p_filesz):
+            h.update(part)
+        ret.append(h.hexdigest())
+    return ret
+
+
+def semantic_digest(Elf, algorithm='sha256', workers=None):
+    """Returns digest of ELF, which does not depend on file layout
+
+    Offsets of headers, sections and segments are not hashed, so two objects
+    with the same contents laid out differently have the same digest"""
+    h = hashlib.new(algorithm)
+    Ehdr = Elf.Ehdr
+    h.update(repr((Elf.bits, Elf.little, bytes(Ehdr.e_ident), int(Ehdr.e_type),
+        int(Ehdr.e_machine), Ehdr.e_version, Ehdr.e_entry, Ehdr.e_flags,
+        Ehdr.e_shstrndx)).encode())
+
+    shstrtab = b''
+    if Ehdr.e_shstrndx < len(Elf.sections):
+        shstrtab = section_bytes(Elf, Ehdr.e_shstrndx)
+    digests = section_digests(Elf, algorithm, workers)
+    for Shdr, digest in zip(Elf.Shdr_table, digests):
+        end = shstrtab.find(b'\0', Shdr.sh_name)
+        name = shstrtab[Shdr.sh_name:end] if end != -1 else b''
+        h.update(repr((name, int(Shdr.sh_type), Shdr.sh_flags, Shdr.sh_addr,
+            Shdr.sh_size, Shdr.sh_link, Shdr.sh_info, Shdr.sh_addralign,
+            Shdr.sh_entsize, digest)).encode())
+
+    for Phdr in Elf.Phdr_table:
+        h.update(repr((int(Phdr.p_type), Phdr.p_vaddr, Phdr.p_paddr,
+            Phdr.p_filesz, Phdr.p_memsz, Phdr.p_flags,
+            Phdr.p_align)).encode())
+    return h.hexdigest()
@@ -3,7 +3,40 @@
 #  \brief Module for high-level manipulation of ELF files
 from makeelf.elfstruct import *
 from makeelf.elfsect import *
+import makeelf.cache
+import makeelf.columns
+import makeelf.digest
+import makeelf.flat
+import makeelf.layout
+import makeelf.memory
+import makeelf.strip
+import makeelf.strmerge
+import makeelf.template
+import makeelf.trace
+from bisect import bisect_right
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import copy
 import os
+import struct
+import sys
+import threading
+import zlib
+
+## Default alignment of segments created by \link ELF.append_segment \endlink
+#  \details File offset and virtual address of such segment are congruent
+#  modulo this value, so segment can be mapped by pages
+PAGE_SIZE = 0x1000
+
+## Number of threads doing file I/O for asynchronous API
+AIO_WORKERS = 8
+
+## Number of table entries parsed by asynchronous API before yielding to loop
+AIO_CHUNK = 1024
+
+_aio_executor = None
+_aio_executor_lock = threading.Lock()
 
 class _Strtab:
     """Helper class for creating sections of type SHT_STRTAB
@@ -16,6 +49,21 @@ class _Strtab:
         else:
             self.blob = b'\0'
 
+    @property
+    def blob(self):
+        """Content of the table as bytes"""
+        # join strings appended since last access, so appending stays linear
+        if len(self._tail) > 0:
+            self._blob = b''.join([self._blob] + self._tail)
+            self._tail = []
+        return self._blob
+
+    @blob.setter
+    def blob(self, b):
+        self._blob = b
+        self._tail = []
+        self._len = len(b)
+
     def __str__(self):
         return str(self.blob)
 
@@ -26,7 +74,14 @@ class _Strtab:
         return self.blob
 
     def __len__(self):
-        return len(self.blob)
+        return self._len
+
+    def __getstate__(self):
+        return {'_blob': bytes(self.blob), '_tail': [], '_len': self._len}
+
+    def clone(self):
+        """Returns copy of table, sharing its content until appended to"""
+        return _Strtab(self.blob)
 
     def __iadd__(lhs, rhs):
         if isinstance(rhs, str):
@@ -46,8 +101,9 @@ class _Strtab:
         if isinstance(string, str):
             string = bytes(string, 'utf-8')
 
-        ret = len(self.blob)
-        self.blob += string + b'\0'
+        ret = self._len
+        self._tail.append(string + b'\0')
+        self._len += len(string) + 1
         return ret
 
     def find(self, sub, start=None, end=None):
@@ -62,21 +118,55 @@ class _Strtab:
 class _Symtab:
     """Helper class for handling symbol table"""
 
-    def __init__(self, b=None):
+    def __init__(self, b=None, little=False, Sym=Elf32_Sym):
         # init list
         self.lst = []
 
+        # type of table entries, either Elf32_Sym or Elf64_Sym
+        self.Sym = Sym
+        self.little = little
+
         # if bytes provided
         if b is not None:
-            # convert b to list of Elf32_Sym
-            while len(b) > 0:
-                sym, b = Elf32_Sym.from_bytes(b)
-                self.lst.append(sym)
+            # convert b to list of symbol entries
+            count = len(b) // len(Sym())
+            self.lst = Sym.table_from_bytes(b, 0, count, little)
         else:
             # create entry for index STN_UNDEF and append to table
-            first = Elf32_Sym()
+            first = Sym(little=little)
             self.lst.append(first)
 
+    def __getstate__(self):
+        # entries are pickled as one table, unless they differ in endianness
+        state = self.__dict__.copy()
+        if 'lst' in state and all(el.little == self.little for el in
+                self.lst):
+            try:
+                state['_packed'] = bytes(self)
+                del state['lst']
+            except struct.error:
+                # values out of range of fields, e.g. made for fuzzing
+                pass
+        return state
+
+    def clone(self):
+        """Returns copy of table, decoded again when first accessed"""
+        ret = _Symtab.__new__(_Symtab)
+        ret.__dict__.update(self.__getstate__())
+        if 'lst' in ret.__dict__:
+            ret.lst = [copy.copy(el) for el in self.lst]
+        return ret
+
+    def __getattr__(self, name):
+        # table of unpickled or cloned object is decoded on first access
+        packed = self.__dict__.get('_packed')
+        if name != 'lst' or packed is None:
+            raise AttributeError(name)
+        self.lst = self.Sym.table_from_bytes(packed, 0, len(packed) //
+                len(self.Sym()), self.little)
+        del self._packed
+        return self.lst
+
     def __str__(self):
         return str(self.lst)
 
@@ -84,21 +174,22 @@ class _Symtab:
         return repr(self.lst)
 
     def __bytes__(self):
-        b = b''
-        for el in self.lst:
-            b += bytes(el)
-        return b
+        if 'lst' not in self.__dict__:
+            return self._packed
+        return b''.join(bytes(el) for el in self.lst)
 
     def __len__(self):
-        return len(bytes(self))
+        if 'lst' not in self.__dict__:
+            return len(self._packed)
+        return len(self.Sym()) * len(self.lst)
 
     def append(self, Symhdr):
         """Appends entry to symbol table
 
         Returns index of newly appended header"""
-        if not isinstance(Symhdr, Elf32_Sym):
+        if not isinstance(Symhdr, self.Sym):
             # It is not expected, let's try converting throught bytes to struct
-            Symhdr = Elf32_Sym.from_bytes(bytes(Symhdr))
+            Symhdr, _ = self.Sym.from_bytes(bytes(Symhdr), self.little)
 
         # store id of appended header
         ret = len(self.lst)
@@ -108,6 +199,259 @@ class _Symtab:
         return ret
 
 
+class _SharedFile:
+    """File opened once and shared by lazily read sections of one object
+
+    Sections keep reading the same file, even if it was renamed or replaced
+    meanwhile. File is closed, when no section uses it anymore"""
+
+    def __init__(self, filename, fd=None):
+        self.filename = filename
+        self.fd = os.open(filename, os.O_RDONLY) if fd is None else fd
+
+    def __del__(self):
+        fd = getattr(self, 'fd', None)
+        if fd is not None:
+            os.close(fd)
+            self.fd = None
+
+    def __reduce__(self):
+        # descriptor is meaningless in other process, file is opened again
+        return _SharedFile, (self.filename,)
+
+    def pread(self, size, offset):
+        """Reads exactly size bytes at offset"""
+        return _pread(self.fd, size, offset)
+
+
+class _FileSection:
+    """Helper class for section content, that was not read from file yet
+
+    Content is fetched with single positional read on first use, from shared
+    open file, if given, or from file opened by name otherwise"""
+
+    def __init__(self, filename, offset, size, file=None):
+        self.filename = filename
+        self.offset = offset
+        self.size = size
+        self.blob = None
+        # instance of _SharedFile, until content is read
+        self.file = file
+
+    def __repr__(self):
+        return '%s(%s, %d, %d)' % (type(self).__name__, repr(self.filename),
+                self.offset, self.size)
+
+    def __bytes__(self):
+        return self.load()
+
+    def clone(self):
+        # content never changes, so it is shared with clones
+        return self
+
+    def __len__(self):
+        if self.blob is None:
+            return self.size
+        return len(self.blob)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def _file(self):
+        if self.file is None:
+            self.file = _SharedFile(self.filename)
+        return self.file
+
+    def pread(self, size, offset=0):
+        """Returns size bytes of content starting at offset
+
+        If content was not loaded yet, only requested part is read"""
+        if offset < 0 or size < 0 or offset + size > self.size:
+            raise Exception('Read outside of section')
+        if self.blob is not None:
+            return self.blob[offset:offset + size]
+        return self._file().pread(size, self.offset + offset)
+
+    def load(self):
+        """Reads content of section, if not read already
+
+        Returns content as bytes"""
+        if self.blob is None:
+            self.blob = self._file().pread(self.size, self.offset)
+            # file is not needed anymore
+            self.file = None
+        return self.blob
+
+    def find(self, sub, start=None, end=None):
+        if start is None:
+            return self.load().find(sub)
+        elif end is None:
+            return self.load().find(sub, start)
+        else:
+            return self.load().find(sub, start, end)
+
+
+class _CompressedSection:
+    """Helper class for content of SHF_COMPRESSED section
+
+    Converts to bytes as stored in file, i.e. compression header followed by
+    compressed data. Uncompressed data is decompressed lazily, on first
+    access, and only up to the last byte requested"""
+
+    ## Amount of compressed data fed to decompressor at once
+    CHUNK = 1 << 16
+
+    def __init__(self, raw=None, Chdr=Elf32_Chdr, little=False, content=None,
+            addralign=1, level=6):
+        # file representation, None if it has to be compressed again
+        self.raw = raw
+        self.Chdr = Chdr
+        self.little = little
+        self.level = level
+        # uncompressed data, once known
+        self._content = content
+        self._addralign = addralign
+        self._decompressor = None
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, repr(self.raw))
+
+    def __getstate__(self):
+        # decompressor cannot be pickled, so only file form is kept
+        return {'raw': bytes(self), 'Chdr': self.Chdr, 'little': self.little,
+                'level': self.level, '_content': None,
+                '_addralign': self._addralign, '_decompressor': None}
+
+    def __bytes__(self):
+        if self.raw is None:
+            self.raw = self._compress(self._content)
+        return bytes(self.raw)
+
+    def clone(self):
+        """Returns copy sharing compressed and decompressed data"""
+        return _CompressedSection(self.raw, self.Chdr, self.little,
+                self._content, self._addralign, self.level)
+
+    def __len__(self):
+        if self.raw is None:
+            self.raw = self._compress(self._content)
+        return len(self.raw)
+
+    def _compress(self, content):
+        hdr = self.Chdr(ELFCOMPRESS.ELFCOMPRESS_ZLIB, len(content),
+                self._addralign, little=self.little)
+        return bytes(hdr) + zlib.compress(content, self.level)
+
+    @property
+    def chdr(self):
+        """Compression header, instance of Elf32_Chdr or Elf64_Chdr"""
+        if self.raw is None:
+            return self.Chdr(ELFCOMPRESS.ELFCOMPRESS_ZLIB,
+                    len(self._content), self._addralign, little=self.little)
+        hdr_len = len(self.Chdr())
+        hdr, _ = self.Chdr.from_bytes(bytes(self.raw[:hdr_len]), self.little)
+        return hdr
+
+    def _inflate(self, size):
+        """Decompresses data until at least size bytes are available"""
+        if self._content is not None:
+            return
+        if self._decompressor is None:
+            hdr = self.chdr
+            if hdr.ch_type != ELFCOMPRESS.ELFCOMPRESS_ZLIB:
+                raise Exception('Compression %s not supported' % hdr.ch_type)
+            self._decompressor = zlib.decompressobj()
+            self._input = memoryview(bytes(self.raw))[len(self.Chdr()):]
+            self._output = bytearray()
+            self._size = hdr.ch_size
+
+        d = self._decompressor
+        while len(self._output) < size and not d.eof:
+            if len(d.unconsumed_tail) > 0:
+                data = d.unconsumed_tail
+            elif len(self._input) > 0:
+                data = self._input[:self.CHUNK]
+                self._input = self._input[self.CHUNK:]
+            else:
+                break
+            self._output += d.decompress(data, max(size - len(self._output),
+                self.CHUNK))
+
+        if d.eof or len(self._input) == 0 and len(d.unconsumed_tail) == 0:
+            if len(self._output) != self._size:
+                raise Exception('Decompressed size %d differs from ch_size %d'
+                        % (len(self._output), self._size))
+            self._content = bytes(self._output)
+            self._decompressor = self._input = self._output = None
+
+    def read(self, offset=0, size=-1):
+        """Returns part of uncompressed data
+
+        Only data up to the end of requested part is decompressed"""
+        if size < 0:
+            self._inflate(sys.maxsize)
+            return self._content[offset:]
+        self._inflate(offset + size)
+        data = self._content if self._content is not None else self._output
+        return bytes(data[offset:offset + size])
+
+    @property
+    def content(self):
+        """Uncompressed data, setting it causes compression on serialization"""
+        self._inflate(sys.maxsize)
+        return self._content
+
+    @content.setter
+    def content(self, data):
+        self._addralign = self.chdr.ch_addralign
+        self._content = bytes(data)
+        self._decompressor = None
+        self.raw = None
+
+
+def _elf_class(b):
+    """Returns low-level class suitable for ELF starting with b"""
+    if b[4:5] == bytes([ELFCLASS.ELFCLASS64]):
+        return Elf64
+    return Elf32
+
+
+def _default_executor():
+    """Returns executor shared by asynchronous calls, creating it if needed"""
+    global _aio_executor
+    with _aio_executor_lock:
+        if _aio_executor is None:
+            _aio_executor = ThreadPoolExecutor(max_workers=AIO_WORKERS,
+                    thread_name_prefix='makeelf-io')
+        return _aio_executor
+
+
+def _read_file(filename):
+    fp = os.open(filename, os.O_RDONLY)
+    try:
+        file_size = os.fstat(fp).st_size
+        return os.read(fp, file_size)
+    finally:
+        os.close(fp)
+
+
+def _write_file(filename, b):
+    fp = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(b)
+        while len(view) > 0:
+            view = view[os.write(fp, view):]
+    finally:
+        os.close(fp)
+
+
+def _pread(fp, size, offset):
+    b = os.pread(fp, size, offset)
+    if len(b) != size:
+        raise Exception('Unexpected end of file at offset %d' % offset)
+    return b
+
+
 class ELF:
     """This class is a wrapper on ELF structures provided by elfstruct module
     
@@ -123,7 +467,8 @@ class ELF:
             return
         if e_class == ELFCLASS.ELFCLASS32:
             cls = Elf32
-            hdr = Elf32_Ehdr
+        elif e_class == ELFCLASS.ELFCLASS64:
+            cls = Elf64
         else:
             raise Exception('ELF class %s currently unsupported' % e_class)
 
@@ -140,11 +485,12 @@ class ELF:
         ## Instance of \link elfstruct.Elf32 \endlink class
         #  \details Provides possibility to make any modification to ELF file,
         #  including setting fields to invalid values.
-        self.Elf = cls(Ehdr=hdr(e_ident=Elf32_e_ident(EI_CLASS=e_class, EI_DATA=e_data),
-                e_type=e_type, e_machine=e_machine, little=self.little))
+        self.Elf = cls(Ehdr=cls.Ehdr_class(e_ident=Elf32_e_ident(
+            EI_CLASS=e_class, EI_DATA=e_data), e_type=e_type,
+            e_machine=e_machine, little=self.little), little=self.little)
 
         # create empty section entry
-        undef_section = Elf32_Shdr(little=self.little)
+        undef_section = self.Elf.Shdr_class(little=self.little)
         self.Elf.Shdr_table.append(undef_section)
         self.Elf.sections.append(b'')
 
@@ -153,8 +499,8 @@ class ELF:
         shstrtab_name = shstrtab.append('.shstrtab')
 
         # add .shstrtab into section header and section list
-        shstrtab_hdr = Elf32_Shdr(sh_name=shstrtab_name, sh_type=SHT.SHT_STRTAB,
-                sh_addralign=1, little=self.little)
+        shstrtab_hdr = self.Elf.Shdr_class(sh_name=shstrtab_name,
+                sh_type=SHT.SHT_STRTAB, sh_addralign=1, little=self.little)
         self.Elf.Shdr_table.append(shstrtab_hdr)
         self.Elf.sections.append(shstrtab) # this is ok, as long as shstrtab has
         # bytes() implementation
@@ -173,11 +519,48 @@ class ELF:
     def __repr__(self):
         return repr(self.Elf)
 
+    def _Sym_class(self):
+        if self.Elf.bits == 64:
+            return Elf64_Sym
+        return Elf32_Sym
+
     def __bytes__(self):
         """Serialize ELF object into block of bytes
 
         Makes some header updates and serializes object to file, so output
         should always be valid ELF file"""
+        self._update_layout()
+        return bytes(self.Elf)
+
+    def write(self, fp):
+        """Serialize ELF object into binary file object
+
+        Same as __bytes__, but file is written part after part, so large
+        sections are never copied into single buffer. Returns number of bytes
+        written"""
+        self._update_layout()
+        return self.Elf.write(fp)
+
+    def clone(self):
+        """Returns copy of ELF object, that can be modified independently
+
+        Immutable section contents are shared with original, while headers
+        and mutable contents are copied when clone uses them. Clones of
+        untouched clone share even serialized header tables, so making many
+        variants of one template is cheap:
+
+            base = template.clone()
+            variant = base.clone()"""
+        ret = ELF(None, None, None, None)
+        ret.Elf = self.Elf.clone()
+        ret.little = self.little
+        return ret
+
+    def _update_layout(self):
+        """Updates header fields describing placement of headers and sections"""
+        tracing = makeelf.trace.hooks
+        if tracing:
+            start = perf_counter()
         cursor = len(self.Elf.Ehdr)
 
         # update offsets in Ehdr regarding Phdrs
@@ -208,31 +591,319 @@ class ELF:
             self.Elf.Ehdr.e_shentsize = 0
             self.Elf.Ehdr.e_shnum = 0
 
-        # update section offsets in section headers
-        for i, Shdr in enumerate(self.Elf.Shdr_table):
-            section_len = len(self.Elf.sections[i])
-            Shdr.sh_offset = cursor
-            Shdr.sh_size = section_len
-            cursor += section_len
-
-        return bytes(self.Elf)
+        # update section offsets in section headers and segments
+        cursor = makeelf.layout.plan(self.Elf, cursor)
+        if tracing:
+            makeelf.trace.emit('serialize.layout', start, cursor,
+                    len(self.Elf.Shdr_table))
 
     def from_bytes(b):
-        """Deserializes ELF from block of bytes"""
+        """Deserializes ELF from block of bytes
+
+        Class of low-level object is chosen based on EI_CLASS byte"""
         ret = ELF(None, None, None, None)
-        ret.Elf, b = Elf32.from_bytes(b)
+        ret.Elf, b = _elf_class(b).from_bytes(b)
         ret.little = ret.Elf.little
+        ret._wrap_compressed()
         # TODO: catch all SHT_STRTAB and SHT_SYMTAB and convert
         return ret, b
 
-    def from_file(filename):
-        """Deserializes ELF from filesystem"""
-        fp = os.open(filename, os.O_RDONLY)
-        file_size = os.fstat(fp).st_size
-        b = os.read(fp, file_size)
-        os.close(fp)
+    def _wrap_compressed(self):
+        """Replaces contents of SHF_COMPRESSED sections with handlers, which
+        decompress them on first access
+
+        This is handlers phase of parsing, see trace module"""
+        tracing = makeelf.trace.hooks
+        if tracing:
+            start = perf_counter()
+            nbytes = count = 0
+        Chdr = Elf64_Chdr if self.Elf.bits == 64 else Elf32_Chdr
+        for i, Shdr in enumerate(self.Elf.Shdr_table):
+            if int(Shdr.sh_flags) & int(SHF.SHF_COMPRESSED) and \
+                    Shdr.sh_type != SHT.SHT_NOBITS and \
+                    not isinstance(self.Elf.sections[i], _CompressedSection):
+                self.Elf.sections[i] = _CompressedSection(self.Elf.sections[i],
+                        Chdr, self.little)
+                if tracing:
+                    nbytes += Shdr.sh_size
+                    count += 1
+        if tracing:
+            makeelf.trace.emit('parse.handlers', start, nbytes, count)
+
+    def from_file(filename, load_sections=True, cache=None):
+        """Deserializes ELF from filesystem
+
+        If load_sections is False, only ELF header and header tables are read
+        and contents of each section are read when first used. cache is
+        makeelf.cache.Cache object or path of cache directory. If given, parsed
+        headers, section digests and symbol tables are taken from snapshot
+        stored in cache, or stored there after parsing, and sections are read
+        when first used"""
+        if cache is not None:
+            if not isinstance(cache, makeelf.cache.Cache):
+                cache = makeelf.cache.Cache(cache)
+            return cache.load(filename), None
+
+        if not load_sections:
+            fp = os.open(filename, os.O_RDONLY)
+            try:
+                return ELF._from_fd(fp, filename), None
+            finally:
+                os.close(fp)
+
+        return ELF.from_bytes(_read_file(filename))
+
+    async def aopen(filename, load_sections=True, executor=None):
+        """Deserializes ELF from filesystem without blocking event loop
+
+        File is read in executor, by default in a pool of AIO_WORKERS threads
+        shared by all calls, which bounds number of concurrent reads. Parsing
+        returns control to event loop after every AIO_CHUNK table entries.
+        If load_sections is False, section contents are read later, when they
+        are used, and those reads block event loop. Returns ELF object"""
+        loop = asyncio.get_running_loop()
+        if executor is None:
+            executor = _default_executor()
+
+        if not load_sections:
+            ret, _ = await loop.run_in_executor(executor, ELF.from_file,
+                    filename, False)
+            return ret
+
+        b = await loop.run_in_executor(executor, _read_file, filename)
+        for Elf in _elf_class(b)._parse(b, chunk=AIO_CHUNK):
+            await asyncio.sleep(0)
+
+        ret = ELF(None, None, None, None)
+        ret.Elf = Elf
+        ret.little = Elf.little
+        ret._wrap_compressed()
+        return ret
+
+    async def asave(self, filename, executor=None):
+        """Serializes ELF to filesystem without blocking event loop
+
+        Both serialization and writing are done in executor, the same as in
+        aopen, so object must not be modified until this call completes"""
+        loop = asyncio.get_running_loop()
+        if executor is None:
+            executor = _default_executor()
+        await loop.run_in_executor(executor,
+                lambda: _write_file(filename, bytes(self)))
+
+    def _from_fd(fp, filename):
+        # Elf64_Ehdr is the longest of ELF headers
+        b = os.pread(fp, len(Elf64_Ehdr()), 0)
+        cls = _elf_class(b)
+        Ehdr, _ = cls.Ehdr_class.from_bytes(b)
+        little = Ehdr.little
+
+        # Program headers
+        entsize = Ehdr.e_phentsize or len(cls.Phdr_class())
+        b = _pread(fp, entsize * Ehdr.e_phnum, Ehdr.e_phoff)
+        Phdr_table = cls.Phdr_class.table_from_bytes(b, 0, Ehdr.e_phnum,
+                little, entsize)
+
+        # Section headers
+        entsize = Ehdr.e_shentsize or len(cls.Shdr_class())
+        b = _pread(fp, entsize * Ehdr.e_shnum, Ehdr.e_shoff)
+        Shdr_table = cls.Shdr_class.table_from_bytes(b, 0, Ehdr.e_shnum,
+                little, entsize)
+
+        # Sections, to be read on demand from the very file opened here,
+        # SHT_NOBITS sections have no content in file
+        shared = _SharedFile(filename, os.dup(fp))
+        sections = [b'' if Shdr.sh_type == SHT.SHT_NOBITS else
+                _FileSection(filename, Shdr.sh_offset, Shdr.sh_size, shared)
+                for Shdr in Shdr_table]
+
+        ret = ELF(None, None, None, None)
+        ret.Elf = cls(Ehdr, Phdr_table, Shdr_table, sections, little=little)
+        ret.little = little
+        ret._wrap_compressed()
+        return ret
+
+    ## Compute digests of section and segment contents
+    #  \details Digests of sections are cached and recomputed only for sections
+    #  whose content changed. Large sections are hashed in parallel
+    #  \param algorithm Name of hashlib algorithm, e.g. sha256 or blake2b
+    #  \param workers Maximal number of hashing threads, 0 to hash serially
+    #  \returns Dictionary with list of section digests under 'sections' key
+    #  and list of segment digests under 'segments' key, None for segments
+    #  other than PT_LOAD
+    def section_digests(self, algorithm='sha256', workers=None):
+        return {
+                'sections': makeelf.digest.section_digests(self.Elf, algorithm,
+                    workers),
+                'segments': makeelf.digest.segment_digests(self.Elf,
+                    algorithm),
+                }
+
+    ## Compute digest of ELF contents, independent of file layout
+    #  \details File offsets are not part of digest, so two files differing
+    #  only in placement of sections have the same semantic digest
+    #  \param algorithm Name of hashlib algorithm, e.g. sha256 or blake2b
+    #  \returns Hex digest
+    def semantic_digest(self, algorithm='sha256', workers=None):
+        return makeelf.digest.semantic_digest(self.Elf, algorithm, workers)
+
+    ## Compress contents of sections
+    #  \details Sections are compressed with zlib in a pool of threads and
+    #  marked with SHF_COMPRESSED flag. Sections that are already compressed
+    #  or have no content in file are skipped
+    #  \param sections list of section names or indexes
+    #  \param level zlib compression level
+    #  \param workers maximal number of compressing threads
+    #  \returns List of indexes of compressed sections
+    def compress_sections(self, sections, level=6, workers=None):
+        names = self.get_section_names()
+        indexes = []
+        for sec in sections:
+            idx = names.index(sec) if isinstance(sec, str) else sec
+            Shdr = self.Elf.Shdr_table[idx]
+            if int(Shdr.sh_flags) & int(SHF.SHF_COMPRESSED) or \
+                    Shdr.sh_type in [SHT.SHT_NULL, SHT.SHT_NOBITS]:
+                continue
+            indexes.append(idx)
+
+        Chdr = Elf64_Chdr if self.Elf.bits == 64 else Elf32_Chdr
+        handlers = [_CompressedSection(None, Chdr, self.little,
+            bytes(self.Elf.sections[idx]),
+            int(self.Elf.Shdr_table[idx].sh_addralign), level)
+            for idx in indexes]
+
+        # zlib releases GIL, so sections are really compressed in parallel
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            raws = list(executor.map(lambda h: h._compress(h._content),
+                handlers))
+
+        for idx, handler, raw in zip(indexes, handlers, raws):
+            handler.raw = raw
+            Shdr = self.Elf.Shdr_table[idx]
+            Shdr.sh_flags = int(Shdr.sh_flags) | int(SHF.SHF_COMPRESSED)
+            Shdr.sh_addralign = self.Elf.bits // 8
+            self.Elf.sections[idx] = handler
+        return indexes
+
+    ## Create template for stamping many variants of this ELF
+    #  \details Object is serialized once and variable fields, declared on
+    #  returned template, are resolved to offsets in serialized file. Each
+    #  variant is made by patching copy of that file, without computing
+    #  layout again. Later changes of this object do not affect template
+    #  \param base file this object was parsed from, used as is instead of
+    #  serializing object, which keeps its layout
+    #  \returns Instance of \link template.Template \endlink
+    def template(self, base=None):
+        return makeelf.template.Template(self, base)
+
+    ## Remove sections and symbols
+    #  \details Works like strip and objcopy --remove-section. Relocation
+    #  sections of removed sections are removed as well. Then, in one pass,
+    #  e_shstrndx, sh_link and sh_info of every section, st_shndx of symbols,
+    #  symbol indexes of relocations and members of section groups are
+    #  renumbered
+    #  \param remove_sections list of section names or indexes, debug sections
+    #  by default
+    #  \param keep_symbols list of names of symbols to keep in SHT_SYMTAB,
+    #  symbols used by relocations are always kept, all symbols are kept by
+    #  default
+    #  \returns List mapping old section indexes to new ones, None for removed
+    def strip(self, remove_sections=None, keep_symbols=None):
+        return makeelf.strip.strip(self, remove_sections, keep_symbols)
+
+    ## Decode symbol or relocation table into columns
+    #  \details Every field of entries is stored in separate array.array,
+    #  without creating object for each entry. Tables of at least
+    #  columns.PARALLEL_THRESHOLD entries are decoded in worker processes,
+    #  reading the file directly if section was not loaded yet, or shared
+    #  memory copy of section otherwise
+    #  \param sec name or index of SHT_SYMTAB, SHT_DYNSYM, SHT_REL or SHT_RELA
+    #  section
+    #  \param workers number of worker processes, 0 to decode in this process
+    #  \returns Dictionary mapping field name, e.g. st_value, to array
+    def table_columns(self, sec, workers=None):
+        idx = self.get_section_names().index(sec) if isinstance(sec, str) \
+                else sec
+        Shdr = self.Elf.Shdr_table[idx]
+        if Shdr.sh_type in [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]:
+            cls = self._Sym_class()
+        elif Shdr.sh_type == SHT.SHT_REL:
+            cls = Elf64_Rel if self.Elf.bits == 64 else Elf32_Rel
+        elif Shdr.sh_type == SHT.SHT_RELA:
+            cls = Elf64_Rela if self.Elf.bits == 64 else Elf32_Rela
+        else:
+            raise Exception('Section %s is not a symbol or relocation table' %
+                    sec)
+        entsize = Shdr.sh_entsize or len(cls())
+        section = self.Elf.sections[idx]
+        count = len(section) // entsize
+
+        # columns of immutable contents are cached, e.g. by parse cache
+        cached = self.Elf._columns.get(idx)
+        if cached is not None and cached[0] is section:
+            return {name: col[:] for name, col in cached[1].items()}
+
+        if workers == 0 or workers is None and count < \
+                makeelf.columns.PARALLEL_THRESHOLD:
+            ret = makeelf.columns.decode(makeelf.digest.section_bytes(
+                self.Elf, idx), cls, count, self.little, entsize)
+        elif isinstance(section, _FileSection) and section.blob is None:
+            ret = makeelf.columns.decode_parallel(section.filename, cls,
+                    count, self.little, entsize, section.offset, workers)
+        else:
+            ret = makeelf.columns.decode_parallel(
+                    makeelf.digest.section_bytes(self.Elf, idx), cls, count,
+                    self.little, entsize, 0, workers)
+        if isinstance(section, (bytes, _FileSection)):
+            self.Elf._columns[idx] = (section, {name: col[:] for name, col in
+                ret.items()})
+        return ret
 
-        return ELF.from_bytes(b)
+    ## Build raw memory image from PT_LOAD segments
+    #  \details Works like objcopy -O binary. Segment bodies are copied from
+    #  serialized file, bytes up to p_memsz are zeroed and gaps between
+    #  segments are filled with fill. Current file layout is used, so newly
+    #  created object should be serialized first
+    #  \param fill value of bytes between segments
+    #  \param base address of first byte of image, lowest segment address by
+    #  default
+    #  \param physical use p_paddr instead of p_vaddr as segment address
+    #  \returns Image as bytes
+    def to_flat_image(self, fill=0xff, base=None, physical=False):
+        return makeelf.flat.to_image(self.Elf, fill, base, physical)
+
+    ## Write raw memory image from PT_LOAD segments to file
+    #  \details Same as \link to_flat_image \endlink, but image is written
+    #  piece by piece, so it can be larger than available memory. Segments
+    #  must not overlap
+    #  \param fp binary file object opened for writing
+    #  \returns Number of bytes written
+    def write_flat_image(self, fp, fill=0xff, base=None, physical=False):
+        return makeelf.flat.write_image(self.Elf, fp, fill, base, physical)
+
+    ## Report memory held by this object
+    #  \details Breaks memory down to header objects, section contents by kind
+    #  (owned buffers, borrowed views, lazily read sections and handlers, such
+    #  as symbol tables), buffers kept alive by views and caches. Also reports
+    #  how much section data is held twice
+    #  \returns Dictionary with sizes in bytes, see memory.report
+    def memory_report(self):
+        return makeelf.memory.report(self)
+
+    ## Get names of all sections
+    #  \returns List of section names as str, in order of section headers
+    def get_section_names(self):
+        shstrndx = self.Elf.Ehdr.e_shstrndx
+        if shstrndx >= len(self.Elf.sections):
+            return [''] * len(self.Elf.Shdr_table)
+        shstrtab = bytes(self.Elf.sections[shstrndx])
+        names = []
+        for Shdr in self.Elf.Shdr_table:
+            end = shstrtab.find(b'\0', Shdr.sh_name)
+            if end == -1:
+                end = len(shstrtab)
+            names.append(shstrtab[Shdr.sh_name:end].decode('utf-8', 'replace'))
+        return names
 
     ## Get section with header based on its name
     #  \param sec_name Name of the section
@@ -247,7 +918,7 @@ class ELF:
         shstrtab = self.Elf.sections[shstrtab_idx]
 
         # shortcut if looking for .shstrtab
-        if sec_name == '.shstrtab':
+        if sec_name == b'.shstrtab':
             return (shstrtab_hdr, shstrtab)
 
         # find string in .shstrtab
@@ -276,12 +947,12 @@ class ELF:
 
         # create entry in section name section
         if not isinstance(shstrtab, _Strtab):
-            shstrtab = _Strtab(shstrtab)
+            shstrtab = _Strtab(bytes(shstrtab))
         self.Elf.sections[self.Elf.Ehdr.e_shstrndx] = shstrtab # FIXME: bad hack
         name_off = shstrtab.append(sec_name)
 
         # craft Shdr
-        shdr = Elf32_Shdr(sh_name=name_off, sh_type=sh_type,
+        shdr = self.Elf.Shdr_class(sh_name=name_off, sh_type=sh_type,
                 sh_flags=sh_flags, sh_addr=sec_addr, sh_offset=0,
                 sh_size=len(sec_data), sh_link=sh_link, sh_info=sh_info,
                 sh_addralign=sh_addralign, sh_entsize=sh_entsize,
@@ -291,7 +962,7 @@ class ELF:
         ret = len(self.Elf.Shdr_table)
 
         # check header - blob consistency
-        if len(self.Elf.sections) is not ret:
+        if len(self.Elf.sections) != ret:
             raise Exception('section header list and section list are '\
                     'inconsistent. Automatic section appending impossible')
 
@@ -313,6 +984,93 @@ class ELF:
                 sh_type=SHT.SHT_PROGBITS, sh_flags=0, sh_link=0, sh_info=0,
                 sh_addralign=1, sh_entsize=0)
 
+    ## Add new section of mergeable strings
+    #  \details Section is marked with SHF_MERGE and SHF_STRINGS flags. Equal
+    #  strings are stored once and strings ending other strings point into
+    #  them, see strmerge.merge
+    #  \param sec_name Name of the section to append
+    #  \param strings iterable of str or bytes, without terminating NULs
+    #  \param entsize size of single character
+    #  \returns Tuple of ID of newly added section and list of offsets of
+    #  strings, in order of input
+    def append_merged_strings(self, sec_name, strings, sec_addr=0, entsize=1):
+        blob, offsets = makeelf.strmerge.merge(strings, entsize)
+        flags = int(SHF.SHF_ALLOC) | int(SHF.SHF_MERGE) | int(SHF.SHF_STRINGS)
+        sec_id = self._append_section(sec_name, blob, sec_addr,
+                sh_flags=flags, sh_addralign=entsize, sh_entsize=entsize)
+        return sec_id, offsets
+
+    ## Merge duplicated strings of existing section
+    #  \details Content is rebuilt like in \link append_merged_strings
+    #  \endlink and section is marked with SHF_MERGE and SHF_STRINGS flags. If
+    #  section starts with empty string, like string tables do, it stays at
+    #  offset 0. If section holds section names, sh_name fields are updated
+    #  and so are st_name fields of symbol tables linked to section. Sections
+    #  like SHT_DYNAMIC, that refer to strings otherwise, cannot be updated,
+    #  so string tables linked to them are refused
+    #  \param sec name or index of section
+    #  \returns Dictionary mapping old offsets of strings to new ones
+    def merge_strings(self, sec):
+        idx = self.get_section_names().index(sec) if isinstance(sec, str) \
+                else sec
+        Shdr = self.Elf.Shdr_table[idx]
+        symtabs = []
+        for i, hdr in enumerate(self.Elf.Shdr_table):
+            if hdr.sh_link != idx or hdr.sh_type in [SHT.SHT_REL,
+                    SHT.SHT_RELA] or i == 0:
+                continue
+            if hdr.sh_type not in [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]:
+                raise Exception('Section %d refers to strings of section %s, '
+                        'which cannot be updated' % (i, sec))
+            symtabs.append(i)
+        entsize = max(int(Shdr.sh_entsize), 1)
+        strings = makeelf.strmerge.split(self.Elf.sections[idx], entsize)
+
+        head = 0
+        if len(strings) > 0 and strings[0] == (0, b''):
+            head = entsize
+            strings = strings[1:]
+        blob, offsets = makeelf.strmerge.merge((s for _, s in strings),
+                entsize)
+        remap = {0: 0} if head > 0 else {}
+        for (old, _), new in zip(strings, offsets):
+            remap[old] = new + head
+        blob = bytes(head) + blob
+
+        # names may point into the middle of strings
+        starts = sorted(remap)
+
+        def moved(off):
+            start = starts[bisect_right(starts, off) - 1]
+            return remap[start] + off - start
+
+        if idx == self.Elf.Ehdr.e_shstrndx and len(remap) > 0:
+            for hdr in self.Elf.Shdr_table:
+                hdr.sh_name = moved(hdr.sh_name)
+
+        Sym = self._Sym_class()
+        for i in symtabs if len(remap) > 0 else []:
+            section = self.Elf.sections[i]
+            if isinstance(section, _Symtab):
+                syms = section.lst
+            else:
+                b = makeelf.digest.section_bytes(self.Elf, i)
+                entsize = self.Elf.Shdr_table[i].sh_entsize or len(Sym())
+                syms = Sym.table_from_bytes(b, 0, len(b) // entsize,
+                        self.little, entsize)
+            for sym in syms:
+                sym.st_name = moved(sym.st_name)
+            if not isinstance(section, _Symtab):
+                self.Elf.sections[i] = b''.join(bytes(sym) for sym in syms)
+
+        if isinstance(self.Elf.sections[idx], _Strtab):
+            blob = _Strtab(blob)
+        self.Elf.sections[idx] = blob
+        Shdr.sh_flags = int(Shdr.sh_flags) | int(SHF.SHF_MERGE) | \
+                int(SHF.SHF_STRINGS)
+        Shdr.sh_entsize = entsize
+        return remap
+
     ## Add new special section to ELF file
     #  \details This function allows to add one of the special, structured
     #  sections to ELF file. Name is automatically appended to .shstrtab
@@ -334,9 +1092,11 @@ class ELF:
             strtab_id = self.Elf.Shdr_table.index(strtab_hdr)
 
             # create new symbol table
-            return self._append_section(sec_name, _Symtab(), 0,
+            Sym = self._Sym_class()
+            return self._append_section(sec_name,
+                    _Symtab(little=self.little, Sym=Sym), 0,
                     sh_type=SHT.SHT_SYMTAB, sh_link=strtab_id, sh_info=0,
-                    sh_addralign=4, sh_entsize=len(Elf32_Sym()))
+                    sh_addralign=self.Elf.bits // 8, sh_entsize=len(Sym()))
 
         raise Exception('%s is not a special section name or is not ' \
                 'supported yet' % sec_name)
@@ -348,8 +1108,11 @@ class ELF:
     #  \param sec_id id of section already describing this segment
     #  \param addr virtual address at which segment will be loaded
     #  \param mem_size size of segment after loading into memory
+    #  \param align alignment of segment, its file offset is congruent to addr
+    #  modulo this value
     #  \returns ID of newly added segment
-    def append_segment(self, sec_id, addr=None, mem_size=-1, flags='rwx'):
+    def append_segment(self, sec_id, addr=None, mem_size=-1, flags='rwx',
+            align=PAGE_SIZE):
         if self.Elf.Ehdr.e_type not in [ET.ET_EXEC, ET.ET_DYN]:
             raise Exception('ELF type is not executable neither shared (e_type'\
                     ' is %s)' % self.hdr.e_type)
@@ -377,13 +1140,15 @@ class ELF:
 
         # call internal adder interface
         return self._append_segment(ptype=PT.PT_LOAD, vaddr=addr, paddr=0,
-                file_size=Shdr.sh_size, mem_size=mem_size, flags=p_flags)
+                file_size=Shdr.sh_size, mem_size=mem_size, flags=p_flags,
+                align=align)
 
-    def _append_segment(self, ptype, vaddr, paddr, file_size, mem_size, flags=0):
+    def _append_segment(self, ptype, vaddr, paddr, file_size, mem_size,
+            flags=0, align=1):
         # create instance of Phdr
-        Phdr = Elf32_Phdr(p_type=ptype, p_offset=0, p_vaddr=vaddr,
+        Phdr = self.Elf.Phdr_class(p_type=ptype, p_offset=0, p_vaddr=vaddr,
                 p_paddr=paddr, p_filesz=file_size, p_memsz=mem_size,
-                p_flags=flags, p_align=1, little=self.little)
+                p_flags=flags, p_align=align, little=self.little)
 
         # add Phdr to elf object
         ret = len(self.Elf.Phdr_table)
@@ -434,13 +1199,13 @@ class ELF:
 
         # convert to _Strtab
         if not isinstance(strtab, _Strtab):
-            strtab = _Strtab(strtab)
+            strtab = _Strtab(bytes(strtab))
             strtab_id = self.Elf.Shdr_table.index(strtab_hdr)
             self.Elf.sections[strtab_id] = strtab # FIXME: bad hack
 
         # convert to _Symtab
         if not isinstance(symtab, _Symtab):
-            symtab = _Symtab(symtab)
+            symtab = _Symtab(bytes(symtab), self.little, self._Sym_class())
             symtab_id = self.Elf.Shdr_table.index(symtab_hdr)
             self.Elf.sections[symtab_id] = symtab # FIXME: bad hack
 
@@ -457,8 +1222,8 @@ class ELF:
         st_other = int(sym_visibility) & 0x3
 
         # create new symbol structure
-        sym = Elf32_Sym(sym_off, sym_offset, sym_size, st_info, st_other,
-                sym_section, little=self.little)
+        sym = self._Sym_class()(sym_off, sym_offset, sym_size, st_info,
+                st_other, sym_section, little=self.little)
 
         # add symbol to symbol table
         sym_id = symtab.append(sym)
@@ -6,6 +6,7 @@ from makeelf.type.align import align,unalign
 from makeelf.type.uint32 import uint32
 from makeelf.type.uint16 import uint16
 from makeelf.type.uint8 import uint8
+from makeelf.type.record import Layout, Record
 from makeelf.elfstruct import SHN
 
 ## \class DT
@@ -56,20 +57,31 @@ class DT(Enum):
     DT_HIPROC = 0x7fffffff
 
 
+## Field layout of \link Elf32_Dyn \endlink and \link Elf64_Dyn \endlink
+#  \details d_val and d_ptr share the same storage, so only d_val is listed
+Dyn_layout = Layout([
+    ('d_tag', 'Xword'),
+    ('d_val', 'Xword'),
+    ])
+
+
 ## \class Elf32_Dyn
 #  \brief .dynamic section
-class Elf32_Dyn:
+class Elf32_Dyn(Record):
+
+    layout = Dyn_layout
 
     def __init__(self, d_tag=DT.DT_NULL, d_val=None, d_ptr=None, little=False):
         if isinstance(d_tag, DT):
             ## Value of type \link DT \endlink
             #  \details Controls if d_val or d_ptr is present
             self.d_tag = d_tag
-        elif d_tag in map(int, DT):
-            self.d_tag = DT(d_tag)
         elif isinstance(d_tag, int):
-            # TODO: log warning message
-            self.d_tag = uint32(d_tag, little)
+            try:
+                self.d_tag = DT(d_tag)
+            except ValueError:
+                # TODO: log warning message
+                self.d_tag = uint32(d_tag, little)
         else:
             self.d_tag = DT[d_tag]
 
@@ -103,26 +115,17 @@ class Elf32_Dyn:
                 self.d_val == rhs.d_val and \
                 self.d_ptr == rhs.d_ptr
 
-    def __bytes__(self):
-        d_tag = bytes(self.d_tag)
-        d_val = uint32(self.d_val, little=self.little)
-        d_ptr = uint32(self.d_ptr, little=self.little)
-
-        # make sure d_tag is enum, before reversing bytes
-        # other way it may be already reversed
-        if self.little and isinstance(self.d_tag, DT):
-            d_tag = bytes(reversed(d_tag))
+    @classmethod
+    def _from_values(cls, values, little=False):
+        d_tag, d_val = values
+        return cls(d_tag, d_val, d_val, little)
 
-        return bytes(d_tag) + bytes(d_val)
 
-    def from_bytes(b, little=False):
-        d_tag, b = uint32.from_bytes(b, little)
-        d_val, b = uint32.from_bytes(b, little)
-        d_ptr = d_val
-        return Elf32_Dyn(d_tag.integer, d_val.integer, d_ptr.integer, little), b
+## \class Elf64_Dyn
+#  \brief .dynamic section entry of 64-bit object
+class Elf64_Dyn(Elf32_Dyn):
 
-    def __len__(self):
-        return len(bytes(self))
+    bits = 64
 
 
 ## \class STB
@@ -162,9 +165,24 @@ class STV(Enum):
     STV_PROTECTED = 3
 
 
+## Field layout of \link Elf32_Sym \endlink and \link Elf64_Sym \endlink
+#  \details 64-bit symbol keeps all narrow fields together, before st_value
+Sym_layout = Layout([
+    ('st_name', 'Word'),
+    ('st_value', 'Addr'),
+    ('st_size', 'Xword'),
+    ('st_info', 'uchar'),
+    ('st_other', 'uchar'),
+    ('st_shndx', 'Half'),
+    ], order64=['st_name', 'st_info', 'st_other', 'st_shndx', 'st_value',
+        'st_size'])
+
+
 ## \class Elf32_Sym
 #  \brief Symbol Table Entry
-class Elf32_Sym:
+class Elf32_Sym(Record):
+
+    layout = Sym_layout
 
     def __init__(self, st_name=0, st_value=0, st_size=0, st_info=0, st_other=0,
             st_shndx=SHN.SHN_UNDEF, little=False):
@@ -207,30 +225,201 @@ class Elf32_Sym:
                 self.st_other == rhs.st_other and \
                 self.st_shndx == rhs.st_shndx
 
-    def __bytes__(self):
-        st_name = uint32(self.st_name, little=self.little)
-        st_value = uint32(self.st_value, little=self.little)
-        st_size = uint32(self.st_size, little=self.little)
-        st_info = uint8(self.st_info, little=self.little)
-        st_other = uint8(self.st_other, little=self.little)
-        st_shndx = uint16(self.st_shndx, little=self.little)
-
-        return bytes(st_name) + bytes(st_value) + bytes(st_size) + \
-                bytes(st_info) + bytes(st_other) + bytes(st_shndx)
-
-    def from_bytes(b, little=False):
-        st_name, b = uint32.from_bytes(b, little=little)
-        st_value, b = uint32.from_bytes(b, little=little)
-        st_size, b = uint32.from_bytes(b, little=little)
-        st_info, b = uint8.from_bytes(b, little=little)
-        st_other, b = uint8.from_bytes(b, little=little)
-        st_shndx, b = uint16.from_bytes(b, little=little)
-
-        return Elf32_Sym(st_name.integer, st_value.integer, st_size.integer,
-                st_info.integer, st_other.integer, st_shndx.integer, little), b
-
-    def __len__(self):
-        return len(bytes(self))
+
+## \class Elf64_Sym
+#  \brief Symbol Table Entry of 64-bit object
+class Elf64_Sym(Elf32_Sym):
+
+    bits = 64
+
+
+## Field layout of \link Elf32_Rel \endlink and \link Elf64_Rel \endlink
+Rel_layout = Layout([
+    ('r_offset', 'Addr'),
+    ('r_info', 'Xword'),
+    ])
+
+
+## \class Elf32_Rel
+#  \brief Relocation Entry
+class Elf32_Rel(Record):
+
+    layout = Rel_layout
+
+    ## Number of bits of r_info, occupied by relocation type
+    _type_bits = 8
+
+    def __init__(self, r_offset=0, r_info=0, little=False):
+        ## Location at which to apply the relocation
+        self.r_offset = r_offset
+        ## Packed symbol table index and type of relocation
+        self.r_info = r_info
+
+        ## Header endianness indicator
+        #  \details Is true, if header values are meant to be stored as
+        #  little-endian or false otherwise
+        self.little = little
+
+    ## Symbol table index, relocation is made with respect to
+    @property
+    def r_sym(self):
+        return self.r_info >> self._type_bits
+
+    @r_sym.setter
+    def r_sym(self, value):
+        self.r_info = (value << self._type_bits) | self.r_type
+
+    ## Type of relocation, processor-specific
+    @property
+    def r_type(self):
+        return self.r_info & ((1 << self._type_bits) - 1)
+
+    @r_type.setter
+    def r_type(self, value):
+        mask = (1 << self._type_bits) - 1
+        self.r_info = (self.r_info & ~mask) | (value & mask)
+
+    def __str__(self):
+        return '{r_offset=%s, r_info=%s}' % (self.r_offset, self.r_info)
+
+    def __repr__(self):
+        return '%s(%s, %s)' % (type(self).__name__, self.r_offset,
+                self.r_info)
+
+    def __eq__(self, rhs):
+        return type(self) == type(rhs) and \
+                self.r_offset == rhs.r_offset and \
+                self.r_info == rhs.r_info
+
+
+## \class Elf64_Rel
+#  \brief Relocation Entry of 64-bit object
+class Elf64_Rel(Elf32_Rel):
+
+    bits = 64
+
+    _type_bits = 32
+
+
+## Field layout of \link Elf32_Rela \endlink and \link Elf64_Rela \endlink
+Rela_layout = Layout([
+    ('r_offset', 'Addr'),
+    ('r_info', 'Xword'),
+    ('r_addend', 'Sxword'),
+    ])
+
+
+## \class Elf32_Rela
+#  \brief Relocation Entry with explicit addend
+class Elf32_Rela(Elf32_Rel):
+
+    layout = Rela_layout
+
+    def __init__(self, r_offset=0, r_info=0, r_addend=0, little=False):
+        Elf32_Rel.__init__(self, r_offset, r_info, little)
+        ## Constant addend used to compute relocated value
+        self.r_addend = r_addend
+
+    def __str__(self):
+        return '{r_offset=%s, r_info=%s, r_addend=%s}' % (self.r_offset,
+                self.r_info, self.r_addend)
+
+    def __repr__(self):
+        return '%s(%s, %s, %s)' % (type(self).__name__, self.r_offset,
+                self.r_info, self.r_addend)
+
+    def __eq__(self, rhs):
+        return Elf32_Rel.__eq__(self, rhs) and \
+                self.r_addend == rhs.r_addend
+
+
+## \class Elf64_Rela
+#  \brief Relocation Entry with explicit addend of 64-bit object
+class Elf64_Rela(Elf32_Rela):
+
+    bits = 64
+
+    _type_bits = 32
+
+
+## \class ELFCOMPRESS
+#  \brief Compression algorithms of SHF_COMPRESSED sections
+class ELFCOMPRESS(Enum):
+    """ch_type enumeration"""
+    ELFCOMPRESS_ZLIB = 1
+    ELFCOMPRESS_ZSTD = 2
+    ELFCOMPRESS_LOOS = 0x60000000
+    ELFCOMPRESS_HIOS = 0x6fffffff
+    ELFCOMPRESS_LOPROC = 0x70000000
+    ELFCOMPRESS_HIPROC = 0x7fffffff
+
+
+## Field layout of \link Elf32_Chdr \endlink
+Chdr32_layout = Layout([
+    ('ch_type', 'Word'),
+    ('ch_size', 'Word'),
+    ('ch_addralign', 'Word'),
+    ])
+
+
+## Field layout of \link Elf64_Chdr \endlink, which has padding after ch_type
+Chdr64_layout = Layout([
+    ('ch_type', 'Word'),
+    ('ch_reserved', 'Word'),
+    ('ch_size', 'Xword'),
+    ('ch_addralign', 'Xword'),
+    ])
+
+
+## \class Elf32_Chdr
+#  \brief Compression header, placed at the beginning of SHF_COMPRESSED section
+class Elf32_Chdr(Record):
+
+    layout = Chdr32_layout
+
+    def __init__(self, ch_type=ELFCOMPRESS.ELFCOMPRESS_ZLIB, ch_size=0,
+            ch_addralign=1, ch_reserved=0, little=False):
+        ## Compression algorithm, instance of \link ELFCOMPRESS \endlink
+        if isinstance(ch_type, int):
+            try:
+                ch_type = ELFCOMPRESS(ch_type)
+            except ValueError:
+                ch_type = uint32(ch_type)
+        self.ch_type = ch_type
+        ## Size of uncompressed data
+        self.ch_size = ch_size
+        ## Alignment of uncompressed data
+        self.ch_addralign = ch_addralign
+        ## Reserved, present only in 64-bit header
+        self.ch_reserved = ch_reserved
+
+        ## Header endianness indicator
+        #  \details Is true, if header values are meant to be stored as
+        #  little-endian or false otherwise
+        self.little = little
+
+    def __str__(self):
+        return '{ch_type=%s, ch_size=%s, ch_addralign=%s}' % (self.ch_type,
+                self.ch_size, self.ch_addralign)
+
+    def __repr__(self):
+        return '%s(%s, %s, %s)' % (type(self).__name__, self.ch_type,
+                self.ch_size, self.ch_addralign)
+
+    def __eq__(self, rhs):
+        return type(self) == type(rhs) and \
+                self.ch_type == rhs.ch_type and \
+                self.ch_size == rhs.ch_size and \
+                self.ch_addralign == rhs.ch_addralign
+
+
+## \class Elf64_Chdr
+#  \brief Compression header of 64-bit object
+class Elf64_Chdr(Elf32_Chdr):
+
+    bits = 64
+
+    layout = Chdr64_layout
 
 
 if __name__ == '__main__':
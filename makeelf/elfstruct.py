@@ -6,7 +6,12 @@ from makeelf.type.align import align,unalign
 from makeelf.type.uint8 import uint8
 from makeelf.type.uint16 import uint16
 from makeelf.type.uint32 import uint32
+from makeelf.type.record import Layout, Record
 import makeelf.utils
+import makeelf.trace
+import copy
+import struct
+from time import perf_counter
 
 ## \class ELFCLASS
 #  \brief File class
@@ -143,7 +148,7 @@ class Elf32_e_ident:
 
     def from_bytes(b):
         saved_b = b
-        EI_MAG, b = (b[:4], b[4:])
+        EI_MAG, b = (bytes(b[:4]), b[4:])
         EI_CLASS, b = ELFCLASS.from_bytes(b)
         EI_DATA, b = ELFDATA.from_bytes(b)
         EI_VERSION, b = EV.from_bytes(b)
@@ -460,10 +465,35 @@ class EM(Enum):
     EM_CSKY_OLD = EM_MCORE
 
 
+## Field layout of \link Elf32_Ehdr \endlink and \link Elf64_Ehdr \endlink
+#  \details e_ident is not part of layout, as it is the same for every class
+Ehdr_layout = Layout([
+    ('e_type', 'Half'),
+    ('e_machine', 'Half'),
+    ('e_version', 'Word'),
+    ('e_entry', 'Addr'),
+    ('e_phoff', 'Off'),
+    ('e_shoff', 'Off'),
+    ('e_flags', 'Word'),
+    ('e_ehsize', 'Half'),
+    ('e_phentsize', 'Half'),
+    ('e_phnum', 'Half'),
+    ('e_shentsize', 'Half'),
+    ('e_shnum', 'Half'),
+    ('e_shstrndx', 'Half'),
+    ])
+
+
 ## \class Elf32_Ehdr
 #  \brief ELF Header
 class Elf32_Ehdr:
 
+    ## Class of ELF file this header belongs to
+    bits = 32
+
+    ## Field layout, without e_ident
+    layout = Ehdr_layout
+
     def __init__(self, e_ident=None, e_type=ET.ET_REL, e_machine=EM.EM_NONE,
             e_version=1, e_entry=0, e_phoff=0, e_shoff=0, e_flags=0,
             e_ehsize=0x34, e_phentsize=0, e_phnum=0, e_shentsize=0, e_shnum=0,
@@ -478,15 +508,15 @@ class Elf32_Ehdr:
         if isinstance(e_type, ET):
             ## Value of type \link ET \endlink
             self.e_type = e_type
-        elif e_type in map(int, ET):
-            self.e_type = EM(e_type)
+        elif isinstance(e_type, int):
+            self.e_type = ET(e_type)
         else:
             self.e_type = ET[e_type]
 
         if isinstance(e_machine, EM):
             ## Value of type \link EM \endlink
             self.e_machine = e_machine
-        elif e_machine in map(int, EM):
+        elif isinstance(e_machine, int):
             self.e_machine = EM(e_machine)
         else:
             self.e_machine = EM[e_machine]
@@ -558,61 +588,52 @@ class Elf32_Ehdr:
                 self.e_shstrndx == rhs.e_shstrndx
 
     def __bytes__(self):
-        little = self.little
-        e_type = bytes(self.e_type)
-        e_machine = bytes(self.e_machine)
-        e_version = uint32(self.e_version, little)
-        e_entry = uint32(self.e_entry, little)
-        e_phoff = uint32(self.e_phoff, little)
-        e_shoff = uint32(self.e_shoff, little)
-        e_flags = uint32(self.e_flags, little)
-        e_ehsize = uint16(self.e_ehsize, little)
-        e_phentsize = uint16(self.e_phentsize, little)
-        e_phnum = uint16(self.e_phnum, little)
-        e_shentsize = uint16(self.e_shentsize, little)
-        e_shnum = uint16(self.e_shnum, little)
-        e_shstrndx = uint16(self.e_shstrndx, little)
-        if self.little:
-            e_type = bytes(reversed(e_type))
-            e_machine = bytes(reversed(e_machine))
-        b = bytes(self.e_ident) + bytes(e_type) + bytes(e_machine) + \
-                bytes(e_version) + bytes(e_entry) + bytes(e_phoff) + \
-                bytes(e_shoff) + bytes(e_flags) + bytes(e_ehsize) + \
-                bytes(e_phentsize) + bytes(e_phnum) + bytes(e_shentsize) + \
-                bytes(e_shnum) + bytes(e_shstrndx)
-        return b
-
-    def from_bytes(b):
+        codec = self.layout.codec(self.bits, self.little)
+        return bytes(self.e_ident) + codec.pack(int(self.e_type),
+                int(self.e_machine), self.e_version, self.e_entry,
+                self.e_phoff, self.e_shoff, self.e_flags, self.e_ehsize,
+                self.e_phentsize, self.e_phnum, self.e_shentsize,
+                self.e_shnum, self.e_shstrndx)
+
+    @classmethod
+    def from_bytes(cls, b):
         e_ident, b = Elf32_e_ident.from_bytes(b)
         # througout this function we rely only on ELF header regarding
         # endianness
         little = e_ident.EI_DATA is ELFDATA.ELFDATA2LSB
-        e_type, b = ET.from_bytes(b, little=little)
-        e_machine, b = EM.from_bytes(b, little=little)
-        # TODO: use Elf*_Word or similar to be able to create second header -
-        # Elf64_Ehdr for amd64
-        e_version, b = uint32.from_bytes(b, little=little)
-        e_entry, b = uint32.from_bytes(b, little=little) # || 64b
-        e_phoff, b = uint32.from_bytes(b, little=little) # || 64b
-        e_shoff, b = uint32.from_bytes(b, little=little) # || 64b
-        e_flags, b = uint32.from_bytes(b, little=little)
-        e_ehsize, b = uint16.from_bytes(b, little=little)
-        e_phentsize, b = uint16.from_bytes(b, little=little)
-        e_phnum, b = uint16.from_bytes(b, little=little)
-        e_shentsize, b = uint16.from_bytes(b, little=little)
-        e_shnum, b = uint16.from_bytes(b, little=little)
-        e_shstrndx, b = uint16.from_bytes(b, little=little)
-        Ehdr = Elf32_Ehdr(e_ident=e_ident, e_type=e_type, e_machine=e_machine,
-                e_version=e_version.integer, e_entry=e_entry.integer,
-                e_phoff=e_phoff.integer, e_shoff=e_shoff.integer,
-                e_flags=e_flags.integer, e_ehsize=e_ehsize.integer,
-                e_phentsize=e_phentsize.integer, e_phnum=e_phnum.integer,
-                e_shentsize=e_shentsize.integer, e_shnum=e_shnum.integer,
-                e_shstrndx=e_shstrndx.integer)
-        return Ehdr, b
+        codec = cls.layout.codec(cls.bits, little)
+        (e_type, e_machine, e_version, e_entry, e_phoff, e_shoff, e_flags,
+                e_ehsize, e_phentsize, e_phnum, e_shentsize, e_shnum,
+                e_shstrndx) = codec.unpack_from(b)
+        Ehdr = cls(e_ident=e_ident, e_type=e_type, e_machine=e_machine,
+                e_version=e_version, e_entry=e_entry, e_phoff=e_phoff,
+                e_shoff=e_shoff, e_flags=e_flags, e_ehsize=e_ehsize,
+                e_phentsize=e_phentsize, e_phnum=e_phnum,
+                e_shentsize=e_shentsize, e_shnum=e_shnum,
+                e_shstrndx=e_shstrndx)
+        return Ehdr, b[codec.size:]
 
     def __len__(self):
-        return len(bytes(self))
+        return len(self.e_ident) + self.layout.codec(self.bits).size
+
+
+## \class Elf64_Ehdr
+#  \brief ELF Header of 64-bit object
+#  \details Differs from \link Elf32_Ehdr \endlink only by width of address
+#  and offset fields and by default values
+class Elf64_Ehdr(Elf32_Ehdr):
+
+    bits = 64
+
+    def __init__(self, e_ident=None, e_type=ET.ET_REL, e_machine=EM.EM_NONE,
+            e_version=1, e_entry=0, e_phoff=0, e_shoff=0, e_flags=0,
+            e_ehsize=0x40, e_phentsize=0, e_phnum=0, e_shentsize=0, e_shnum=0,
+            e_shstrndx=0, little=False):
+        if e_ident is None:
+            e_ident = Elf32_e_ident(EI_CLASS=ELFCLASS.ELFCLASS64)
+        super().__init__(e_ident, e_type, e_machine, e_version, e_entry,
+                e_phoff, e_shoff, e_flags, e_ehsize, e_phentsize, e_phnum,
+                e_shentsize, e_shnum, e_shstrndx, little)
 
 
 ## \class PT
@@ -669,9 +690,26 @@ class PF(Enum):
     PF_MASKPROC = 0xf0000000
 
 
+## Field layout of \link Elf32_Phdr \endlink and \link Elf64_Phdr \endlink
+#  \details In 64-bit header p_flags is moved next to p_type for alignment
+Phdr_layout = Layout([
+    ('p_type', 'Word'),
+    ('p_offset', 'Off'),
+    ('p_vaddr', 'Addr'),
+    ('p_paddr', 'Addr'),
+    ('p_filesz', 'Xword'),
+    ('p_memsz', 'Xword'),
+    ('p_flags', 'Word'),
+    ('p_align', 'Xword'),
+    ], order64=['p_type', 'p_flags', 'p_offset', 'p_vaddr', 'p_paddr',
+        'p_filesz', 'p_memsz', 'p_align'])
+
+
 ## \class Elf32_Phdr
 #  \brief Program Header
-class Elf32_Phdr:
+class Elf32_Phdr(Record):
+
+    layout = Phdr_layout
 
     def __init__(self, p_type=0, p_offset=0, p_vaddr=0, p_paddr=0, p_filesz=0,
             p_memsz=0, p_flags=0, p_align=0, little=False):
@@ -709,38 +747,12 @@ class Elf32_Phdr:
                 self.p_type, self.p_offset, self.p_vaddr, self.p_paddr,
                 self.p_filesz, self.p_memsz, self.p_flags, self.p_align)
 
-    def __bytes__(self):
-        p_type = uint32(self.p_type, little=self.little)
-        p_offset = uint32(self.p_offset, little=self.little)
-        p_vaddr = uint32(self.p_vaddr, little=self.little)
-        p_paddr = uint32(self.p_paddr, little=self.little)
-        p_filesz = uint32(self.p_filesz, little=self.little)
-        p_memsz = uint32(self.p_memsz, little=self.little)
-        p_flags = uint32(self.p_flags, little=self.little)
-        p_align = uint32(self.p_align, little=self.little)
-
-        return bytes(p_type) + bytes(p_offset) + bytes(p_vaddr) + \
-                bytes(p_paddr) + bytes(p_filesz) + bytes(p_memsz) + \
-                bytes(p_flags) + bytes(p_align)
-
-    def from_bytes(b, little=False):
-        p_type, b = uint32.from_bytes(b, little)
-        p_offset, b = uint32.from_bytes(b, little)
-        p_vaddr, b = uint32.from_bytes(b, little)
-        p_paddr, b = uint32.from_bytes(b, little)
-        p_filesz, b = uint32.from_bytes(b, little)
-        p_memsz, b = uint32.from_bytes(b, little)
-        p_flags, b = uint32.from_bytes(b, little)
-        p_align, b = uint32.from_bytes(b, little)
-
-        return Elf32_Phdr(p_type=p_type.integer, p_offset=p_offset.integer,
-                p_vaddr=p_vaddr.integer, p_paddr=p_paddr.integer,
-                p_filesz=p_filesz.integer, p_memsz=p_memsz.integer,
-                p_flags=p_flags.integer, p_align=p_align.integer, little=little
-                ), b
 
-    def __len__(self):
-        return len(bytes(self))
+## \class Elf64_Phdr
+#  \brief Program Header of 64-bit object
+class Elf64_Phdr(Elf32_Phdr):
+
+    bits = 64
 
 
 ## \class SHT
@@ -801,14 +813,32 @@ class SHF(Enum):
     SHF_OS_NONCONFORMING = 0x100
     SHF_GROUP = 0x200
     SHF_TLS = 0x400
+    SHF_COMPRESSED = 0x800
     SHF_MASKOS = 0x0ff00000
     SHF_MASKPROC = 0xf0000000
     # TODO: will not be an enum, but bitmap, implement first
 
 
+## Field layout of \link Elf32_Shdr \endlink and \link Elf64_Shdr \endlink
+Shdr_layout = Layout([
+    ('sh_name', 'Word'),
+    ('sh_type', 'Word'),
+    ('sh_flags', 'Xword'),
+    ('sh_addr', 'Addr'),
+    ('sh_offset', 'Off'),
+    ('sh_size', 'Xword'),
+    ('sh_link', 'Word'),
+    ('sh_info', 'Word'),
+    ('sh_addralign', 'Xword'),
+    ('sh_entsize', 'Xword'),
+    ])
+
+
 ## \class Elf32_Shdr
 #  \brief Section Header
-class Elf32_Shdr:
+class Elf32_Shdr(Record):
+
+    layout = Shdr_layout
 
     def __init__(self, sh_name=0, sh_type=SHT.SHT_NULL, sh_flags=0, sh_addr=0,
             sh_offset=0, sh_size=0, sh_link=0, sh_info=0, sh_addralign=0,
@@ -819,11 +849,12 @@ class Elf32_Shdr:
         if isinstance(sh_type, SHT):
             ## Value of type \link SHT \endlink
             self.sh_type = sh_type
-        elif sh_type in map(int, SHT):
-            self.sh_type = SHT(sh_type)
         elif isinstance(sh_type, int):
-            # TODO: log warning message
-            self.sh_type = uint32(sh_type, little)
+            try:
+                self.sh_type = SHT(sh_type)
+            except ValueError:
+                # TODO: log warning message
+                self.sh_type = uint32(sh_type, little)
         else:
             self.sh_type = SHT[sh_type]
 
@@ -864,47 +895,35 @@ class Elf32_Shdr:
             self.sh_addr, self.sh_offset, self.sh_size, self.sh_link,
             self.sh_info, self.sh_addralign, self.sh_entsize)
 
-    def __bytes__(self):
-        sh_name = uint32(self.sh_name, little=self.little)
-        sh_type = bytes(self.sh_type)
-        sh_flags = uint32(self.sh_flags, little=self.little)
-        sh_addr = uint32(self.sh_addr, little=self.little)
-        sh_offset = uint32(self.sh_offset, little=self.little)
-        sh_size = uint32(self.sh_size, little=self.little)
-        sh_link = uint32(self.sh_link, little=self.little)
-        sh_info = uint32(self.sh_info, little=self.little)
-        sh_addralign = uint32(self.sh_addralign, little=self.little)
-        sh_entsize = uint32(self.sh_entsize, little=self.little)
-
-        # make sure sh_type is enum, before reversing bytes
-        # other way it may be already reversed
-        if self.little and isinstance(self.sh_type, SHT):
-            sh_type = bytes(reversed(sh_type))
-
-        return bytes(sh_name) + bytes(sh_type) + bytes(sh_flags) + \
-                bytes(sh_addr) + bytes(sh_offset) + bytes(sh_size) + \
-                bytes(sh_link) + bytes(sh_info) + bytes(sh_addralign) + \
-                bytes(sh_entsize)
-
-    def from_bytes(b, little=False):
-        sh_name, b = uint32.from_bytes(b, little=little)
-        sh_type, b = uint32.from_bytes(b, little=little)
-        sh_flags, b = uint32.from_bytes(b, little=little)
-        sh_addr, b = uint32.from_bytes(b, little=little)
-        sh_offset, b = uint32.from_bytes(b, little=little)
-        sh_size, b = uint32.from_bytes(b, little=little)
-        sh_link, b = uint32.from_bytes(b, little=little)
-        sh_info, b = uint32.from_bytes(b, little=little)
-        sh_addralign, b = uint32.from_bytes(b, little=little)
-        sh_entsize, b = uint32.from_bytes(b, little=little)
-
-        return Elf32_Shdr(sh_name.integer, sh_type.integer, sh_flags.integer,
-                sh_addr.integer, sh_offset.integer, sh_size.integer,
-                sh_link.integer, sh_info.integer, sh_addralign.integer,
-                sh_entsize.integer, little=little), b
 
-    def __len__(self):
-        return len(bytes(self))
+## \class Elf64_Shdr
+#  \brief Section Header of 64-bit object
+class Elf64_Shdr(Elf32_Shdr):
+
+    bits = 64
+
+
+def _clone_section(section):
+    """Returns copy of section content, that can be modified independently
+
+    Immutable contents are shared, content handlers decide themselves"""
+    if hasattr(section, 'clone'):
+        return section.clone()
+    if isinstance(section, bytes):
+        return section
+    if isinstance(section, memoryview):
+        return section if section.readonly else bytearray(section)
+    if isinstance(section, list):
+        return [copy.copy(e) for e in section]
+    return copy.copy(section)
+
+
+def _chunks(count, chunk):
+    """Splits count entries into (first, count) pairs of at most chunk size"""
+    if chunk is None:
+        chunk = count
+    return [(first, min(chunk, count - first)) for first in range(0, count,
+        max(chunk, 1))]
 
 
 ## \class Elf32
@@ -914,6 +933,18 @@ class Elf32_Shdr:
 #  to provide any abstraction on top of ELF structure
 class Elf32:
 
+    ## Class of ELF file
+    bits = 32
+
+    ## Type of ELF header
+    Ehdr_class = Elf32_Ehdr
+
+    ## Type of program header table entries
+    Phdr_class = Elf32_Phdr
+
+    ## Type of section header table entries
+    Shdr_class = Elf32_Shdr
+
     ##
     # \brief The constructor
     # \details Reconstructs new Elf32 object with all stored public members
@@ -926,7 +957,7 @@ class Elf32:
     def __init__(self, Ehdr=None, Phdr_table=None, Shdr_table=None,
             sections=None, little=False):
         if Ehdr is None:
-            Ehdr = Elf32_Ehdr()
+            Ehdr = self.Ehdr_class()
         if Phdr_table is None:
             Phdr_table = []
         if Shdr_table is None:
@@ -964,6 +995,84 @@ class Elf32:
 
         self.little = little
 
+        # digests of section contents, see digest module
+        self._digests = {}
+
+        # decoded columns of symbol tables, see ELF.table_columns
+        self._columns = {}
+
+    ##
+    # \brief State of object for pickle
+    # \details Header tables are stored as their serialized form and decoded
+    # again only when accessed, sections borrowing memory are copied to bytes
+    # and cached values computed for other objects are dropped
+    #
+    # \return Dictionary of attributes
+    def __getstate__(self):
+        state = self._packed_state()
+        state['sections'] = [bytes(section) if isinstance(section, memoryview)
+                else section for section in self.sections]
+        ids = {id(section) for section in state['sections']}
+        state['_digests'] = {key: value for key, value in
+                self._digests.items() if id(value[0]) in ids}
+        state['_columns'] = {}
+        return state
+
+    ## Copy of attributes with header tables replaced by serialized form
+    def _packed_state(self):
+        state = self.__dict__.copy()
+        # tables not decoded yet are shared, as bytes are immutable
+        packed = dict(state.pop('_packed', {}))
+        for name in ['Phdr_table', 'Shdr_table']:
+            table = state.get(name)
+            if table is None:
+                continue
+            if all(hdr.little == self.little for hdr in table):
+                try:
+                    packed[name] = b''.join(bytes(hdr) for hdr in table)
+                    del state[name]
+                    continue
+                except struct.error:
+                    # values out of range of fields, e.g. made for fuzzing
+                    pass
+            state[name] = [copy.copy(hdr) for hdr in table]
+        state['_packed'] = packed
+        return state
+
+    ##
+    # \brief Copy of object, that can be modified independently
+    # \details Immutable section contents are shared with original and header
+    # tables are decoded from their serialized form only when accessed, so
+    # cloning a clone, which was not accessed yet, costs almost nothing.
+    # Cached digests stay valid for shared contents
+    #
+    # \return New object of the same class
+    def clone(self):
+        state = self._packed_state()
+        state['Ehdr'] = copy.deepcopy(self.Ehdr)
+        state['sections'] = [_clone_section(section) for section in
+                self.sections]
+        state['_digests'] = dict(self._digests)
+        state['_columns'] = dict(self._columns)
+        ret = type(self).__new__(type(self))
+        ret.__dict__.update(state)
+        return ret
+
+    ##
+    # \brief Decode header table of unpickled or cloned object on first access
+    #
+    # \param name Name of missing attribute
+    # \return Decoded table
+    def __getattr__(self, name):
+        packed = self.__dict__.get('_packed')
+        if packed is None or name not in packed:
+            raise AttributeError(name)
+        cls = self.Phdr_class if name == 'Phdr_table' else self.Shdr_class
+        b = packed.pop(name)
+        table = cls.table_from_bytes(b, 0, len(b) // len(cls()), self.little)
+        setattr(self, name, table)
+        return table
+
     ##
     # \brief Convert to str
     # \details Useful for presenting contents to the user
@@ -983,13 +1092,9 @@ class Elf32:
         return '%s(%s, %s, %s, %s)' % (type(self).__name__, self.Ehdr,
                 self.Phdr_table, self.Shdr_table, self.sections)
 
-    ##
-    # \brief Serialization to bytes
-    # \details Converts Python object to byte stream, ready to be saved to ELF
-    # file
-    #
-    # \return Serialized object
-    def __bytes__(self):
+    ## Get every part of file with its location
+    #  \returns dict mapping offset in file to header or section content
+    def _blocks(self):
         headers = {}
         headers[0] = bytes(self.Ehdr)
 
@@ -1005,37 +1110,85 @@ class Elf32:
             headers[cursor] = Shdr
             cursor += self.Ehdr.e_shentsize
 
-        # sections
+        # sections, SHT_NOBITS ones take no space in file
         for i, Shdr in enumerate(self.Shdr_table):
-            if len(self.sections[i]) != 0:
+            if len(self.sections[i]) != 0 and Shdr.sh_type != SHT.SHT_NOBITS:
                 headers[Shdr.sh_offset] = self.sections[i]
+        return headers
 
-        # find file size
-        end_of_file = sorted(headers.keys())[-1]
-        end_of_file += len(headers[end_of_file])
+    ##
+    # \brief Serialization to bytes
+    # \details Converts Python object to byte stream, ready to be saved to ELF
+    # file
+    #
+    # \return Serialized object
+    def __bytes__(self):
+        tracing = makeelf.trace.hooks
+        if tracing:
+            start = perf_counter()
+        headers = self._blocks()
 
-        # create and populate buffer
-        b = bytes(end_of_file)
+        # convert everything to bytes and find file size
+        end_of_file = 0
         for off in headers:
             # TODO: there's something wrong, when hdr is not bytes, but only
             # simulates it
             hdr = headers[off]
             if isinstance(hdr, list):
-                hdr_as_bytes = b''
-                for e in hdr:
-                    hdr_as_bytes += bytes(e)
-                hdr = hdr_as_bytes
+                hdr = b''.join(bytes(e) for e in hdr)
             else:
                 hdr = bytes(hdr)
-            size = len(hdr)
+            headers[off] = hdr
+            end_of_file = max(end_of_file, off + len(hdr))
+        if tracing:
+            makeelf.trace.emit('serialize.encode', start,
+                    sum(len(hdr) for hdr in headers.values()), len(headers))
+            start = perf_counter()
 
+        # create and populate buffer
+        b = bytes(end_of_file)
+        for off, hdr in headers.items():
             # expand to file size
             aligned = align(bytes(off) + hdr, end_of_file)
 
             # xor into b
             b = makeelf.utils.bytes_xor(b, aligned)
+        if tracing:
+            makeelf.trace.emit('serialize.emit', start, len(b), 1)
         return b
 
+    ##
+    # \brief Serialization to file object
+    # \details Writes the same bytes as \link __bytes__ \endlink, but part
+    # after part, so whole file is never held in memory. Contents providing
+    # chunks() method are written chunk by chunk. Files with overlapping parts
+    # are serialized to bytes first
+    #
+    # \param fp binary file object opened for writing
+    # \return number of bytes written
+    def write(self, fp):
+        blocks = []
+        cursor = 0
+        for off, block in sorted(self._blocks().items()):
+            if isinstance(block, list):
+                block = b''.join(bytes(e) for e in block)
+            if off < cursor:
+                return fp.write(bytes(self))
+            blocks.append((off, block))
+            cursor = off + len(block)
+
+        cursor = 0
+        for off, block in blocks:
+            if off > cursor:
+                fp.write(bytes(off - cursor))
+            if hasattr(block, 'chunks'):
+                for chunk in block.chunks():
+                    fp.write(chunk)
+            else:
+                fp.write(bytes(block))
+            cursor = off + len(block)
+        return cursor
+
     ##
     # \brief Deserialization of object
     #
@@ -1043,36 +1196,80 @@ class Elf32:
     # \param little endianness of data
     #
     # \return tuple of deserialized object and rest of bytes
-    def from_bytes(b, little=False):
+    @classmethod
+    def from_bytes(cls, b, little=False):
+        for ret in cls._parse(b):
+            pass
+        return ret, None
+
+    ##
+    # \brief Incremental deserialization of object
+    # \details Generator, which yields None after every parsed table, or every
+    # chunk of table entries if chunk is given. Last value yielded is the
+    # deserialized object
+    #
+    # \param b bytes object with serialized data on the beginning
+    # \param chunk maximal number of entries parsed between yields
+    @classmethod
+    def _parse(cls, b, chunk=None):
         blob = b
-        Ehdr, b = Elf32_Ehdr.from_bytes(b)
+        # phases are timed only when someone listens, see trace module
+        tracing = makeelf.trace.hooks
+        if tracing:
+            start = perf_counter()
+        Ehdr, b = cls.Ehdr_class.from_bytes(b)
+        if tracing:
+            makeelf.trace.emit('parse.Ehdr', start, len(Ehdr), 1)
 
         # pass endianness from Ehdr to other headers
         little = Ehdr.little
+        yield None
 
         # Program headers
         Phdr_a = []
-        for i in range(Ehdr.e_phnum):
-            Phdr, b = Elf32_Phdr.from_bytes(b, little)
-            Phdr_a.append(Phdr)
+        for first, count in _chunks(Ehdr.e_phnum, chunk):
+            if tracing:
+                start = perf_counter()
+            entsize = Ehdr.e_phentsize or len(cls.Phdr_class())
+            Phdr_a += cls.Phdr_class.table_from_bytes(blob,
+                    Ehdr.e_phoff + first * entsize, count, little, entsize)
+            if tracing:
+                makeelf.trace.emit('parse.Phdr_table', start, count * entsize,
+                        count)
+            yield None
 
         # Section headers
         Shdr_a = []
-        b = blob[Ehdr.e_shoff:]
-        for i in range(Ehdr.e_shnum):
-            Shdr, b = Elf32_Shdr.from_bytes(b, little)
-            Shdr_a.append(Shdr)
+        for first, count in _chunks(Ehdr.e_shnum, chunk):
+            if tracing:
+                start = perf_counter()
+            entsize = Ehdr.e_shentsize or len(cls.Shdr_class())
+            Shdr_a += cls.Shdr_class.table_from_bytes(blob,
+                    Ehdr.e_shoff + first * entsize, count, little, entsize)
+            if tracing:
+                makeelf.trace.emit('parse.Shdr_table', start, count * entsize,
+                        count)
+            yield None
 
         # Sections
         sections = []
         # TODO: support of section content handlers, i.e. _Strtab, _Symtab
-        for i, Shdr in enumerate(Shdr_a):
-            first = Shdr.sh_offset
-            last = first + Shdr.sh_size
-            section = blob[first:last]
-            sections.append(section)
-
-        return Elf32(Ehdr, Phdr_a, Shdr_a, sections, little=Ehdr.little), None
+        for idx, count in _chunks(len(Shdr_a), chunk):
+            if tracing:
+                start = perf_counter()
+                nbytes = 0
+            for Shdr in Shdr_a[idx:idx + count]:
+                first = Shdr.sh_offset
+                last = first + Shdr.sh_size
+                section = blob[first:last]
+                sections.append(section)
+                if tracing:
+                    nbytes += len(section)
+            if tracing:
+                makeelf.trace.emit('parse.sections', start, nbytes, count)
+            yield None
+
+        yield cls(Ehdr, Phdr_a, Shdr_a, sections, little=Ehdr.little)
 
     ##
     # \brief Length of object
@@ -1082,6 +1279,20 @@ class Elf32:
         return len(bytes(self))
 
 
+## \class Elf64
+#  \brief Complete 64-bit ELF structure storage class
+#  \details Same as \link Elf32 \endlink, but operates on 64-bit headers
+class Elf64(Elf32):
+
+    bits = 64
+
+    Ehdr_class = Elf64_Ehdr
+
+    Phdr_class = Elf64_Phdr
+
+    Shdr_class = Elf64_Shdr
+
+
 if __name__ == '__main__':
     # TODO: make some real tests
     print('tests')
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+## \file flat.py
+#  \brief Raw memory images built from PT_LOAD segments
+#  \details Same as output of objcopy -O binary. Image starts at the lowest
+#  segment address, unless other base is given, bytes between p_filesz and
+#  p_memsz are zeroed and gaps between segments are filled with fill byte
+from makeelf.elfstruct import *
+
+## Size of pieces read and written by streaming functions
+CHUNK = 1 << 20
+
+
+def loads(Elf, physical=False):
+    """Returns list of (address, Phdr) tuples of non-empty PT_LOAD segments
+
+    Address is p_paddr if physical is True or p_vaddr otherwise. Segments
+    are listed in program header order"""
+    ret = []
+    for Phdr in Elf.Phdr_table:
+        if Phdr.p_type != PT.PT_LOAD or max(Phdr.p_memsz, Phdr.p_filesz) == 0:
+            continue
+        ret.append((Phdr.p_paddr if physical else Phdr.p_vaddr, Phdr))
+    return ret
+
+
+class _Source:
+    """Reader of bytes of file image at given offsets
+
+    Image is assembled from headers and section contents, the same way as on
+    serialization, so edited sections are honored. Sections of objects loaded
+    lazily from file, that were not read yet, are read part by part from file
+    opened when object was loaded"""
+
+    def __init__(self, Elf):
+        self.blocks = []
+        for off, block in Elf._blocks().items():
+            if isinstance(block, list):
+                block = b''.join(bytes(e) for e in block)
+            self.blocks.append((off, len(block), block))
+        self.ordered = sorted(self.blocks, key=lambda b: b[0])
+        self.overlap = any(a[0] + a[1] > b[0] for a, b in zip(self.ordered,
+            self.ordered[1:]))
+        # views of contents, by id of block
+        self.views = {}
+
+    def _slice(self, block, start, size):
+        if getattr(block, 'pread', None) is not None and block.blob is None:
+            return block.pread(size, start)
+        view = self.views.get(id(block))
+        if view is None:
+            # buffers are viewed in place, other contents are converted once
+            content = block if isinstance(block, (bytes, bytearray,
+                memoryview)) else bytes(block)
+            view = self.views[id(block)] = memoryview(content).cast('B')
+        return view[start:start + size]
+
+    def read(self, offset, size):
+        """Returns size bytes of file image starting at offset
+
+        Bytes not covered by any part of file are zero. Overlapping parts are
+        XOR-ed, the same as on serialization"""
+        ret = bytearray(size)
+        end = offset + size
+        for off, length, block in self.blocks:
+            first = max(off, offset)
+            last = min(off + length, end)
+            if first >= last:
+                continue
+            piece = self._slice(block, first - off, last - first)
+            if self.overlap:
+                piece = (int.from_bytes(ret[first - offset:last - offset],
+                    'little') ^ int.from_bytes(piece, 'little')).to_bytes(
+                            last - first, 'little')
+            ret[first - offset:last - offset] = piece
+        return ret
+
+    def parts(self, offset, size):
+        """Yields pieces of file image, which joined are size bytes starting
+        at offset
+
+        Pieces are views of headers and section contents, when possible, so
+        nothing is copied"""
+        if self.overlap:
+            yield self.read(offset, size)
+            return
+        end = offset + size
+        cursor = offset
+        for off, length, block in self.ordered:
+            first = max(off, cursor)
+            last = min(off + length, end)
+            if first < last:
+                if first > cursor:
+                    yield bytes(first - cursor)
+                yield self._slice(block, first - off, last - first)
+                cursor = last
+        if cursor < end:
+            yield bytes(end - cursor)
+
+
+def source(Elf):
+    """Returns function reading bytes of file image at given offset"""
+    return _Source(Elf).read
+
+
+def _bounds(segments, base):
+    if len(segments) == 0:
+        raise Exception('No PT_LOAD segments to build image from')
+    if base is None:
+        base = min(addr for addr, _ in segments)
+    end = max(addr + max(Phdr.p_memsz, Phdr.p_filesz) for addr, Phdr in
+            segments)
+    return base, max(end, base)
+
+
+def to_image(Elf, fill=0xff, base=None, physical=False):
+    """Returns flat image as bytes
+
+    Segment bodies are copied into preallocated buffer. If segments overlap,
+    later program header wins"""
+    segments = loads(Elf, physical)
+    base, end = _bounds(segments, base)
+
+    src = _Source(Elf)
+
+    image = bytearray([fill]) * (end - base)
+    for addr, Phdr in segments:
+        memsz = max(Phdr.p_memsz, Phdr.p_filesz)
+        # part below base is not part of the image
+        skip = max(base - addr, 0)
+        if skip >= memsz:
+            continue
+        start = addr + skip - base
+        # views of contents are copied straight into the image
+        for part in src.parts(Phdr.p_offset + skip, max(Phdr.p_filesz - skip,
+            0)):
+            image[start:start + len(part)] = part
+            start += len(part)
+        # bytes between p_filesz and p_memsz are zeroed
+        stop = addr + memsz - base
+        image[start:stop] = bytes(stop - start)
+    return bytes(image)
+
+
+def write_image(Elf, fp, fill=0xff, base=None, physical=False):
+    """Writes flat image to binary file object fp, piece by piece
+
+    Image is never held in memory as a whole, so it can be larger than
+    available memory. Segments must not overlap. Returns number of bytes
+    written"""
+    segments = sorted(loads(Elf, physical), key=lambda s: s[0])
+    base, end = _bounds(segments, base)
+    read = source(Elf)
+    fill_chunk = bytes([fill]) * CHUNK
+
+    def pad(size, pattern):
+        while size > 0:
+            n = min(size, CHUNK)
+            fp.write(pattern[:n])
+            size -= n
+
+    cursor = base
+    for addr, Phdr in segments:
+        memsz = max(Phdr.p_memsz, Phdr.p_filesz)
+        skip = max(base - addr, 0)
+        if skip >= memsz:
+            continue
+        if addr + skip < cursor:
+            raise Exception('Segment at 0x%x overlaps previous one' % addr)
+        pad(addr + skip - cursor, fill_chunk)
+
+        # file content in chunks, then zeroes up to p_memsz
+        for off in range(skip, Phdr.p_filesz, CHUNK):
+            fp.write(read(Phdr.p_offset + off, min(CHUNK, Phdr.p_filesz -
+                off)))
+        pad(memsz - max(skip, Phdr.p_filesz), bytes(CHUNK))
+        cursor = addr + memsz
+    pad(end - cursor, fill_chunk)
+    return end - base
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+## \file hexfile.py
+#  \brief Intel HEX and Motorola S-record export and import
+#  \details Writers encode PT_LOAD segments, or allocatable sections, record
+#  by record. Data is read in large chunks and encoded records are joined
+#  and written once per chunk, so conversion is dominated by I/O. Readers
+#  accept both text and binary file objects and build new ELF object with one
+#  section and PT_LOAD segment for each contiguous block of data
+import makeelf.flat
+from makeelf.elf import *
+
+## Maximal number of bytes encoded at once
+CHUNK = 1 << 16
+
+
+def _data(Elf, sections, physical):
+    """Yields (address, chunk) tuples of data to be encoded
+
+    Chunks of the same block are yielded in order and at most CHUNK long"""
+    if sections:
+        for i, Shdr in enumerate(Elf.Shdr_table):
+            if Shdr.sh_type in [SHT.SHT_NULL, SHT.SHT_NOBITS] or \
+                    int(Shdr.sh_flags) & int(SHF.SHF_ALLOC) == 0:
+                continue
+            data = memoryview(bytes(Elf.sections[i]))
+            for off in range(0, len(data), CHUNK):
+                yield Shdr.sh_addr + off, data[off:off + CHUNK]
+        return
+
+    read = makeelf.flat.source(Elf)
+    for addr, Phdr in makeelf.flat.loads(Elf, physical):
+        for off in range(0, Phdr.p_filesz, CHUNK):
+            yield addr + off, read(Phdr.p_offset + off, min(CHUNK,
+                Phdr.p_filesz - off))
+
+
+def _ihex_record(rtype, addr, data=b''):
+    rec = bytes((len(data), (addr >> 8) & 0xff, addr & 0xff, rtype)) + data
+    return b':%s%02X\n' % (rec.hex().upper().encode(), -sum(rec) & 0xff)
+
+
+def write_ihex(Elf, fp, sections=False, record_size=16, physical=False):
+    """Writes Intel HEX representation of ELF to binary file object fp
+
+    PT_LOAD segments are encoded, or allocatable sections if sections is True.
+    Extended linear address records are emitted whenever upper half of address
+    changes. Returns number of data bytes encoded"""
+    if not 0 < record_size <= 255:
+        raise Exception('Record size must be between 1 and 255')
+    upper = 0
+    total = 0
+    for addr, chunk in _data(Elf, sections, physical):
+        chunk = bytes(chunk)
+        if addr + len(chunk) > 1 << 32:
+            raise Exception('Address 0x%x does not fit in Intel HEX' % addr)
+        # whole chunk is converted to hex at once, records are slices of it
+        hexdata = chunk.hex().upper().encode()
+        lines = []
+        off = 0
+        while off < len(chunk):
+            cur = addr + off
+            if cur >> 16 != upper:
+                upper = cur >> 16
+                lines.append(_ihex_record(4, 0, upper.to_bytes(2, 'big')))
+            # records must not cross 64 KiB boundary
+            size = min(record_size, len(chunk) - off, 0x10000 - (cur & 0xffff))
+            low = cur & 0xffff
+            checksum = size + (low >> 8) + (low & 0xff) + sum(chunk[off:off +
+                size])
+            lines.append(b':%02X%04X00%s%02X\n' % (size, low,
+                hexdata[2 * off:2 * (off + size)], -checksum & 0xff))
+            off += size
+        fp.write(b''.join(lines))
+        total += len(chunk)
+
+    entry = Elf.Ehdr.e_entry
+    if entry != 0 and entry < 1 << 32:
+        fp.write(_ihex_record(5, 0, entry.to_bytes(4, 'big')))
+    fp.write(_ihex_record(1, 0))
+    return total
+
+
+## Data record type and address length of S-records, by address width
+_SREC_DATA = {2: (b'S1', b'S9'), 3: (b'S2', b'S8'), 4: (b'S3', b'S7')}
+
+
+def _srec_record(rtype, addr, addr_len, data=b''):
+    rec = bytes((addr_len + len(data) + 1,)) + addr.to_bytes(addr_len,
+            'big') + data
+    return b'%s%s%02X\n' % (rtype, rec.hex().upper().encode(), ~sum(rec) & 0xff)
+
+
+def write_srec(Elf, fp, sections=False, record_size=32, physical=False,
+        header=b'makeelf'):
+    """Writes Motorola S-record representation of ELF to binary file object fp
+
+    Address width, hence types of data records (S1, S2 or S3), is chosen based
+    on highest address. Returns number of data bytes encoded"""
+    if not 0 < record_size <= 250:
+        raise Exception('Record size must be between 1 and 250')
+
+    # highest address is needed before first record is written
+    end = 0
+    if sections:
+        for Shdr in Elf.Shdr_table:
+            if int(Shdr.sh_flags) & int(SHF.SHF_ALLOC):
+                end = max(end, Shdr.sh_addr + Shdr.sh_size)
+    else:
+        for addr, Phdr in makeelf.flat.loads(Elf, physical):
+            end = max(end, addr + Phdr.p_filesz)
+    end = max(end - 1, Elf.Ehdr.e_entry)
+    if end >= 1 << 32:
+        raise Exception('Address 0x%x does not fit in S-record' % end)
+    addr_len = 2 if end < 1 << 16 else 3 if end < 1 << 24 else 4
+    data_type, end_type = _SREC_DATA[addr_len]
+
+    fp.write(_srec_record(b'S0', 0, 2, header))
+    total = 0
+    count = 0
+    for addr, chunk in _data(Elf, sections, physical):
+        chunk = bytes(chunk)
+        hexdata = chunk.hex().upper().encode()
+        lines = []
+        for off in range(0, len(chunk), record_size):
+            size = min(record_size, len(chunk) - off)
+            head = (addr_len + size + 1).to_bytes(1, 'big') + \
+                    (addr + off).to_bytes(addr_len, 'big')
+            checksum = sum(head) + sum(chunk[off:off + size])
+            lines.append(b'%s%s%s%02X\n' % (data_type, head.hex().upper(
+                ).encode(), hexdata[2 * off:2 * (off + size)],
+                ~checksum & 0xff))
+        fp.write(b''.join(lines))
+        total += len(chunk)
+        count += len(lines)
+
+    # record count, S5 or S6 depending on its size
+    if count < 1 << 16:
+        fp.write(_srec_record(b'S5', count, 2))
+    elif count < 1 << 24:
+        fp.write(_srec_record(b'S6', count, 3))
+    fp.write(_srec_record(end_type, Elf.Ehdr.e_entry, addr_len))
+    return total
+
+
+class _Blocks:
+    """Collects data records into contiguous blocks"""
+
+    def __init__(self):
+        self.blocks = []
+        self.start = None
+        self.data = None
+
+    def add(self, addr, data):
+        if self.start is not None and addr == self.start + len(self.data):
+            self.data += data
+            return
+        self.flush()
+        self.start = addr
+        self.data = bytearray(data)
+
+    def flush(self):
+        if self.start is not None:
+            self.blocks.append((self.start, self.data))
+        self.start = None
+
+    def merged(self):
+        """Returns sorted list of (address, bytes) of non-overlapping blocks
+
+        Where blocks overlap, the one starting at higher address, or read later
+        if both start at the same address, wins"""
+        self.flush()
+        ret = []
+        for _, (start, data) in sorted(enumerate(self.blocks),
+                key=lambda b: (b[1][0], b[0])):
+            if len(ret) > 0 and start <= ret[-1][0] + len(ret[-1][1]):
+                prev_start, prev = ret[-1]
+                off = start - prev_start
+                tail = prev[off + len(data):]
+                ret[-1] = (prev_start, prev[:off] + data + tail)
+            else:
+                ret.append((start, bytearray(data)))
+        return [(start, bytes(data)) for start, data in ret]
+
+
+def _to_elf(blocks, entry, **kwargs):
+    kwargs.setdefault('e_data', ELFDATA.ELFDATA2LSB)
+    elf = ELF(e_type=ET.ET_EXEC, **kwargs)
+    flags = int(SHF.SHF_ALLOC) | int(SHF.SHF_WRITE) | int(SHF.SHF_EXECINSTR)
+    for i, (addr, data) in enumerate(blocks.merged()):
+        sec_id = elf._append_section('.sec%d' % (i + 1), data, addr,
+                sh_flags=flags)
+        elf.append_segment(sec_id)
+    elf.Elf.Ehdr.e_entry = entry
+    return elf
+
+
+def _lines(fp):
+    for lineno, line in enumerate(fp, 1):
+        if isinstance(line, bytes):
+            line = line.decode('ascii')
+        line = line.strip()
+        if len(line) > 0:
+            yield lineno, line
+
+
+def read_ihex(fp, **kwargs):
+    """Builds ELF from Intel HEX file object fp
+
+    Keyword arguments are passed to ELF constructor, e.g. e_machine"""
+    blocks = _Blocks()
+    base = 0
+    entry = 0
+    for lineno, line in _lines(fp):
+        if line[0] != ':':
+            raise Exception('Line %d: not an Intel HEX record' % lineno)
+        rec = bytes.fromhex(line[1:])
+        if len(rec) < 5 or len(rec) != rec[0] + 5 or sum(rec) & 0xff != 0:
+            raise Exception('Line %d: malformed record' % lineno)
+        rtype = rec[3]
+        data = rec[4:-1]
+        if rtype == 0:
+            blocks.add(base + ((rec[1] << 8) | rec[2]), data)
+        elif rtype == 1:
+            break
+        elif rtype == 2:
+            base = int.from_bytes(data, 'big') << 4
+        elif rtype == 4:
+            base = int.from_bytes(data, 'big') << 16
+        elif rtype == 3:
+            cs, ip = data[:2], data[2:]
+            entry = (int.from_bytes(cs, 'big') << 4) + int.from_bytes(ip,
+                    'big')
+        elif rtype == 5:
+            entry = int.from_bytes(data, 'big')
+        else:
+            raise Exception('Line %d: unknown record type %d' % (lineno,
+                rtype))
+    return _to_elf(blocks, entry, **kwargs)
+
+
+## Address length of S-record types carrying data or entry point
+_SREC_ADDR = {'1': 2, '2': 3, '3': 4, '7': 4, '8': 3, '9': 2}
+
+
+def read_srec(fp, **kwargs):
+    """Builds ELF from Motorola S-record file object fp
+
+    Keyword arguments are passed to ELF constructor, e.g. e_machine"""
+    blocks = _Blocks()
+    entry = 0
+    for lineno, line in _lines(fp):
+        if line[0] != 'S' or len(line) < 4:
+            raise Exception('Line %d: not an S-record' % lineno)
+        rtype = line[1]
+        rec = bytes.fromhex(line[2:])
+        if len(rec) != rec[0] + 1 or sum(rec) & 0xff != 0xff:
+            raise Exception('Line %d: malformed record' % lineno)
+        if rtype in ['0', '5', '6']:
+            continue
+        if rtype not in _SREC_ADDR:
+            raise Exception('Line %d: unknown record type S%s' % (lineno,
+                rtype))
+        addr_len = _SREC_ADDR[rtype]
+        addr = int.from_bytes(rec[1:1 + addr_len], 'big')
+        if rtype in ['1', '2', '3']:
+            blocks.add(addr, rec[1 + addr_len:-1])
+        else:
+            entry = addr
+    return _to_elf(blocks, entry, **kwargs)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+## \file layout.py
+#  \brief Placement of sections and segments in file
+#  \details Sections are placed in order of section headers, honoring
+#  sh_addralign. Sections mapped by PT_LOAD segment are placed together, at
+#  the same distances as in memory, so that offset of segment is congruent to
+#  its virtual address modulo p_align. SHT_NOBITS sections take no space in
+#  file. Whole plan is computed in O(n log n) time
+from heapq import heappush, heappop
+from makeelf.elfstruct import *
+
+
+def _align(off, alignment):
+    """Rounds off up to multiple of alignment"""
+    if alignment <= 1:
+        return off
+    return off + (-off % alignment)
+
+
+def _congruent(off, addr, alignment):
+    """Returns smallest offset not lower than off, congruent to addr"""
+    if alignment <= 1:
+        return off
+    return off + (addr - off) % alignment
+
+
+def _is_mapped(Shdr):
+    """True if section occupies memory, so it can be member of a segment"""
+    if Shdr.sh_type == SHT.SHT_NULL:
+        return False
+    return Shdr.sh_addr != 0 or int(Shdr.sh_flags) & int(SHF.SHF_ALLOC) != 0
+
+
+def members(Elf):
+    """Finds sections described by every segment
+
+    Section belongs to segment if its address is in range of segment
+    addresses. Returns list of lists of section indexes, sorted by address, one
+    list for each program header"""
+    ret = [[] for _ in Elf.Phdr_table]
+    segments = sorted((Phdr.p_vaddr, Phdr.p_vaddr + Phdr.p_memsz, i) for i, Phdr
+            in enumerate(Elf.Phdr_table) if Phdr.p_memsz > 0)
+    sections = sorted((Shdr.sh_addr, idx) for idx, Shdr in
+            enumerate(Elf.Shdr_table) if _is_mapped(Shdr))
+
+    # sweep through addresses, keeping heap of segments covering current one,
+    # ordered by their end
+    active = []
+    pos = 0
+    for addr, idx in sections:
+        while pos < len(segments) and segments[pos][0] <= addr:
+            _, seg_end, i = segments[pos]
+            heappush(active, (seg_end, i))
+            pos += 1
+        while len(active) > 0 and active[0][0] <= addr:
+            heappop(active)
+        for _, i in active:
+            ret[i].append(idx)
+    return ret
+
+
+def plan(Elf, cursor):
+    """Sets sh_offset and sh_size of sections and p_offset, p_filesz and
+    p_memsz of segments containing sections
+
+    Sections are placed starting from cursor. Returns offset of end of last
+    section in file"""
+    Shdr_table = Elf.Shdr_table
+    Phdr_table = Elf.Phdr_table
+    nobits = SHT.SHT_NOBITS
+
+    # update sizes, SHT_NOBITS sections keep their size, as content of such
+    # section is not stored in file
+    for i, Shdr in enumerate(Shdr_table):
+        if Shdr.sh_type != nobits:
+            Shdr.sh_size = len(Elf.sections[i])
+
+    segment_members = members(Elf)
+
+    # every section is placed by the first PT_LOAD, that contains it
+    loader = {}
+    for i, Phdr in enumerate(Phdr_table):
+        if Phdr.p_type == PT.PT_LOAD:
+            for idx in segment_members[i]:
+                loader.setdefault(idx, i)
+
+    placed = set()
+    end = cursor
+    for idx, Shdr in enumerate(Shdr_table):
+        if idx in placed:
+            continue
+        if idx not in loader:
+            cursor = _align(cursor, Shdr.sh_addralign)
+            Shdr.sh_offset = cursor
+            if Shdr.sh_type != nobits:
+                cursor += Shdr.sh_size
+            end = max(end, cursor)
+            placed.add(idx)
+            continue
+
+        # place all sections loaded by the same segment at once, keeping their
+        # distances from memory
+        Phdr = Phdr_table[loader[idx]]
+        group = [i for i in segment_members[loader[idx]] if i not in placed and
+                loader[i] == loader[idx]]
+        first = Shdr_table[group[0]]
+        alignment = max([int(Phdr.p_align)] + [int(Shdr_table[i].sh_addralign)
+            for i in group])
+        base = _congruent(cursor, first.sh_addr, alignment)
+        for i in group:
+            member = Shdr_table[i]
+            member.sh_offset = max(base + member.sh_addr - first.sh_addr,
+                    cursor)
+            if member.sh_type != nobits:
+                cursor = member.sh_offset + member.sh_size
+            placed.add(i)
+        end = max(end, cursor)
+
+    # derive file ranges of segments from their sections
+    for i, Phdr in enumerate(Phdr_table):
+        group = segment_members[i]
+        if len(group) == 0:
+            continue
+        first = Shdr_table[group[0]]
+        p_offset = first.sh_offset - (first.sh_addr - Phdr.p_vaddr)
+        if p_offset < 0:
+            p_offset = first.sh_offset
+        Phdr.p_offset = p_offset
+        filesz = 0
+        memsz = 0
+        for idx in group:
+            member = Shdr_table[idx]
+            memsz = max(memsz, member.sh_addr + member.sh_size - Phdr.p_vaddr)
+            if member.sh_type != nobits:
+                filesz = max(filesz, member.sh_offset + member.sh_size -
+                        p_offset)
+        Phdr.p_filesz = filesz
+        Phdr.p_memsz = max(Phdr.p_memsz, memsz)
+    return end
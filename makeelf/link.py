@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+## \file link.py
+#  \brief Merging of relocatable objects, like ld -r
+#  \details Sections of the same name are concatenated, honoring their
+#  alignment. Data is collected as views of input contents and joined once
+#  per output section. Local symbols of all inputs are kept, global symbols are
+#  resolved by name and relocations are rebased and renumbered
+import os
+from makeelf.elf import *
+from makeelf.digest import section_bytes
+
+## Types of sections, that are rebuilt instead of concatenated
+#  \details Section groups are dropped, so members of COMDAT groups are
+#  concatenated like other sections
+_REBUILT = [SHT.SHT_NULL, SHT.SHT_SYMTAB, SHT.SHT_STRTAB, SHT.SHT_REL,
+        SHT.SHT_RELA, SHT.SHT_GROUP, SHT.SHT_SYMTAB_SHNDX]
+
+_LORESERVE = SHN.SHN_LORESERVE.value
+
+
+class _Output:
+    """Output section, collecting parts of input sections"""
+
+    def __init__(self, index, name, Shdr, placement):
+        self.index = index
+        self.name = name
+        self.sh_type = Shdr.sh_type
+        self.sh_flags = int(Shdr.sh_flags)
+        self.sh_addralign = max(int(Shdr.sh_addralign), 1)
+        self.sh_entsize = Shdr.sh_entsize
+        self.sh_link = Shdr.sh_link
+        # placement of sections of object, this section comes from first
+        self.placement = placement
+        self.parts = []
+        self.size = 0
+
+    def add(self, Shdr, content):
+        """Appends content of input section, returns its offset"""
+        align = max(int(Shdr.sh_addralign), 1)
+        off = self.size + (-self.size % align)
+        if self.sh_type != SHT.SHT_NOBITS:
+            if off > self.size:
+                self.parts.append(bytes(off - self.size))
+            self.parts.append(content)
+            self.size = off + len(content)
+        else:
+            self.size = off + Shdr.sh_size
+        self.sh_flags |= int(Shdr.sh_flags)
+        self.sh_addralign = max(self.sh_addralign, align)
+        return off
+
+
+def _load(obj):
+    if isinstance(obj, ELF):
+        return obj
+    if isinstance(obj, (str, os.PathLike)):
+        return ELF.from_file(obj)[0]
+    return ELF.from_bytes(obj)[0]
+
+
+def _view(section):
+    if isinstance(section, (bytes, bytearray)):
+        return memoryview(section)
+    if isinstance(section, memoryview):
+        return section
+    return memoryview(bytes(section))
+
+
+def _table(Elf, idx, cls):
+    b = section_bytes(Elf, idx)
+    entsize = Elf.Shdr_table[idx].sh_entsize or len(cls())
+    return cls.table_from_bytes(b, 0, len(b) // entsize, Elf.little, entsize)
+
+
+def _name(strtab, off):
+    end = strtab.find(b'\0', off)
+    return strtab[off:end if end != -1 else None]
+
+
+def _check(objects):
+    first = objects[0]
+    for i, elf in enumerate(objects):
+        Ehdr = elf.Elf.Ehdr
+        if int(Ehdr.e_type) != ET.ET_REL.value:
+            raise Exception('Object %d is not relocatable' % i)
+        if elf.Elf.bits != first.Elf.bits or elf.little != first.little:
+            raise Exception('Object %d differs in class or endianness' % i)
+        if int(Ehdr.e_machine) != int(first.Elf.Ehdr.e_machine):
+            raise Exception('Object %d is for different machine' % i)
+
+
+def _resolve(existing, name, sym):
+    """Returns symbol, that wins between already known and new one"""
+    if existing is None:
+        return sym
+    shndx = int(sym.st_shndx)
+    old_shndx = int(existing.st_shndx)
+    weak = sym.st_info >> 4 == STB.STB_WEAK.value
+    old_weak = existing.st_info >> 4 == STB.STB_WEAK.value
+    if shndx == SHN.SHN_UNDEF.value:
+        # strong reference wins over weak one
+        if old_shndx == SHN.SHN_UNDEF.value and old_weak and not weak:
+            return sym
+        return existing
+    if old_shndx == SHN.SHN_UNDEF.value:
+        return sym
+    if shndx == SHN.SHN_COMMON.value:
+        if old_shndx == SHN.SHN_COMMON.value:
+            # largest size and alignment of all common symbols
+            existing.st_size = max(existing.st_size, sym.st_size)
+            existing.st_value = max(existing.st_value, sym.st_value)
+        return existing
+    if old_shndx == SHN.SHN_COMMON.value:
+        return sym
+    if not weak and not old_weak:
+        raise Exception('Multiple definition of %s' % name.decode('utf-8',
+            'replace'))
+    return sym if old_weak and not weak else existing
+
+
+def merge(objects):
+    """Merges relocatable objects into single relocatable ELF object
+
+    objects is iterable of ELF objects, file names or bytes. All of them have
+    to be ET_REL objects of the same class, endianness and machine. Returns
+    new ELF object"""
+    objects = [_load(obj) for obj in objects]
+    if len(objects) == 0:
+        raise Exception('No objects to merge')
+    _check(objects)
+    first = objects[0]
+    ret = ELF(e_class=ELFCLASS(first.Elf.Ehdr.e_ident.EI_CLASS),
+            e_data=ELFDATA(first.Elf.Ehdr.e_ident.EI_DATA), e_type=ET.ET_REL,
+            e_machine=first.Elf.Ehdr.e_machine)
+    ret.Elf.Ehdr.e_flags = first.Elf.Ehdr.e_flags
+    Sym = ret._Sym_class()
+    bits = ret.Elf.bits
+
+    # place input sections in output sections
+    outputs = {}
+    order = []
+    placements = []
+    for elf in objects:
+        names = elf.get_section_names()
+        placement = {}
+        for i, Shdr in enumerate(elf.Elf.Shdr_table):
+            if Shdr.sh_type in _REBUILT:
+                continue
+            out = outputs.get(names[i])
+            if out is None:
+                out = outputs[names[i]] = _Output(len(order), names[i],
+                        Shdr, placement)
+                order.append(out)
+            elif out.sh_type != Shdr.sh_type:
+                raise Exception('Section %s has conflicting types %s and %s'
+                        % (names[i], out.sh_type, Shdr.sh_type))
+            content = b''
+            if Shdr.sh_type != SHT.SHT_NOBITS:
+                content = _view(elf.Elf.sections[i])
+            placement[i] = (out.index, out.add(Shdr, content))
+        placements.append(placement)
+
+    # symbol indexes are: null symbol, one section symbol per output section,
+    # other local symbols and resolved global symbols
+    local_syms = []
+    helpers = {}
+    global_syms = {}
+    sym_maps = []
+    for elf, placement in zip(objects, placements):
+        sym_map = {}
+        for i, Shdr in enumerate(elf.Elf.Shdr_table):
+            if Shdr.sh_type != SHT.SHT_SYMTAB:
+                continue
+            strtab = section_bytes(elf.Elf, Shdr.sh_link)
+            mapping = [None]
+            for sym in _table(elf.Elf, i, Sym)[1:]:
+                name = _name(strtab, sym.st_name)
+                shndx = int(sym.st_shndx)
+                where = None
+                section = sym.st_info & 0xf == STT.STT_SECTION.value
+                if 0 < shndx < _LORESERVE:
+                    if shndx not in placement and section:
+                        # e.g. symbol of section group
+                        mapping.append(('section', None))
+                        continue
+                    if shndx not in placement:
+                        raise Exception('Symbol %s defined in section, that '
+                                'cannot be merged' % name.decode('utf-8',
+                                    'replace'))
+                    where = placement[shndx]
+                    sym.st_value += where[1]
+                out_sym = Sym(0, sym.st_value, sym.st_size, sym.st_info,
+                        sym.st_other, shndx, little=ret.little)
+                if section:
+                    mapping.append(('section', where))
+                elif sym.st_info >> 4 == STB.STB_LOCAL.value:
+                    mapping.append(('local', len(local_syms)))
+                    local_syms.append((name, out_sym, where))
+                else:
+                    prev = global_syms.get(name)
+                    winner = _resolve(prev[0] if prev is not None else None,
+                            name, out_sym)
+                    if winner is out_sym:
+                        global_syms[name] = (out_sym, where)
+                    mapping.append(('global', name))
+            sym_map[i] = mapping
+        sym_maps.append(sym_map)
+
+    # relocations are rebased and collected per target output section
+    relocations = {}
+    for elf, placement, sym_map in zip(objects, placements, sym_maps):
+        for i, Shdr in enumerate(elf.Elf.Shdr_table):
+            if Shdr.sh_type not in [SHT.SHT_REL, SHT.SHT_RELA] or \
+                    Shdr.sh_info not in placement:
+                continue
+            rela = Shdr.sh_type == SHT.SHT_RELA
+            if rela:
+                Rel = Elf64_Rela if bits == 64 else Elf32_Rela
+            else:
+                Rel = Elf64_Rel if bits == 64 else Elf32_Rel
+            target, base = placement[Shdr.sh_info]
+            mapping = sym_map.get(Shdr.sh_link)
+            entries = relocations.setdefault((target, rela), [])
+            for rel in _table(elf.Elf, i, Rel):
+                rel.r_offset += base
+                rel.little = ret.little
+                ref = None
+                if rel.r_sym != 0:
+                    if mapping is None:
+                        raise Exception('Relocations without symbol table')
+                    kind, value = mapping[rel.r_sym]
+                    if kind == 'section' and value is None:
+                        raise Exception('Relocation refers to section, that '
+                                'cannot be merged')
+                    if kind == 'section' and rela:
+                        # offset of input section goes to addend
+                        rel.r_addend += value[1]
+                        kind, value = 'section', (value[0], 0)
+                    if kind == 'section' and value[1] != 0:
+                        # implicit addend cannot be adjusted, so relocation
+                        # refers to local symbol at start of input section
+                        if value not in helpers:
+                            helpers[value] = len(local_syms)
+                            local_syms.append((b'', Sym(0, value[1], 0, 0, 0,
+                                0, little=ret.little), value))
+                        kind, value = 'local', helpers[value]
+                    ref = (kind, value)
+                entries.append((rel, ref))
+
+    relocations = {key: entries for key, entries in relocations.items() if
+            len(entries) > 0}
+
+    # final symbol indexes
+    first_local = 1 + len(order)
+    first_global = first_local + len(local_syms)
+    global_index = {name: first_global + i for i, name in
+            enumerate(global_syms)}
+
+    def sym_index(ref):
+        kind, value = ref
+        if kind == 'section':
+            return 1 + value[0]
+        if kind == 'local':
+            return first_local + value
+        return global_index[value]
+
+    # output sections, relocations, then symbol and string tables
+    sec_base = len(ret.Elf.Shdr_table)
+    symtab_id = sec_base + len(order) + len(relocations) + 1
+    for out in order:
+        data = b''.join(out.parts)
+        sec_id = ret._append_section(out.name, data, 0, sh_type=out.sh_type,
+                sh_flags=out.sh_flags, sh_addralign=out.sh_addralign,
+                sh_entsize=out.sh_entsize)
+        if out.sh_type == SHT.SHT_NOBITS:
+            ret.Elf.Shdr_table[sec_id].sh_size = out.size
+    for (target, rela), entries in sorted(relocations.items()):
+        for rel, ref in entries:
+            if ref is not None:
+                rel.r_sym = sym_index(ref)
+        Rel = type(entries[0][0])
+        ret._append_section(('.rela' if rela else '.rel') +
+                order[target].name, b''.join(bytes(rel) for rel, _ in
+                    entries), 0, sh_type=SHT.SHT_RELA if rela else SHT.SHT_REL,
+                sh_flags=int(SHF.SHF_INFO_LINK), sh_link=symtab_id,
+                sh_info=sec_base + target, sh_addralign=bits // 8,
+                sh_entsize=len(Rel()))
+
+    ret.append_special_section('.strtab')
+    ret.append_special_section('.symtab')
+    strtab = ret.Elf.sections[symtab_id - 1]
+    symtab = ret.Elf.sections[symtab_id]
+    for i in range(len(order)):
+        symtab.lst.append(Sym(0, 0, 0, STT.STT_SECTION.value, 0, sec_base + i,
+            little=ret.little))
+    symbols = [(name, sym, where) for name, sym, where in local_syms] + \
+            [(name, sym, where) for name, (sym, where) in global_syms.items()]
+    for name, sym, where in symbols:
+        if len(name) > 0:
+            sym.st_name = strtab.append(name)
+        if where is not None:
+            sym.st_shndx = sec_base + where[0]
+        symtab.lst.append(sym)
+    ret.Elf.Shdr_table[symtab_id].sh_info = first_global
+
+    # sections linked to other sections, e.g. SHF_LINK_ORDER ones
+    for i, out in enumerate(order):
+        if out.sh_link in out.placement:
+            ret.Elf.Shdr_table[sec_base + i].sh_link = sec_base + \
+                    out.placement[out.sh_link][0]
+    return ret
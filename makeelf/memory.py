@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+## \file memory.py
+#  \brief Memory footprint of ELF objects
+#  \details Sizes are measured with sys.getsizeof, so they describe memory held
+#  by Python objects, not counting allocator overhead. Objects referenced from
+#  many places are counted once
+import sys
+from enum import Enum
+
+## Kinds of section contents
+#  \details owned is bytes or bytearray held only by the section, borrowed is
+#  memoryview of larger buffer, lazy is content not read from file yet, handler
+#  is structured object, e.g. symbol table or compressed section, shared is
+#  object already counted for other section and other is any other type
+KINDS = ('owned', 'borrowed', 'lazy', 'handler', 'shared', 'other')
+
+
+class _Counter:
+    """Sums sizes of objects, counting every object only once"""
+
+    def __init__(self):
+        self.seen = set()
+
+    def size(self, obj):
+        # classes, enum members and singletons are shared by everyone
+        if id(obj) in self.seen or obj is None or isinstance(obj, (type,
+            Enum, bool)):
+            return 0
+        self.seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    def deep(self, obj):
+        """Size of object, its attributes and items of containers"""
+        ret = self.size(obj)
+        if ret == 0:
+            return 0
+        if isinstance(obj, (list, tuple)):
+            for item in obj:
+                ret += self.deep(item)
+        elif isinstance(obj, dict):
+            for key, value in obj.items():
+                ret += self.deep(key) + self.deep(value)
+        elif hasattr(obj, '__dict__'):
+            ret += self.deep(obj.__dict__)
+        return ret
+
+
+def _names(Elf, Shdr_table):
+    """Returns names of sections, without loading or decoding anything"""
+    from makeelf.elf import _FileSection
+
+    shstrndx = Elf.Ehdr.e_shstrndx
+    if shstrndx >= len(Elf.sections):
+        return [''] * len(Shdr_table)
+    shstrtab = Elf.sections[shstrndx]
+    if isinstance(shstrtab, _FileSection) and shstrtab.blob is None:
+        shstrtab = shstrtab.pread(len(shstrtab))
+    else:
+        shstrtab = bytes(shstrtab)
+    names = []
+    for Shdr in Shdr_table:
+        end = shstrtab.find(b'\0', Shdr.sh_name)
+        names.append(shstrtab[Shdr.sh_name:end if end != -1 else
+            None].decode('utf-8', 'replace'))
+    return names
+
+
+def report(elf):
+    """Returns breakdown of memory held by ELF object
+
+    Result is a dict with sizes in bytes of headers, section contents by kind,
+    buffers kept alive by borrowed views, caches, duplicated section data and
+    total of all of them. Under 'sections' key there is list of (index, name,
+    kind, size) tuples"""
+    from makeelf.elf import _Strtab, _Symtab, _FileSection, \
+            _CompressedSection
+
+    counter = _Counter()
+    Elf = elf.Elf
+
+    # header objects, including their attribute values, tables not decoded
+    # yet, e.g. of clones, are counted as their packed form
+    headers = counter.deep(Elf.Ehdr)
+    packed = Elf.__dict__.get('_packed', {})
+    tables = {}
+    for name, cls in [('Phdr_table', Elf.Phdr_class), ('Shdr_table',
+        Elf.Shdr_class)]:
+        if name in packed:
+            b = packed[name]
+            headers += counter.size(b)
+            # decoded only to be read here, object is left as it was
+            tables[name] = cls.table_from_bytes(b, 0, len(b) // len(cls()),
+                    Elf.little)
+            continue
+        tables[name] = Elf.__dict__[name]
+        headers += counter.size(tables[name])
+        for hdr in tables[name]:
+            headers += counter.deep(hdr)
+
+    kinds = dict.fromkeys(KINDS, 0)
+    buffers = 0
+    duplicated = 0
+    contents = {}
+    sections = []
+    names = _names(Elf, tables['Shdr_table'])
+    counter.size(Elf.sections)
+    for i, section in enumerate(Elf.sections):
+        if isinstance(section, (bytes, bytearray)) and len(section) == 0:
+            # empty bytes object is shared by everyone
+            kind, size = 'owned', 0
+        elif id(section) in counter.seen:
+            kind, size = 'shared', 0
+        elif isinstance(section, (bytes, bytearray)):
+            kind, size = 'owned', counter.size(section)
+            # equal content held in two different objects is duplicated
+            if len(section) > 0:
+                key = bytes(section)
+                if key in contents:
+                    duplicated += size
+                else:
+                    contents[key] = i
+        elif isinstance(section, memoryview):
+            kind, size = 'borrowed', counter.size(section)
+            buffers += counter.size(section.obj)
+        elif isinstance(section, _FileSection):
+            kind, size = 'lazy', counter.deep(section)
+        elif isinstance(section, (_Strtab, _Symtab, _CompressedSection,
+            list)):
+            kind, size = 'handler', counter.deep(section)
+        else:
+            kind, size = 'other', counter.deep(section)
+        kinds[kind] += size
+        sections.append((i, names[i] if i < len(names) else '', kind, size))
+
+    # caches refer to immutable contents only, so they hold digests and
+    # decoded columns
+    caches = counter.deep(Elf._digests) + counter.deep(Elf._columns)
+
+    total = headers + sum(kinds.values()) + buffers + caches
+    return {
+            'headers': headers,
+            'contents': kinds,
+            'buffers': buffers,
+            'caches': caches,
+            'duplicated': duplicated,
+            'total': total,
+            'sections': sections,
+            }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+## \file mutate.py
+#  \brief Field-level mutation of serialized ELF files, e.g. for fuzzing
+#  \details Seed object is serialized and parsed once, then location of every
+#  header and symbol field is recorded. Mutants are produced by patching copies
+#  of that buffer, so no ELF object is built or serialized per mutant
+import random
+from struct import calcsize
+from collections import namedtuple
+from makeelf.elf import *
+
+## \class Field
+#  \brief Location of single field in serialized file
+#  \details struct is name of structure, e.g. 'Shdr', index is position of
+#  structure in its table (0 for Ehdr), name is name of field, offset is
+#  location of field in file and size is its size in bytes
+Field = namedtuple('Field', ['struct', 'index', 'name', 'offset', 'size'])
+
+## Fields, that point to other locations in file
+OFFSET_FIELDS = ('e_phoff', 'e_shoff', 'p_offset', 'sh_offset')
+
+## Fields, that count entries of tables
+COUNT_FIELDS = ('e_phnum', 'e_shnum', 'e_shstrndx', 'sh_link', 'sh_info',
+        'st_shndx')
+
+
+class Mutator:
+    """Produces mutants of a seed ELF file"""
+
+    ##
+    # \brief The constructor
+    #
+    # \param seed ELF object or bytes of serialized file
+    # \param rng instance of random.Random used by \link mutants \endlink
+    def __init__(self, seed, rng=None):
+        if not isinstance(seed, (bytes, bytearray)):
+            seed = bytes(seed)
+        ## Serialized seed, every mutant is a patched copy of it
+        self.seed = bytes(seed)
+        self.rng = rng if rng is not None else random.Random()
+
+        elf, _ = ELF.from_bytes(self.seed)
+        Elf = elf.Elf
+        self.little = elf.little
+        self._byteorder = 'little' if self.little else 'big'
+        bits = Elf.bits
+        Ehdr = Elf.Ehdr
+
+        ## List of \link Field \endlink tuples of every known field
+        self.fields = []
+        self._add('Ehdr', 0, Ehdr.layout, bits, len(Ehdr.e_ident))
+        for i in range(Ehdr.e_phnum):
+            self._add('Phdr', i, Elf.Phdr_class.layout, bits,
+                    Ehdr.e_phoff + i * Ehdr.e_phentsize)
+        for i in range(Ehdr.e_shnum):
+            self._add('Shdr', i, Elf.Shdr_class.layout, bits,
+                    Ehdr.e_shoff + i * Ehdr.e_shentsize)
+
+        Sym = elf._Sym_class()
+        for Shdr in Elf.Shdr_table:
+            if Shdr.sh_type not in [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]:
+                continue
+            entsize = Shdr.sh_entsize or len(Sym())
+            for i in range(Shdr.sh_size // entsize):
+                self._add('Sym', i, Sym.layout, bits,
+                        Shdr.sh_offset + i * entsize)
+
+        # locations of structures, used for overlapping offsets
+        self._targets = sorted(set([0, Ehdr.e_phoff, Ehdr.e_shoff] +
+            [Shdr.sh_offset for Shdr in Elf.Shdr_table] +
+            [len(self.seed), len(self.seed) - 1]))
+        self._counts = {'Phdr': Ehdr.e_phnum, 'Shdr': Ehdr.e_shnum}
+
+    def _add(self, struct, index, layout, bits, base):
+        for name in layout.names(bits):
+            off, fmt = layout.field(name, bits)
+            size = calcsize('<' + fmt)
+            # skip fields that are not entirely inside the file
+            if base + off + size <= len(self.seed):
+                self.fields.append(Field(struct, index, name, base + off,
+                    size))
+
+    ## Find fields by structure and name
+    #  \param struct name of structure, e.g. 'Shdr', or None for any
+    #  \param name name of field, e.g. 'sh_offset', or None for any
+    #  \returns list of matching \link Field \endlink tuples
+    def find(self, struct=None, name=None):
+        return [f for f in self.fields if (struct is None or
+            f.struct == struct) and (name is None or f.name == name)]
+
+    ## Interesting values of field
+    #  \details Boundary values for field width, other structure locations for
+    #  offset fields and slightly too large values for count fields
+    #  \param field instance of \link Field \endlink
+    #  \returns list of ints
+    def values(self, field):
+        top = (1 << (8 * field.size)) - 1
+        half = top >> 1
+        ret = [0, 1, top, top - 1, half, half + 1]
+        if field.name in OFFSET_FIELDS:
+            ret += self._targets
+        if field.name in COUNT_FIELDS:
+            count = self._counts['Phdr' if field.name == 'e_phnum' else 'Shdr']
+            ret += [count, count + 1, count * 2 + 1]
+        ret = [v & top for v in ret]
+        # remove duplicates, keeping order deterministic
+        return list(dict.fromkeys(ret))
+
+    ## Patch buffer in place
+    #  \param buf bytearray with serialized file
+    #  \param field instance of \link Field \endlink
+    #  \param value new value of the field, truncated to field width
+    #  \returns buf
+    def patch(self, buf, field, value):
+        value &= (1 << (8 * field.size)) - 1
+        buf[field.offset:field.offset + field.size] = value.to_bytes(
+                field.size, self._byteorder)
+        return buf
+
+    ## Create single mutant
+    #  \param mutations iterable of (field, value) tuples
+    #  \returns bytes of mutated file
+    def mutate(self, mutations):
+        buf = bytearray(self.seed)
+        for field, value in mutations:
+            self.patch(buf, field, value)
+        return bytes(buf)
+
+    ## Every single-field mutant, in deterministic order
+    #  \param fields fields to mutate, defaults to every known field
+    #  \returns generator of (field, value, bytes) tuples
+    def exhaustive(self, fields=None):
+        seed = self.seed
+        for field in self.fields if fields is None else fields:
+            for value in self.values(field):
+                buf = bytearray(seed)
+                self.patch(buf, field, value)
+                yield field, value, bytes(buf)
+
+    ## Random mutants
+    #  \param count number of mutants to generate, None for infinite stream
+    #  \param depth maximal number of fields mutated in single mutant
+    #  \param fields fields to mutate, defaults to every known field
+    #  \returns generator of bytes
+    def mutants(self, count=None, depth=1, fields=None):
+        fields = self.fields if fields is None else list(fields)
+        if len(fields) == 0:
+            raise Exception('No fields to mutate')
+        values = [self.values(f) for f in fields]
+        rng = self.rng
+        seed = self.seed
+        generated = 0
+        while count is None or generated < count:
+            buf = bytearray(seed)
+            for _ in range(rng.randint(1, depth)):
+                i = rng.randrange(len(fields))
+                self.patch(buf, fields[i], rng.choice(values[i]))
+            yield bytes(buf)
+            generated += 1
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+## \file strip.py
+#  \brief Removal of sections and symbols
+#  \details Entries to remove are selected first, then every reference to
+#  section or symbol index is rewritten in a single pass over section headers,
+#  symbol tables, relocations and section groups, using maps of old indexes
+#  to new ones
+import struct
+from makeelf.elfstruct import *
+from makeelf.elfsect import *
+from makeelf.digest import section_bytes
+
+## Prefixes of names of sections removed when no sections are given
+DEBUG_PREFIXES = ('.debug', '.zdebug', '.line', '.stab', '.gnu.debuglto_')
+
+_RELOCATIONS = [SHT.SHT_REL, SHT.SHT_RELA]
+_SYMBOLS = [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]
+
+
+def _entry_class(Elf, Shdr, Sym):
+    if Shdr.sh_type in _SYMBOLS:
+        return Sym
+    if Shdr.sh_type == SHT.SHT_REL:
+        return Elf64_Rel if Elf.bits == 64 else Elf32_Rel
+    return Elf64_Rela if Elf.bits == 64 else Elf32_Rela
+
+
+def _table(Elf, idx, cls):
+    """Decodes table of entries of given class stored in section idx"""
+    b = section_bytes(Elf, idx)
+    entsize = Elf.Shdr_table[idx].sh_entsize or len(cls())
+    return cls.table_from_bytes(b, 0, len(b) // entsize, Elf.little, entsize)
+
+
+def _name(strtab, off):
+    end = strtab.find(b'\0', off)
+    return strtab[off:end if end != -1 else None]
+
+
+def _selected(elf, remove_sections):
+    names = elf.get_section_names()
+    if remove_sections is None:
+        return {i for i, name in enumerate(names) if
+                name.startswith(DEBUG_PREFIXES)}
+    ret = set()
+    for sec in remove_sections:
+        if isinstance(sec, str):
+            if sec not in names:
+                raise Exception('No section named %s' % sec)
+            sec = names.index(sec)
+        if not 0 <= sec < len(names):
+            raise Exception('No section with index %d' % sec)
+        ret.add(sec)
+    return ret
+
+
+def strip(elf, remove_sections=None, keep_symbols=None):
+    """Removes sections and symbols from ELF object
+
+    remove_sections is iterable of section names or indexes, by default debug
+    sections are removed. Relocation sections of removed sections are removed
+    too. If keep_symbols is iterable of names, only those symbols of SHT_SYMTAB
+    tables are kept, together with symbols used by relocations. Symbols
+    defined in removed sections are removed. SHT_DYNSYM entries are never
+    removed, as hash tables index them. Returns list mapping old section
+    indexes to new ones, with None for removed sections"""
+    Elf = elf.Elf
+    Shdr_table = Elf.Shdr_table
+    removed = _selected(elf, remove_sections)
+    if 0 in removed:
+        raise Exception('Null section cannot be removed')
+    if Elf.Ehdr.e_shstrndx in removed:
+        raise Exception('Section name table cannot be removed')
+    for i, Shdr in enumerate(Shdr_table):
+        if Shdr.sh_type in _RELOCATIONS and Shdr.sh_info in removed:
+            removed.add(i)
+    if keep_symbols is not None:
+        keep_symbols = {bytes(s, 'utf-8') if isinstance(s, str) else s for s
+                in keep_symbols}
+    elif len(removed) == 0:
+        return list(range(len(Shdr_table)))
+
+    sec_map = []
+    count = 0
+    for i in range(len(Shdr_table)):
+        if i in removed:
+            sec_map.append(None)
+        else:
+            sec_map.append(count)
+            count += 1
+    names = elf.get_section_names()
+    for i, Shdr in enumerate(Shdr_table):
+        if i not in removed and Shdr.sh_link in removed:
+            raise Exception('Section %s links to removed section %s' %
+                    (names[i], names[Shdr.sh_link]))
+
+    # symbols used by relocations and group signatures have to stay
+    Sym = elf._Sym_class()
+    tables = {}
+    used = {}
+    for i, Shdr in enumerate(Shdr_table):
+        if i in removed:
+            continue
+        if Shdr.sh_type in _RELOCATIONS:
+            tables[i] = _table(Elf, i, _entry_class(Elf, Shdr, Sym))
+            used.setdefault(Shdr.sh_link, set()).update(e.r_sym for e in
+                    tables[i])
+        elif Shdr.sh_type == SHT.SHT_GROUP:
+            used.setdefault(Shdr.sh_link, set()).add(Shdr.sh_info)
+
+    # filter symbols, remapping their section indexes on the way
+    sym_maps = {}
+    first_global = {}
+    for i, Shdr in enumerate(Shdr_table):
+        if i in removed or Shdr.sh_type not in _SYMBOLS:
+            continue
+        syms = _table(Elf, i, Sym)
+        strtab = section_bytes(Elf, Shdr.sh_link) if keep_symbols is not \
+                None else b''
+        needed = used.get(i, set())
+        mapping = [None] * len(syms)
+        kept = []
+        for j, sym in enumerate(syms):
+            shndx = int(sym.st_shndx)
+            defined = 0 < shndx < SHN.SHN_LORESERVE.value
+            if j > 0 and Shdr.sh_type == SHT.SHT_SYMTAB and j not in needed:
+                if defined and shndx in removed:
+                    continue
+                if keep_symbols is not None and \
+                        _name(strtab, sym.st_name) not in keep_symbols:
+                    continue
+            if defined:
+                if shndx in removed:
+                    if j in needed:
+                        raise Exception('Symbol %d of %s used by relocation '
+                                'is defined in removed section' % (j,
+                                    names[i]))
+                    shndx = 0
+                else:
+                    shndx = sec_map[shndx]
+                sym.st_shndx = shndx
+            mapping[j] = len(kept)
+            kept.append(sym)
+        sym_maps[i] = mapping
+        first_global[i] = sum(1 for m in mapping[:Shdr.sh_info] if m is not
+                None)
+        tables[i] = kept
+
+    # rewrite relocations and groups
+    for i, Shdr in enumerate(Shdr_table):
+        if i in removed:
+            continue
+        mapping = sym_maps.get(Shdr.sh_link)
+        if Shdr.sh_type in _RELOCATIONS and mapping is not None:
+            for e in tables[i]:
+                e.r_sym = mapping[e.r_sym]
+        elif Shdr.sh_type == SHT.SHT_GROUP:
+            fmt = '<I' if Elf.little else '>I'
+            words = [w for w, in struct.iter_unpack(fmt, section_bytes(Elf,
+                i))]
+            members = [sec_map[w] for w in words[1:] if sec_map[w] is not
+                    None]
+            tables[i] = b''.join(struct.pack(fmt, w) for w in [words[0]] +
+                    members)
+
+    # one pass over sections builds new tables
+    new_Shdr_table = []
+    new_sections = []
+    for i, Shdr in enumerate(Shdr_table):
+        if i in removed:
+            continue
+        if Shdr.sh_type in _SYMBOLS:
+            Shdr.sh_info = first_global[i]
+        elif Shdr.sh_type == SHT.SHT_GROUP:
+            # signature symbol
+            mapping = sym_maps.get(Shdr.sh_link)
+            if mapping is not None and Shdr.sh_info < len(mapping):
+                Shdr.sh_info = mapping[Shdr.sh_info]
+        elif Shdr.sh_type in _RELOCATIONS or int(Shdr.sh_flags) & \
+                int(SHF.SHF_INFO_LINK):
+            if 0 < Shdr.sh_info < len(sec_map):
+                Shdr.sh_info = sec_map[Shdr.sh_info]
+        if 0 < Shdr.sh_link < len(sec_map):
+            Shdr.sh_link = sec_map[Shdr.sh_link]
+
+        section = Elf.sections[i]
+        if i in tables:
+            content = tables[i]
+            if isinstance(content, list):
+                if hasattr(section, 'lst'):
+                    section.lst = content
+                else:
+                    section = b''.join(bytes(e) for e in content)
+            else:
+                section = content
+        new_Shdr_table.append(Shdr)
+        new_sections.append(section)
+
+    Elf.Shdr_table[:] = new_Shdr_table
+    Elf.sections[:] = new_sections
+    Elf.Ehdr.e_shstrndx = sec_map[Elf.Ehdr.e_shstrndx]
+    Elf._digests.clear()
+    Elf._columns.clear()
+    return sec_map
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+## \file strmerge.py
+#  \brief Contents of SHF_MERGE|SHF_STRINGS sections
+#  \details Equal strings are stored once, found through a hash table, and
+#  strings being suffix of another string are pointed into that string (tail
+#  merging). Suffixes are found by sorting strings by their reversed form, so
+#  whole merge takes O(n log n) time and content is joined once at the end
+from makeelf.elfstruct import *
+
+
+def _chars(s, entsize):
+    """Splits string into characters of entsize bytes"""
+    return [s[i:i + entsize] for i in range(0, len(s), entsize)]
+
+
+def _check(s, entsize):
+    if len(s) % entsize != 0:
+        raise Exception('Length of %r is not multiple of %d' % (s, entsize))
+    if entsize == 1:
+        if b'\0' in s:
+            raise Exception('String %r contains NUL character' % s)
+    elif bytes(entsize) in _chars(s, entsize):
+        raise Exception('String %r contains NUL character' % s)
+
+
+def split(blob, entsize=1):
+    """Splits content of string section into list of (offset, string) tuples
+
+    Strings are returned without terminating NUL character"""
+    blob = bytes(blob)
+    ret = []
+    if entsize == 1:
+        off = 0
+        while off < len(blob):
+            end = blob.find(b'\0', off)
+            if end < 0:
+                end = len(blob)
+            ret.append((off, blob[off:end]))
+            off = end + 1
+        return ret
+
+    nul = bytes(entsize)
+    start = 0
+    for off in range(0, len(blob) - len(blob) % entsize, entsize):
+        if blob[off:off + entsize] == nul:
+            ret.append((start, blob[start:off]))
+            start = off + entsize
+    if start < len(blob):
+        ret.append((start, blob[start:]))
+    return ret
+
+
+def merge(strings, entsize=1):
+    """Builds content of SHF_MERGE|SHF_STRINGS section
+
+    strings is iterable of str, encoded as UTF-8, or bytes, without
+    terminating NUL character. entsize is size of single character. Returns
+    tuple of content as bytes and list of offsets of strings, in order of
+    input"""
+    strings = [bytes(s, 'utf-8') if isinstance(s, str) else bytes(s) for s in
+            strings]
+    keys = list(dict.fromkeys(strings))
+    if entsize == 1:
+        # single scan of all strings is much cheaper than one per string
+        if b'\0' in b''.join(keys):
+            _check(next(s for s in keys if b'\0' in s), entsize)
+        rev = [s[::-1] for s in keys]
+    else:
+        for s in keys:
+            _check(s, entsize)
+        rev = [b''.join(reversed(_chars(s, entsize))) for s in keys]
+
+    # in descending order of reversed strings, suffix follows string it ends,
+    # or another suffix of that string
+    parent = list(range(len(keys)))
+    prev = None
+    for i in sorted(range(len(keys)), key=rev.__getitem__, reverse=True):
+        if prev is not None and rev[prev].startswith(rev[i]):
+            parent[i] = parent[prev]
+        else:
+            prev = i
+    del rev
+
+    # strings not merged into others are stored in order of first use
+    nul = bytes(entsize)
+    offsets = {}
+    parts = []
+    off = 0
+    for i, s in enumerate(keys):
+        if parent[i] == i:
+            offsets[s] = off
+            parts.append(s)
+            off += len(s) + entsize
+    for i, s in enumerate(keys):
+        p = parent[i]
+        if p != i:
+            offsets[s] = offsets[keys[p]] + len(keys[p]) - len(s)
+
+    parts.append(b'')
+    return nul.join(parts), [offsets[s] for s in strings]
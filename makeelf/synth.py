@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+## \file synth.py
+#  \brief Deterministic generator of synthetic ELF files
+#  \details Generated files are built with regular \link elf.ELF \endlink
+#  interface, so they look like files created by users of the library. The same
+#  parameters and seed always produce the same file. Large section contents are
+#  generated lazily and can be streamed to file without holding them in memory
+import random
+from makeelf.elf import *
+
+## Size of chunks of \link Pattern \endlink contents
+CHUNK = 1 << 20
+
+
+def _randbytes(rng, n):
+    """Returns n random bytes, like Random.randbytes of Python 3.9"""
+    if n == 0:
+        return b''
+    return rng.getrandbits(8 * n).to_bytes(n, 'little')
+
+
+class Pattern:
+    """Lazily generated pseudo-random section content
+
+    Content is generated from seed chunk by chunk, so it can be written out
+    with ELF.write without being held in memory"""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+
+    def __repr__(self):
+        return '%s(%d, %d)' % (type(self).__name__, self.size, self.seed)
+
+    def __len__(self):
+        return self.size
+
+    def __bytes__(self):
+        return b''.join(self.chunks())
+
+    def chunks(self, size=CHUNK):
+        """Yields content in pieces of at most size bytes"""
+        rng = random.Random(self.seed)
+        left = self.size
+        while left > 0:
+            n = min(left, size)
+            yield _randbytes(rng, n)
+            left -= n
+
+
+## Flags of generated sections, chosen at random
+_FLAGS = [int(SHF.SHF_ALLOC), int(SHF.SHF_ALLOC) | int(SHF.SHF_EXECINSTR),
+        int(SHF.SHF_ALLOC) | int(SHF.SHF_WRITE), 0]
+
+## Symbol types and bindings, chosen at random
+_STT = [STT.STT_NOTYPE, STT.STT_OBJECT, STT.STT_FUNC]
+_STB = [STB.STB_LOCAL, STB.STB_GLOBAL, STB.STB_WEAK]
+
+
+def generate(sections=16, symbols=0, progbits=0, segments=0, little=True,
+        e_class=ELFCLASS.ELFCLASS32, e_type=ET.ET_EXEC, e_machine=EM.EM_NONE,
+        seed=0):
+    """Creates synthetic ELF object
+
+    sections is number of small sections with random contents, sizes and
+    flags, symbols is number of symbols spread among them, progbits is size of
+    single large .data section, generated lazily, and segments is number of
+    PT_LOAD segments, each describing one of sections. Symbols are added
+    before sections, so lookups of symbol tables stay fast"""
+    rng = random.Random(seed)
+    elf = ELF(e_class=e_class, e_data=ELFDATA.ELFDATA2LSB if little else
+            ELFDATA.ELFDATA2MSB, e_type=e_type, e_machine=e_machine)
+    if segments > 0 and e_type not in [ET.ET_EXEC, ET.ET_DYN]:
+        raise Exception('Segments require ET_EXEC or ET_DYN type')
+    if symbols > 0:
+        elf.append_special_section('.strtab')
+        elf.append_special_section('.symtab')
+
+    addr = 0x10000
+    first = len(elf.Elf.Shdr_table)
+    for i in range(sections):
+        size = rng.randrange(1, 256)
+        flags = rng.choice(_FLAGS)
+        align = 1 << rng.randrange(0, 5)
+        addr = (addr + align - 1) & ~(align - 1)
+        sh_type = SHT.SHT_PROGBITS
+        if flags & int(SHF.SHF_WRITE) and rng.random() < 0.25:
+            sh_type = SHT.SHT_NOBITS
+        if sh_type == SHT.SHT_NOBITS:
+            # content of SHT_NOBITS section is not stored in file
+            sec_id = elf._append_section('.sect%d' % i, b'', addr,
+                    sh_type=sh_type, sh_flags=flags, sh_addralign=align)
+            elf.Elf.Shdr_table[sec_id].sh_size = size
+        else:
+            elf._append_section('.sect%d' % i, _randbytes(rng, size), addr,
+                    sh_type=sh_type, sh_flags=flags, sh_addralign=align)
+        addr += size
+
+    if progbits > 0:
+        addr = (addr + 0xfff) & ~0xfff
+        elf._append_section('.data', Pattern(progbits, rng.getrandbits(32)),
+                addr, sh_flags=int(SHF.SHF_ALLOC) | int(SHF.SHF_WRITE),
+                sh_addralign=16)
+    last = len(elf.Elf.Shdr_table)
+
+    for i in range(segments):
+        if last == first:
+            raise Exception('Segments require at least one section')
+        elf.append_segment(first + i % (last - first), flags=rng.choice(['r',
+            'rx', 'rw']))
+
+    for i in range(symbols):
+        if last == first:
+            sec_id, size = 0, 0
+        else:
+            sec_id = rng.randrange(first, last)
+            size = elf.Elf.Shdr_table[sec_id].sh_size
+        offset = rng.randrange(size) if size > 0 else 0
+        elf.append_symbol('sym%d' % i, sec_id, offset, rng.randrange(0,
+            size - offset + 1), rng.choice(_STB), rng.choice(_STT))
+    return elf
+
+
+def write(fp, **kwargs):
+    """Generates ELF object and streams it to binary file object fp
+
+    Accepts the same arguments as generate. Returns number of bytes written"""
+    return generate(**kwargs).write(fp)
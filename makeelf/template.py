@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+## \file template.py
+#  \brief Stamping many variants of one ELF file
+#  \details ELF object is serialized once and fields that vary between
+#  variants are resolved to ranges of that serialized file up front. Each
+#  variant is then made by joining slices of the base file with encoded
+#  values, so no layout is computed and no headers are parsed per variant
+import struct
+from makeelf.elfstruct import *
+from makeelf.elfsect import *
+from makeelf.digest import section_bytes
+
+_SYMBOLS = [SHT.SHT_SYMTAB, SHT.SHT_DYNSYM]
+
+
+class Template:
+    """Serialized ELF file with named variable fields
+
+    Fields are declared with header, symbol and data methods and filled with
+    render. Template does not follow changes of ELF object made after it was
+    created. If base is given, e.g. content of file elf was parsed from, it
+    is used instead of serializing elf, so file layout is kept exactly. Its
+    headers must be the same as headers of elf"""
+
+    def __init__(self, elf, base=None):
+        ## Serialized file, all variants are based on
+        self.base = bytes(elf) if base is None else bytes(base)
+        # fields are resolved against layout of base, even if elf changes
+        self.elf = elf.clone()
+        self.little = elf.little
+        ## Dictionary of field name to (offset, size, struct format or None)
+        self.fields = {}
+        self._symbols = None
+        if base is not None:
+            self._check_base()
+
+    def _check_base(self):
+        """Checks, that headers of elf are found in base, where fields of
+        headers and sections are resolved"""
+        Elf = self.elf.Elf
+        Ehdr = Elf.Ehdr
+        Ehdr_b = bytes(Ehdr)
+        if self.base[:len(Ehdr_b)] != Ehdr_b:
+            raise Exception('ELF header does not match base file')
+        tables = [('Program', Ehdr.e_phoff, Ehdr.e_phentsize, Elf.Phdr_table),
+                ('Section', Ehdr.e_shoff, Ehdr.e_shentsize, Elf.Shdr_table)]
+        for kind, off, entsize, table in tables:
+            for i, hdr in enumerate(table):
+                b = bytes(hdr)
+                start = off + i * entsize
+                if self.base[start:start + len(b)] != b:
+                    raise Exception('%s header %d does not match base file' %
+                            (kind, i))
+
+    def _add(self, name, offset, size, fmt=None):
+        if name in self.fields:
+            raise Exception('Field %s already defined' % name)
+        if offset < 0 or offset + size > len(self.base):
+            raise Exception('Field %s is outside of file' % name)
+        for other, (off, other_size, _) in self.fields.items():
+            if offset < off + other_size and off < offset + size:
+                raise Exception('Field %s overlaps field %s' % (name, other))
+        self.fields[name] = (offset, size, fmt)
+
+    def _record(self, name, cls, base, field):
+        off, fmt = cls.layout.field(field, cls.bits)
+        fmt = ('<' if self.little else '>') + fmt
+        self._add(name, base + off, struct.calcsize(fmt), fmt)
+
+    def _section_index(self, section):
+        if isinstance(section, str):
+            names = self.elf.get_section_names()
+            if section not in names:
+                raise Exception('No section named %s' % section)
+            return names.index(section)
+        if not 0 <= section < len(self.elf.Elf.Shdr_table):
+            raise Exception('No section with index %d' % section)
+        return section
+
+    def header(self, name, field, index=None):
+        """Declares variable field of ELF header, program header or section
+        header
+
+        field is name of header field, e.g. e_entry, p_paddr or sh_addr.
+        index is index of program header or index or name of section"""
+        Elf = self.elf.Elf
+        Ehdr = Elf.Ehdr
+        if field.startswith('e_'):
+            # fields of layout follow 16 bytes of e_ident
+            self._record(name, Elf.Ehdr_class, len(Ehdr.e_ident), field)
+        elif field.startswith('p_'):
+            if index is None or not 0 <= index < len(Elf.Phdr_table):
+                raise Exception('No program header with index %s' % index)
+            self._record(name, Elf.Phdr_class, Ehdr.e_phoff + index *
+                    Ehdr.e_phentsize, field)
+        elif field.startswith('sh_'):
+            if index is None:
+                raise Exception('Section of field %s not given' % field)
+            index = self._section_index(index)
+            self._record(name, Elf.Shdr_class, Ehdr.e_shoff + index *
+                    Ehdr.e_shentsize, field)
+        else:
+            raise Exception('Unknown header field %s' % field)
+
+    def _symbol(self, symbol):
+        """Returns (symbol table index, symbol index, symbol) of named symbol
+
+        Defined symbols win over undefined ones"""
+        if self._symbols is None:
+            self._symbols = {}
+            Elf = self.elf.Elf
+            Sym = self.elf._Sym_class()
+            for i, Shdr in enumerate(Elf.Shdr_table):
+                if Shdr.sh_type not in _SYMBOLS:
+                    continue
+                strtab = section_bytes(Elf, Shdr.sh_link)
+                b = section_bytes(Elf, i)
+                entsize = Shdr.sh_entsize or len(Sym())
+                syms = Sym.table_from_bytes(b, 0, len(b) // entsize,
+                        self.little, entsize)
+                for j, sym in enumerate(syms[1:], 1):
+                    end = strtab.find(b'\0', sym.st_name)
+                    sym_name = strtab[sym.st_name:end if end != -1 else
+                            None].decode('utf-8', 'replace')
+                    known = self._symbols.get(sym_name)
+                    if known is None or int(known[2].st_shndx) == \
+                            SHN.SHN_UNDEF.value:
+                        self._symbols[sym_name] = (i, j, sym)
+        if symbol not in self._symbols:
+            raise Exception('No symbol named %s' % symbol)
+        return self._symbols[symbol]
+
+    def symbol(self, name, symbol, field='st_value'):
+        """Declares variable field of symbol table entry of named symbol"""
+        Elf = self.elf.Elf
+        Sym = self.elf._Sym_class()
+        table, idx, _ = self._symbol(symbol)
+        Shdr = Elf.Shdr_table[table]
+        entsize = Shdr.sh_entsize or len(Sym())
+        self._record(name, Sym, Shdr.sh_offset + idx * entsize, field)
+
+    def data(self, name, symbol=None, section=None, offset=0, size=None):
+        """Declares variable range of bytes inside section
+
+        Range starts offset bytes after start of data of symbol, if symbol is
+        given, or after start of section otherwise. By default range ends
+        with symbol data or section"""
+        Elf = self.elf.Elf
+        if symbol is not None:
+            _, _, sym = self._symbol(symbol)
+            idx = int(sym.st_shndx)
+            if not 0 < idx < SHN.SHN_LORESERVE.value:
+                raise Exception('Symbol %s is not defined in section' %
+                        symbol)
+            start = sym.st_value
+            if int(Elf.Ehdr.e_type) != ET.ET_REL.value:
+                # symbol value is an address
+                start -= Elf.Shdr_table[idx].sh_addr
+            if size is None:
+                size = sym.st_size - offset
+        elif section is not None:
+            idx = self._section_index(section)
+            start = 0
+            if size is None:
+                size = Elf.Shdr_table[idx].sh_size - offset
+        else:
+            raise Exception('Neither symbol nor section given')
+
+        Shdr = Elf.Shdr_table[idx]
+        if Shdr.sh_type == SHT.SHT_NOBITS:
+            raise Exception('Section of field %s has no content in file' %
+                    name)
+        start += offset
+        if start < 0 or size < 0 or start + size > Shdr.sh_size:
+            raise Exception('Field %s is outside of its section' % name)
+        self._add(name, Shdr.sh_offset + start, size)
+
+    def _patches(self, values):
+        """Returns list of (offset, bytes) of encoded values, sorted"""
+        ret = []
+        for name, value in values.items():
+            if name not in self.fields:
+                raise Exception('No field named %s' % name)
+            offset, size, fmt = self.fields[name]
+            if fmt is not None:
+                try:
+                    data = struct.pack(fmt, value)
+                except struct.error:
+                    raise Exception('Value %s does not fit in field %s' %
+                            (value, name))
+            else:
+                if isinstance(value, str):
+                    value = bytes(value, 'utf-8')
+                if len(value) > size:
+                    raise Exception('Value of %d bytes does not fit in field '
+                            '%s of %d bytes' % (len(value), name, size))
+                # shorter values are padded with zeros
+                data = bytes(value) + bytes(size - len(value))
+            ret.append((offset, data))
+        ret.sort()
+        return ret
+
+    def _parts(self, values):
+        base = memoryview(self.base)
+        cursor = 0
+        for offset, data in self._patches(values):
+            yield base[cursor:offset]
+            yield data
+            cursor = offset + len(data)
+        yield base[cursor:]
+
+    def render(self, values, fp=None):
+        """Makes variant of file with fields set to values
+
+        values is dict of field name to int, for header and symbol fields, or
+        bytes or str, for data fields. Fields not given keep values of base
+        file. If fp is given, variant is written to that binary file object
+        and number of bytes written is returned, otherwise variant is returned
+        as bytes"""
+        if fp is None:
+            return b''.join(self._parts(values))
+        for part in self._parts(values):
+            fp.write(part)
+        return len(self.base)
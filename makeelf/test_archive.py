@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import os
+import struct
+import tempfile
+import unittest
+import makeelf.archive
+from makeelf.elf import *
+
+class ArchiveTests(unittest.TestCase):
+
+    def member(self, symbol):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB, e_type=ET.ET_REL)
+        text_id = elf.append_section('.text', b'\x90' * 4, 0)
+        elf.append_symbol(symbol, text_id, 0, 4, sym_binding=STB.STB_GLOBAL)
+        return bytes(elf)
+
+    def header(self, name, size):
+        return b'%-16s%-12d%-6d%-6d%-8o%-10d`\n' % (name, 0, 0, 0, 0o644,
+                size)
+
+    def create(self, path):
+        long_name = b'long_object_name_over_16.o'
+        members = [(b'/0', self.member('first')), (b'short.o/',
+            self.member('second'))]
+        long_names = long_name + b'/\n'
+        symbols = [b'first', b'second']
+
+        # symbol index needs offsets of members, so it is sized first
+        names = b''.join(s + b'\0' for s in symbols)
+        index_size = 4 + 4 * len(symbols) + len(names)
+        offset = len(makeelf.archive.MAGIC) + 60 + index_size + \
+                index_size % 2 + 60 + len(long_names)
+        offsets = []
+        for _, data in members:
+            offsets.append(offset)
+            offset += 60 + len(data) + len(data) % 2
+        index = struct.pack('>%dI' % (len(symbols) + 1), len(symbols),
+                *offsets) + names
+
+        with open(path, 'wb') as f:
+            f.write(makeelf.archive.MAGIC)
+            f.write(self.header(b'/', len(index)) + index + b'\n' *
+                    (len(index) % 2))
+            f.write(self.header(b'//', len(long_names)) + long_names)
+            for name, data in members:
+                f.write(self.header(name, len(data)) + data + b'\n' *
+                        (len(data) % 2))
+            # BSD style name
+            data = b'bsd.o\0\0\0' + self.member('third')
+            f.write(self.header(b'#1/8', len(data)) + data)
+        return long_name.decode()
+
+    def test_open(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'liba.a')
+            long_name = self.create(path)
+
+            with makeelf.archive.open(path) as archive:
+                self.assertEqual([long_name, 'short.o', 'bsd.o'],
+                        [m.name for m in archive])
+                self.assertEqual(['first', 'second'], list(archive.symbols))
+
+                member = archive.find('second')
+                self.assertEqual('short.o', member.name)
+                self.assertIs(member, archive['short.o'])
+                self.assertIsNone(archive.find('missing'))
+
+                # members are parsed only when used
+                self.assertIsNone(archive[0]._elf)
+                elf = member.elf
+                self.assertEqual('.text', elf.get_section_names()[2])
+                self.assertIsInstance(elf.Elf.sections[2], memoryview)
+                self.assertEqual(ET.ET_REL, archive['bsd.o'].elf.Elf.Ehdr
+                        .e_type)
+                del elf, member
+
+    def test_not_archive(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'\x7fELF')
+            f.flush()
+            with self.assertRaises(Exception):
+                makeelf.archive.open(f.name)
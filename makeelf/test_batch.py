@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+from makeelf.elf import *
+from makeelf.batch import *
+
+class BatchTests(unittest.TestCase):
+
+    tv_note = b'\4\0\0\0\4\0\0\0\3\0\0\0GNU\0\xde\xad\xbe\xef'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i, e_class in enumerate([ELFCLASS.ELFCLASS32,
+                ELFCLASS.ELFCLASS64]):
+            elf = ELF(e_class=e_class, e_data=ELFDATA.ELFDATA2LSB,
+                    e_machine=EM.EM_ARM)
+            data_id = elf.append_section('.data', b'\0' * 8, 0x1000)
+            elf._append_section('.note.gnu.build-id', BatchTests.tv_note, 0,
+                    sh_type=SHT.SHT_NOTE)
+            elf.append_symbol('a', data_id, 0, 4)
+            elf.append_symbol('b', data_id, 4, 4)
+            path = os.path.join(self.tmp.name, '%d.elf' % i)
+            with open(path, 'wb') as f:
+                f.write(bytes(elf))
+            self.paths.append(path)
+        path = os.path.join(self.tmp.name, 'garbage')
+        with open(path, 'wb') as f:
+            f.write(b'#!/bin/sh\n')
+        self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_analyze(self):
+        for workers in [0, 2]:
+            actual = {s.path: s for s in analyze(self.paths, workers=workers)}
+
+            self.assertEqual(3, len(actual))
+            for path, bits in zip(self.paths, [32, 64]):
+                summary = actual[path]
+                self.assertIsNone(summary.error)
+                self.assertEqual((bits, True, int(ET.ET_EXEC),
+                    int(EM.EM_ARM), 0, 1, 6), summary.header)
+                self.assertEqual('.data', summary.sections[2][0])
+                self.assertEqual('deadbeef', summary.build_id)
+                self.assertEqual((3, 0), summary.symbols)
+            self.assertIsNotNone(actual[self.paths[2]].error)
+
+    def test_fields(self):
+        actual = list(analyze(self.paths[:1], fields=['header'], workers=0))
+
+        self.assertIsNotNone(actual[0].header)
+        self.assertIsNone(actual[0].sections)
+        self.assertIsNone(actual[0].symbols)
+        self.assertRaises(Exception, list, analyze(self.paths, ['nope']))
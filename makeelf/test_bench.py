@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import io
+import unittest
+import makeelf.bench
+
+class BenchTests(unittest.TestCase):
+
+    def test_run(self):
+        actual = list(makeelf.bench.run(sections=(2,), symbols=(3,), repeat=1))
+
+        self.assertEqual(sorted(makeelf.bench.BENCHMARKS),
+                sorted(set(r.name for r in actual)))
+        for r in actual:
+            self.assertEqual(1, len(r.times))
+            self.assertGreater(r.peak, 0)
+
+    def test_save_load(self):
+        results = list(makeelf.bench.run(['codec'], symbols=(3,), repeat=1))
+        fp = io.StringIO()
+        makeelf.bench.save(results, fp)
+        fp.seek(0)
+
+        actual = makeelf.bench.load(fp)
+
+        self.assertEqual(results, actual)
+        name, params, _, _, ratio = makeelf.bench.compare(actual, results)[0]
+        self.assertEqual(('codec', {'symbols': 3}, 1.0), (name, params, ratio))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+from makeelf.cache import Cache, SUFFIX
+from makeelf.elf import *
+
+class CacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, 'cache')
+        self.path = os.path.join(self.tmp.name, 'test.o')
+        self.write(b'\x90' * 16)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text, path=None):
+        elf = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB,
+                e_type=ET.ET_REL)
+        text_id = elf.append_section('.text', text, 0)
+        elf.append_section('.data', b'\1\2\3\4', 0)
+        elf.append_symbol('main', text_id, 0, len(text),
+                sym_binding=STB.STB_GLOBAL)
+        elf.append_symbol('other', text_id, 4, 4, sym_binding=STB.STB_GLOBAL)
+        with open(path or self.path, 'wb') as fp:
+            fp.write(bytes(elf))
+        return elf
+
+    def snapshots(self):
+        return sorted(name for name in os.listdir(self.dir) if
+                name.endswith(SUFFIX))
+
+    def test_roundtrip(self):
+        expected, _ = ELF.from_file(self.path)
+
+        miss, _ = ELF.from_file(self.path, cache=self.dir)
+        hit, _ = ELF.from_file(self.path, cache=self.dir)
+
+        self.assertEqual(1, len(self.snapshots()))
+        for elf in [miss, hit]:
+            self.assertEqual(bytes(expected), bytes(elf))
+            self.assertEqual(expected.get_section_names(),
+                    elf.get_section_names())
+
+    def test_restored_caches(self):
+        expected, _ = ELF.from_file(self.path)
+        ELF.from_file(self.path, cache=self.dir)
+
+        hit, _ = ELF.from_file(self.path, cache=self.dir)
+
+        # digests and symbols come from snapshot, only names are read
+        self.assertEqual(expected.section_digests()['sections'],
+                hit.section_digests()['sections'])
+        symtab_id = hit.get_section_names().index('.symtab')
+        self.assertEqual(expected.table_columns(symtab_id, workers=0),
+                hit.table_columns(symtab_id, workers=0))
+        shstrndx = hit.Elf.Ehdr.e_shstrndx
+        self.assertEqual([shstrndx], [i for i, section in
+            enumerate(hit.Elf.sections) if section.blob is not None])
+
+    def test_invalidation(self):
+        ELF.from_file(self.path, cache=self.dir)
+        st = os.stat(self.path)
+        self.write(b'\xc3' * 32)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        elf, _ = ELF.from_file(self.path, cache=self.dir)
+
+        text_id = elf.get_section_names().index('.text')
+        self.assertEqual(b'\xc3' * 32, bytes(elf.Elf.sections[text_id]))
+        self.assertEqual(2, len(self.snapshots()))
+
+    def test_by_content(self):
+        cache = Cache(self.dir, by_content=True)
+        copy = os.path.join(self.tmp.name, 'copy.o')
+        self.write(b'\x90' * 16, copy)
+
+        cache.load(self.path)
+        elf = cache.load(copy)
+
+        self.assertEqual(1, len(self.snapshots()))
+        text_id = elf.get_section_names().index('.text')
+        self.assertEqual(copy, elf.Elf.sections[text_id].filename)
+
+    def test_corrupted(self):
+        cache = Cache(self.dir)
+        cache.load(self.path)
+        snapshot = os.path.join(self.dir, self.snapshots()[0])
+        with open(snapshot, 'r+b') as fp:
+            fp.seek(20)
+            fp.write(b'\xff\xff')
+
+        elf = cache.load(self.path)
+
+        self.assertEqual(bytes(ELF.from_file(self.path)[0]), bytes(elf))
+
+    def test_eviction(self):
+        paths = []
+        for i in range(4):
+            paths.append(os.path.join(self.tmp.name, '%d.o' % i))
+            self.write(bytes([i]) * 16, paths[-1])
+        cache = Cache(self.dir)
+        cache.load(paths[0])
+        size = os.path.getsize(os.path.join(self.dir, self.snapshots()[0]))
+        cache.max_size = 2 * size
+        first = cache.key(paths[0])
+
+        for i, path in enumerate(paths[1:]):
+            snapshot = os.path.join(self.dir, cache.key(paths[i]) + SUFFIX)
+            os.utime(snapshot, ns=(0, i * 10**9))
+            cache.load(path)
+
+        self.assertEqual(2, len(self.snapshots()))
+        self.assertNotIn(first + SUFFIX, self.snapshots())
+        self.assertIn(cache.key(paths[3]) + SUFFIX, self.snapshots())
+
+if __name__ == '__main__':
+    unittest.main()
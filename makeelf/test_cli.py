@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from makeelf.elf import *
+from makeelf.cli import main
+
+class CliTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        elf = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB,
+                e_machine=EM.EM_X86_64)
+        data_id = elf.append_section('.data', b'\0' * 8, 0x1000)
+        elf.append_symbol('counter', data_id, 0, 4, STB.STB_GLOBAL,
+                STT.STT_OBJECT)
+        self.path = os.path.join(self.tmp.name, 'a.elf')
+        with open(self.path, 'wb') as f:
+            f.write(bytes(elf))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_main(self, argv):
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = main(argv)
+        return status, out.getvalue(), err.getvalue()
+
+    def test_headers_json(self):
+        status, out, err = self.run_main(['headers', '--json', self.path,
+            self.path])
+
+        self.assertEqual(0, status)
+        lines = out.splitlines()
+        self.assertEqual(2, len(lines))
+        actual = json.loads(lines[0])
+        self.assertEqual(self.path, actual['file'])
+        self.assertEqual('ELF64', actual['headers']['class'])
+        self.assertEqual('EM_X86_64', actual['headers']['machine'])
+
+    def test_symbols(self):
+        status, out, err = self.run_main(['symbols', '--json', self.path])
+
+        self.assertEqual(0, status)
+        actual = json.loads(out)['symbols']
+        self.assertEqual('counter', actual[1]['name'])
+        self.assertEqual('STB_GLOBAL', actual[1]['bind'])
+
+    def test_sections_text(self):
+        status, out, err = self.run_main(['sections', self.path])
+
+        self.assertEqual(0, status)
+        self.assertIn('.data', out)
+        self.assertIn('SHT_SYMTAB', out)
+
+    def test_missing_file(self):
+        status, out, err = self.run_main(['headers', self.path + '.none',
+            self.path])
+
+        self.assertEqual(1, status)
+        self.assertIn('makeelf:', err)
+        self.assertIn('File: %s' % self.path, out)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+from unittest import mock
+import makeelf.columns
+from makeelf.columns import decode, decode_parallel
+from makeelf.elf import *
+
+class ColumnsTests(unittest.TestCase):
+
+    def table(self, cls, little, count=100):
+        entries = [cls(i, 0x1000 + i, i * 3, i & 0xff, 1, i % 7,
+            little=little) for i in range(count)]
+        return entries, b''.join(bytes(e) for e in entries)
+
+    def assertColumns(self, entries, columns):
+        for name in columns:
+            self.assertEqual([int(getattr(e, name)) for e in entries],
+                    list(columns[name]), name)
+
+    def test_decode(self):
+        for cls in [Elf32_Sym, Elf64_Sym]:
+            for little in [False, True]:
+                entries, b = self.table(cls, little)
+
+                actual = decode(b, cls, little=little)
+
+                self.assertColumns(entries, actual)
+
+    def test_entsize(self):
+        entries, b = self.table(Elf32_Sym, True, 10)
+        # entries padded to 20 bytes
+        padded = b''.join(bytes(e) + b'\xff' * 4 for e in entries)
+
+        actual = decode(padded, Elf32_Sym, little=True, entsize=20)
+
+        self.assertColumns(entries, actual)
+
+    def test_parallel(self):
+        entries, b = self.table(Elf64_Sym, False, 1000)
+
+        actual = decode_parallel(b, Elf64_Sym, workers=2, chunk=300)
+
+        self.assertColumns(entries, actual)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'table')
+            with open(path, 'wb') as f:
+                f.write(b'\0' * 8 + b)
+
+            actual = decode_parallel(path, Elf64_Sym, 1000, offset=8,
+                    workers=2)
+
+            self.assertColumns(entries, actual)
+
+    def test_parallel_fallback(self):
+        entries, b = self.table(Elf32_Sym, True, 100)
+
+        with mock.patch.object(makeelf.columns, 'shared_memory', None):
+            actual = decode_parallel(b, Elf32_Sym, little=True, workers=2)
+            self.assertColumns(entries, actual)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'table')
+                with open(path, 'wb') as f:
+                    f.write(b'\0' * 8 + b + b'\0' * 16)
+
+                actual = decode_parallel(path, Elf32_Sym, 100, True,
+                        offset=8, workers=2)
+
+                self.assertColumns(entries, actual)
+
+    def test_table_columns(self):
+        elf = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB)
+        text_id = elf.append_section('.text', b'\0' * 16, 0)
+        for i in range(5):
+            elf.append_symbol('sym%d' % i, text_id, i, 1)
+
+        actual = elf.table_columns('.symtab')
+
+        self.assertEqual([0, 0, 1, 2, 3, 4], list(actual['st_value']))
+        self.assertEqual(actual, elf.table_columns('.symtab', workers=2))
+        with self.assertRaises(Exception):
+            elf.table_columns('.text')
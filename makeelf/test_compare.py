@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import unittest
+import makeelf
+from makeelf.compare import Change
+from makeelf.elf import *
+
+class CompareTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = elf.append_section('.text', b'\x90' * 16, 0x1000)
+        elf.append_section('.data', b'\1\2\3\4', 0x2000)
+        elf.append_segment(text_id)
+        elf.append_symbol('main', text_id, 0, 16, STB.STB_GLOBAL,
+                STT.STT_FUNC)
+        bytes(elf)
+        return elf
+
+    def test_equal(self):
+        a = self.create()
+        b = ELF.from_bytes(bytes(self.create()))[0]
+
+        self.assertEqual([], makeelf.diff(a, b))
+
+    def test_content(self):
+        a = self.create()
+        b = self.create()
+        _, data = b.get_section_by_name('.data')
+        b.Elf.sections[b.Elf.sections.index(data)] = b'\1\2\5\4'
+
+        actual = makeelf.diff(a, b)
+
+        self.assertEqual(1, len(actual))
+        self.assertEqual(('content', '.data', 2), actual[0][:3])
+
+    def test_section_added(self):
+        a = self.create()
+        b = self.create()
+        b.append_section('.bss', b'', 0x3000)
+        bytes(b)
+
+        actual = makeelf.diff(a, b)
+
+        self.assertIn(Change('section', '.bss', None, None, '.bss'), actual)
+        self.assertIn(('header', 'Ehdr', 'e_shnum'),
+                [c[:3] for c in actual])
+
+    def test_symbol(self):
+        a = self.create()
+        b = self.create()
+        b.append_symbol('helper', 1, 8, 8)
+        _, symtab = b.get_section_by_name('.symtab')
+        symtab.lst[1].st_size = 12
+
+        actual = makeelf.diff(a, b)
+
+        self.assertIn(Change('symbol', '.symtab:helper', None, None,
+            'helper'), actual)
+        self.assertIn(Change('symbol', '.symtab:main', 'st_size', 16, 12),
+                actual)
+
+    def test_offsets(self):
+        a = self.create()
+        b = self.create()
+        Shdr_a, _ = a.get_section_by_name('.text')
+        Shdr_b, _ = b.get_section_by_name('.text')
+        Shdr_b.sh_offset += 4
+
+        self.assertEqual([], makeelf.diff(a, b))
+        self.assertEqual([Change('section', '.text', 'sh_offset',
+            Shdr_a.sh_offset, Shdr_b.sh_offset)],
+            makeelf.diff(a, b, offsets=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import hashlib
+import unittest
+import makeelf.digest
+from makeelf.elf import *
+
+class DigestTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        data_id = elf.append_section('.data', b'\1\2\3\4', 0x1000)
+        elf.append_segment(data_id)
+        bytes(elf)
+        return elf, data_id
+
+    def test_section_digests(self):
+        elf, data_id = self.create()
+
+        actual = elf.section_digests()
+
+        self.assertEqual(hashlib.sha256(b'\1\2\3\4').hexdigest(),
+                actual['sections'][data_id])
+        self.assertEqual(len(elf.Elf.Phdr_table), len(actual['segments']))
+        self.assertEqual(hashlib.sha256(b'').hexdigest(),
+                actual['segments'][0])
+        self.assertEqual(hashlib.sha256(b'\1\2\3\4').hexdigest(),
+                actual['segments'][1])
+
+    def test_cache(self):
+        elf, data_id = self.create()
+        elf.section_digests()
+        cached = elf.Elf._digests[(data_id, 'sha256')]
+
+        elf.section_digests()
+        self.assertIs(cached, elf.Elf._digests[(data_id, 'sha256')])
+
+        elf.Elf.sections[data_id] = b'\5\6\7\x08'
+        actual = elf.section_digests()
+        self.assertEqual(hashlib.sha256(b'\5\6\7\x08').hexdigest(),
+                actual['sections'][data_id])
+
+    def test_handler_not_cached(self):
+        elf, data_id = self.create()
+        elf.append_symbol('a', data_id, 0, 4)
+        symtab_id = elf.get_section_names().index('.symtab')
+        expected = elf.section_digests()['sections'][symtab_id]
+        self.assertNotIn((symtab_id, 'sha256'), elf.Elf._digests)
+
+        elf.append_symbol('b', data_id, 0, 4)
+        actual = elf.section_digests()['sections'][symtab_id]
+
+        self.assertNotEqual(expected, actual)
+        self.assertEqual(hashlib.sha256(bytes(elf.Elf.sections[
+            symtab_id])).hexdigest(), actual)
+
+    def test_segment_digests(self):
+        elf, data_id = self.create()
+        text_id = elf.append_section('.text', b'\x90' * 8, 0x2000)
+        elf.append_segment(text_id)
+        b = bytes(elf)
+
+        actual = elf.section_digests()['segments']
+
+        for Phdr, digest in zip(elf.Elf.Phdr_table, actual):
+            self.assertEqual(hashlib.sha256(b[Phdr.p_offset:Phdr.p_offset +
+                Phdr.p_filesz]).hexdigest(), digest)
+
+    def test_parallel(self):
+        elf, data_id = self.create()
+        big = bytes(range(256)) * (makeelf.digest.PARALLEL_THRESHOLD // 256)
+        elf.Elf.sections[data_id] = big
+
+        actual = elf.section_digests('blake2b', workers=2)
+
+        self.assertEqual(hashlib.blake2b(big).hexdigest(),
+                actual['sections'][data_id])
+
+    def test_semantic_digest(self):
+        elf, data_id = self.create()
+        expected = elf.semantic_digest()
+
+        elf.Elf.Shdr_table[data_id].sh_offset += 16
+        elf.Elf.Phdr_table[1].p_offset += 16
+        self.assertEqual(expected, elf.semantic_digest())
+
+        elf.Elf.Shdr_table[data_id].sh_addr += 16
+        self.assertNotEqual(expected, elf.semantic_digest())
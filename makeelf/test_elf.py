@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import copy
+import pickle
 import unittest
 from makeelf.elf import *
 
@@ -55,3 +57,199 @@ class ELFTests(unittest.TestCase):
 
         h,a = invector.get_section_by_name('.dynamic')
         self.assertEqual(expected, actual)
+
+    def test_elf64_roundtrip(self):
+        for e_data in [ELFDATA.ELFDATA2LSB, ELFDATA.ELFDATA2MSB]:
+            invector = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=e_data,
+                    e_machine=EM.EM_AARCH64)
+            data_id = invector.append_section('.data', b'\1\2\3\4', 0x1000)
+            invector.append_symbol('sym', data_id, 0, 4)
+
+            expected = bytes(invector)
+            actual, _ = ELF.from_bytes(expected)
+
+            self.assertIsInstance(actual.Elf, Elf64)
+            self.assertEqual(64, actual.Elf.Ehdr.e_ehsize)
+            self.assertEqual(64, actual.Elf.Ehdr.e_shentsize)
+            self.assertEqual(b'\1\2\3\4', actual.get_section_by_name('.data')[1])
+            self.assertEqual(expected, bytes(actual))
+
+    def test_from_file_lazy(self):
+        import tempfile
+        invector = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        invector.append_section('.dynamic', ELFTests.tv_bytes_l, 0x1337)
+        expected = bytes(invector)
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(expected)
+            f.flush()
+            actual, _ = ELF.from_file(f.name, load_sections=False)
+
+            self.assertEqual(0x1337, actual.Elf.Shdr_table[2].sh_addr)
+            self.assertEqual(len(ELFTests.tv_bytes_l),
+                    len(actual.Elf.sections[2]))
+            self.assertIsNone(actual.Elf.sections[2].blob)
+            self.assertEqual(ELFTests.tv_bytes_l,
+                    bytes(actual.get_section_by_name('.dynamic')[1]))
+            self.assertEqual(expected, bytes(actual))
+
+    def test_from_file_lazy_replaced(self):
+        import os
+        import tempfile
+        invector = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = invector.append_section('.text', b'\x90' * 16, 0)
+        bss_id = invector._append_section('.bss', b'', 0,
+                sh_type=SHT.SHT_NOBITS)
+        invector.Elf.Shdr_table[bss_id].sh_size = 0x100
+        expected = bytes(invector)
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'test.o')
+            with open(path, 'wb') as f:
+                f.write(expected)
+            actual, _ = ELF.from_file(path, load_sections=False)
+            os.truncate(path, 0)
+
+            # content of SHT_NOBITS section is not read from file
+            self.assertEqual(b'', actual.Elf.sections[bss_id])
+            with self.assertRaises(Exception):
+                bytes(actual.Elf.sections[text_id])
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'test.o')
+            with open(path, 'wb') as f:
+                f.write(expected)
+            actual, _ = ELF.from_file(path, load_sections=False)
+            # file opened by from_file is read, even after it was replaced
+            os.rename(path, path + '.old')
+            with open(path, 'wb') as f:
+                f.write(b'\0' * len(expected))
+
+            self.assertEqual(b'\x90' * 16, bytes(actual.Elf.sections[text_id]))
+            self.assertEqual(b'\x90' * 4, actual.Elf.sections[text_id].pread(
+                4, 2))
+
+    def test_aopen_asave(self):
+        import asyncio
+        import os
+        import tempfile
+        invector = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        invector.append_section('.dynamic', ELFTests.tv_bytes_l, 0x1337)
+        expected = ELFTests.tv_elf_l
+
+        async def roundtrip(path):
+            await invector.asave(path)
+            lazy = await ELF.aopen(path, load_sections=False)
+            loaded = await ELF.aopen(path)
+            return lazy, loaded
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'a.elf')
+            lazy, loaded = asyncio.run(roundtrip(path))
+            with open(path, 'rb') as f:
+                self.assertEqual(expected, f.read())
+            self.assertEqual(expected, bytes(loaded))
+            self.assertEqual(expected, bytes(lazy))
+
+    def test_compress_sections(self):
+        import tempfile
+        tv_content = b'makeelf ' * 0x4000
+        invector = ELF(e_data=ELFDATA.ELFDATA2LSB,
+                e_class=ELFCLASS.ELFCLASS64)
+        info_id = invector._append_section('.debug_info', tv_content, 0,
+                sh_addralign=4)
+        str_id = invector.append_section('.debug_str', b'\0' * 0x100, 0)
+
+        self.assertEqual([info_id, str_id], invector.compress_sections(
+            ['.debug_info', str_id], workers=2))
+        Shdr = invector.Elf.Shdr_table[info_id]
+        self.assertTrue(int(Shdr.sh_flags) & int(SHF.SHF_COMPRESSED))
+        self.assertEqual(8, Shdr.sh_addralign)
+        serialized = bytes(invector)
+        self.assertLess(len(serialized), len(tv_content))
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(serialized)
+            f.flush()
+            actual, _ = ELF.from_file(f.name, load_sections=False)
+            section = actual.Elf.sections[info_id]
+
+            # only beginning of section is decompressed
+            self.assertEqual(Elf64_Chdr(ELFCOMPRESS.ELFCOMPRESS_ZLIB,
+                len(tv_content), 4, little=True), section.chdr)
+            self.assertEqual(b'elf', section.read(4, 3))
+            self.assertIsNone(section._content)
+            self.assertEqual(tv_content, section.content)
+            self.assertEqual(serialized, bytes(actual))
+
+        actual, _ = ELF.from_bytes(serialized)
+        actual.Elf.sections[str_id].content = b'\1\2'
+        actual, _ = ELF.from_bytes(bytes(actual))
+        self.assertEqual(b'\1\2', actual.Elf.sections[str_id].content)
+
+    def test_pickle(self):
+        invector = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB,
+                e_type=ET.ET_REL)
+        text_id = invector.append_section('.text', b'\x90' * 16, 0)
+        for i in range(100):
+            invector.append_symbol('sym%d' % i, text_id, i, 1)
+        invector.compress_sections([invector.append_section('.debug_str',
+            b'\0' * 0x100, 0)])
+        expected = bytes(invector)
+        parsed, _ = ELF.from_bytes(memoryview(expected))
+
+        for tv in [invector, parsed]:
+            b = pickle.dumps(tv)
+            actual = pickle.loads(b)
+
+            # header tables are decoded only when used
+            self.assertNotIn('Shdr_table', actual.Elf.__dict__)
+            self.assertEqual(expected, bytes(actual))
+        # symbols are pickled as one table
+        self.assertLess(len(pickle.dumps(invector)), 2 * len(expected))
+
+        actual = pickle.loads(pickle.dumps(invector))
+        actual.append_symbol('new', text_id, 0, 1)
+        symtab_id = actual.get_section_names().index('.symtab')
+        self.assertEqual(102, len(actual.Elf.sections[symtab_id].lst))
+
+    def test_pickle_records(self):
+        chdr = Elf32_Chdr(ch_size=16, ch_reserved=7, little=True)
+        # out of range of its field, as made for fuzzing
+        shdr = Elf32_Shdr(sh_size=1 << 40, little=True)
+
+        for tv in [chdr, shdr]:
+            for actual in [pickle.loads(pickle.dumps(tv)), copy.copy(tv)]:
+                self.assertEqual(tv.__dict__, actual.__dict__)
+
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        elf.append_section('.text', b'\x90' * 16, 0)
+        bytes(elf)
+        elf.Elf.Shdr_table[1].sh_size = 1 << 40
+        actual = pickle.loads(pickle.dumps(elf))
+        self.assertEqual(1 << 40, actual.Elf.Shdr_table[1].sh_size)
+
+    def test_clone(self):
+        invector = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB,
+                e_type=ET.ET_EXEC)
+        text_id = invector.append_section('.text', b'\x90' * 16, 0)
+        invector.append_symbol('main', text_id, 0, 16)
+        parsed, _ = ELF.from_bytes(bytes(invector))
+        expected = bytes(invector)
+
+        for tv in [invector, parsed]:
+            base = tv.clone()
+            actual = base.clone()
+
+            # untouched clone shares serialized headers with next clones
+            self.assertNotIn('Shdr_table', base.Elf.__dict__)
+            self.assertIs(tv.Elf.sections[text_id],
+                    actual.Elf.sections[text_id])
+            actual.Elf.Shdr_table[text_id].sh_flags = 0
+            actual.Elf.sections[text_id] = b'\xc3' * 16
+            actual.append_symbol('other', text_id, 4, 4)
+            actual.append_section('.data', b'\1', 0)
+
+            self.assertEqual(expected, bytes(tv))
+            self.assertEqual(expected, bytes(base))
+            self.assertNotEqual(expected, bytes(actual))
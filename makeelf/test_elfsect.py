@@ -147,3 +147,89 @@ class Elf32_SymTests(unittest.TestCase):
 
             #self.assertEqual(expected[0].little, actual[0].little, i)
             self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+
+class Elf64_SymTests(unittest.TestCase):
+
+    st_info = (int(STB.STB_WEAK) << 4) + int(STT.STT_OBJECT)
+    st_other = int(STV.STV_PROTECTED)
+
+    tv_endianness = [True, False]
+
+    tv_bytes = [b'\3\2\1\0\x21\3\x12\0\xde\xc0\xdd\xba\0\0\0\0' +
+            b'\xff\xee\xdd\xcc\0\0\0\0',
+            b'\0\1\2\3\x21\3\0\x12\0\0\0\0\xba\xdd\xc0\xde' +
+            b'\0\0\0\0\xcc\xdd\xee\xff']
+
+    tv_obj = [\
+            Elf64_Sym(0x010203, 0xbaddc0de, 0xccddeeff, st_info, st_other,
+                0x12, little=True),
+            Elf64_Sym(0x010203, 0xbaddc0de, 0xccddeeff, st_info, st_other,
+                0x12)]
+
+    def test_len(self):
+        for i in range(len(Elf64_SymTests.tv_obj)):
+            invector = Elf64_SymTests.tv_obj[i]
+            expected = 24
+            actual = len(invector)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+    def test_bytes(self):
+        for i in range(len(Elf64_SymTests.tv_bytes)):
+            tv_bytes = Elf64_SymTests.tv_bytes[i]
+            tv_obj = Elf64_SymTests.tv_obj[i]
+
+            invector = tv_obj
+            expected = tv_bytes
+            actual = bytes(invector)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+    def test_from_bytes(self):
+        for i in range(len(Elf64_SymTests.tv_bytes)):
+            tv_bytes = Elf64_SymTests.tv_bytes[i]
+            tv_obj = Elf64_SymTests.tv_obj[i]
+            tv_endianness = Elf64_SymTests.tv_endianness[i]
+
+            invector = tv_bytes + b'\x13\x37'
+            expected = tv_obj, b'\x13\x37'
+            actual = Elf64_Sym.from_bytes(invector, tv_endianness)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+
+class Elf_RelaTests(unittest.TestCase):
+
+    def test_r_info(self):
+        rela32 = Elf32_Rela(0x10, (5 << 8) | 2, -4)
+        rela64 = Elf64_Rela(0x10, (5 << 32) | 2, -4)
+
+        self.assertEqual((5, 2), (rela32.r_sym, rela32.r_type))
+        self.assertEqual((5, 2), (rela64.r_sym, rela64.r_type))
+
+        rela64.r_sym = 7
+        self.assertEqual((7 << 32) | 2, rela64.r_info)
+
+    def test_bytes(self):
+        invector = Elf64_Rela(0x10, (5 << 32) | 2, -4, little=True)
+        expected = b'\x10' + b'\0' * 7 + b'\2\0\0\0\5\0\0\0' + \
+                b'\xfc' + b'\xff' * 7
+        actual = bytes(invector)
+
+        self.assertEqual(expected, actual)
+        self.assertEqual((invector, b''), Elf64_Rela.from_bytes(actual, True))
+
+
+class Elf_ChdrTests(unittest.TestCase):
+
+    def test_bytes(self):
+        chdr32 = Elf32_Chdr(ELFCOMPRESS.ELFCOMPRESS_ZLIB, 0x100, 4, little=True)
+        chdr64 = Elf64_Chdr(ELFCOMPRESS.ELFCOMPRESS_ZLIB, 0x100, 8)
+
+        self.assertEqual(b'\1\0\0\0\0\1\0\0\4\0\0\0', bytes(chdr32))
+        self.assertEqual(b'\0\0\0\1' + b'\0' * 4 + b'\0' * 6 + b'\1\0' +
+                b'\0' * 7 + b'\x08', bytes(chdr64))
+        self.assertEqual((chdr32, b'\x13\x37'),
+                Elf32_Chdr.from_bytes(bytes(chdr32) + b'\x13\x37', True))
+        self.assertEqual((chdr64, b''), Elf64_Chdr.from_bytes(bytes(chdr64)))
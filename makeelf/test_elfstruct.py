@@ -195,3 +195,119 @@ class Elf32_EhdrTests(unittest.TestCase):
 
             #self.assertEqual(expected[0].little, actual[0].little, i)
             self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+
+class Elf64_EhdrTests(unittest.TestCase):
+
+    tv_bytes = [
+            b'\x7fELF\2\1\1\0\0\0\0\0\0\0\0\0' + b'\2\0\x3e\0\1\0\0\0' +
+            b'\x78\x56\x34\x12\0\0\0\0' + b'\x40\0\0\0\0\0\0\0' +
+            b'\0\1\0\0\0\0\0\0' + b'\0\0\0\0\x40\0\x38\0\1\0\x40\0\3\0\2\0',
+            b'\x7fELF\2\2\1\0\0\0\0\0\0\0\0\0' + b'\0\2\0\x3e\0\0\0\1' +
+            b'\0\0\0\0\x12\x34\x56\x78' + b'\0\0\0\0\0\0\0\x40' +
+            b'\0\0\0\0\0\0\1\0' + b'\0\0\0\0\0\x40\0\x38\0\1\0\x40\0\3\0\2',
+           ]
+
+    tv_obj = [
+            Elf64_Ehdr(e_ident=Elf32_e_ident(EI_CLASS=ELFCLASS.ELFCLASS64,
+                EI_DATA=ELFDATA.ELFDATA2LSB), e_type=ET.ET_EXEC,
+                e_machine=EM.EM_X86_64, e_entry=0x12345678, e_phoff=0x40,
+                e_shoff=0x100, e_phentsize=0x38, e_phnum=1, e_shentsize=0x40,
+                e_shnum=3, e_shstrndx=2),
+            Elf64_Ehdr(e_ident=Elf32_e_ident(EI_CLASS=ELFCLASS.ELFCLASS64,
+                EI_DATA=ELFDATA.ELFDATA2MSB), e_type=ET.ET_EXEC,
+                e_machine=EM.EM_X86_64, e_entry=0x12345678, e_phoff=0x40,
+                e_shoff=0x100, e_phentsize=0x38, e_phnum=1, e_shentsize=0x40,
+                e_shnum=3, e_shstrndx=2),
+            ]
+
+    def test_len(self):
+        for i in range(len(Elf64_EhdrTests.tv_obj)):
+            tv_obj = Elf64_EhdrTests.tv_obj[i]
+
+            invector = tv_obj
+            expected = 64
+            actual = len(invector)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+    def test_bytes(self):
+        for i in range(len(Elf64_EhdrTests.tv_bytes)):
+            tv_bytes = Elf64_EhdrTests.tv_bytes[i]
+            tv_obj = Elf64_EhdrTests.tv_obj[i]
+
+            invector = tv_obj
+            expected = tv_bytes
+            actual = bytes(invector)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+    def test_from_bytes(self):
+        for i in range(len(Elf64_EhdrTests.tv_bytes)):
+            tv_bytes = Elf64_EhdrTests.tv_bytes[i]
+            tv_obj = Elf64_EhdrTests.tv_obj[i]
+
+            invector = tv_bytes + b'\x13\x37'
+            expected = tv_obj, b'\x13\x37'
+            actual = Elf64_Ehdr.from_bytes(invector)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+
+class Elf64_PhdrTests(unittest.TestCase):
+
+    tv_endianness = [True, False]
+
+    tv_bytes = [
+            b'\1\0\0\0\5\0\0\0' + b'\0\x10\0\0\0\0\0\0' +
+            b'\0\0\x40\0\0\0\0\0' + b'\0\0\x40\0\0\0\0\0' +
+            b'\0\1\0\0\0\0\0\0' + b'\0\2\0\0\0\0\0\0' + b'\0\x10\0\0\0\0\0\0',
+            b'\0\0\0\1\0\0\0\5' + b'\0\0\0\0\0\0\x10\0' +
+            b'\0\0\0\0\0\x40\0\0' + b'\0\0\0\0\0\x40\0\0' +
+            b'\0\0\0\0\0\0\1\0' + b'\0\0\0\0\0\0\2\0' + b'\0\0\0\0\0\0\x10\0',
+            ]
+
+    def test_bytes(self):
+        for i in range(len(Elf64_PhdrTests.tv_bytes)):
+            tv_bytes = Elf64_PhdrTests.tv_bytes[i]
+            tv_endianness = Elf64_PhdrTests.tv_endianness[i]
+
+            invector = Elf64_Phdr(p_type=1, p_offset=0x1000, p_vaddr=0x400000,
+                    p_paddr=0x400000, p_filesz=0x100, p_memsz=0x200,
+                    p_flags=5, p_align=0x1000, little=tv_endianness)
+            expected = tv_bytes
+            actual = bytes(invector)
+
+            self.assertEqual(expected, actual, 'error at element {}'.format(i))
+
+    def test_from_bytes(self):
+        for i in range(len(Elf64_PhdrTests.tv_bytes)):
+            tv_bytes = Elf64_PhdrTests.tv_bytes[i]
+            tv_endianness = Elf64_PhdrTests.tv_endianness[i]
+
+            invector = tv_bytes + b'\x13\x37'
+            actual, rest = Elf64_Phdr.from_bytes(invector, tv_endianness)
+
+            self.assertEqual(b'\x13\x37', rest)
+            self.assertEqual(5, actual.p_flags)
+            self.assertEqual(0x1000, actual.p_offset)
+            self.assertEqual(0x200, actual.p_memsz)
+            self.assertEqual(tv_bytes, bytes(actual))
+
+
+class Elf64_ShdrTests(unittest.TestCase):
+
+    def test_table_from_bytes(self):
+        for little in [True, False]:
+            tv_obj = [Elf64_Shdr(little=little),
+                    Elf64_Shdr(1, SHT.SHT_PROGBITS, 6, 0x401000, 0x1000, 0x20,
+                        0, 0, 16, 0, little=little)]
+
+            invector = b'\xff' * 3 + b''.join(bytes(s) for s in tv_obj)
+            actual = Elf64_Shdr.table_from_bytes(invector, 3, 2, little)
+
+            self.assertEqual(2, len(actual))
+            self.assertEqual(64, len(actual[1]))
+            self.assertEqual(SHT.SHT_PROGBITS, actual[1].sh_type)
+            self.assertEqual(0x401000, actual[1].sh_addr)
+            self.assertEqual(bytes(tv_obj[1]), bytes(actual[1]))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import io
+import os
+import tempfile
+import unittest
+import makeelf.flat
+from makeelf.elf import *
+
+class FlatImageTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = elf.append_section('.text', b'\1\2\3\4', 0x1000)
+        data_id = elf.append_section('.data', b'\5\6', 0x1010)
+        elf.append_segment(text_id)
+        elf.append_segment(data_id, mem_size=4)
+        bytes(elf)
+        return elf
+
+    def test_image(self):
+        elf = self.create()
+
+        actual = elf.to_flat_image()
+
+        self.assertEqual(b'\1\2\3\4' + b'\xff' * 12 + b'\5\6\0\0', actual)
+
+    def test_base(self):
+        elf = self.create()
+
+        self.assertEqual(b'\0' * 4 + b'\1\2\3\4' + b'\0' * 12 + b'\5\6\0\0',
+                elf.to_flat_image(fill=0, base=0xffc))
+        self.assertEqual(b'\3\4' + b'\xff' * 12 + b'\5\6\0\0',
+                elf.to_flat_image(base=0x1002))
+
+    def test_buffer_contents(self):
+        elf = self.create()
+        text_id = elf.get_section_names().index('.text')
+        elf.Elf.sections[text_id] = memoryview(bytearray(b'\xc3' * 8))[2:6]
+
+        actual = elf.to_flat_image()
+
+        self.assertEqual(b'\xc3' * 4 + b'\xff' * 12 + b'\5\6\0\0', actual)
+
+    def test_overlap(self):
+        elf = self.create()
+        text_id = elf.get_section_names().index('.text')
+        data_id = elf.get_section_names().index('.data')
+        Shdr = elf.Elf.Shdr_table[data_id]
+        Shdr.sh_offset = elf.Elf.Shdr_table[text_id].sh_offset + 3
+        Phdr = elf.Elf.Phdr_table[2]
+        Phdr.p_offset = Shdr.sh_offset
+        # low-level object is serialized without new layout
+        b = bytes(elf.Elf)
+
+        actual = makeelf.flat.to_image(elf.Elf)
+
+        # overlapping parts are XOR-ed, the same as on serialization
+        self.assertEqual(b[Phdr.p_offset:Phdr.p_offset + 2], actual[16:18])
+        self.assertEqual(bytes([4 ^ 5, 6]), actual[16:18])
+
+    def test_stream(self):
+        elf = self.create()
+        expected = elf.to_flat_image()
+        fp = io.BytesIO()
+
+        actual = elf.write_flat_image(fp)
+
+        self.assertEqual(len(expected), actual)
+        self.assertEqual(expected, fp.getvalue())
+
+    def test_from_file(self):
+        elf = self.create()
+        expected = elf.to_flat_image()
+        fd, path = tempfile.mkstemp()
+        try:
+            os.write(fd, bytes(elf))
+            os.close(fd)
+            lazy, _ = ELF.from_file(path, load_sections=False)
+            fp = io.BytesIO()
+
+            lazy.write_flat_image(fp)
+
+            self.assertEqual(expected, fp.getvalue())
+        finally:
+            os.remove(path)
+
+    def test_from_file_edited(self):
+        elf = self.create()
+        fd, path = tempfile.mkstemp()
+        try:
+            os.write(fd, bytes(elf))
+            os.close(fd)
+            lazy, _ = ELF.from_file(path, load_sections=False)
+            text_id = lazy.get_section_names().index('.text')
+            lazy.Elf.sections[text_id] = b'\xc3' * 4
+            fp = io.BytesIO()
+
+            actual = lazy.to_flat_image()
+            lazy.write_flat_image(fp)
+
+            self.assertEqual(b'\xc3' * 4 + b'\xff' * 12 + b'\5\6\0\0',
+                    actual)
+            self.assertEqual(actual, fp.getvalue())
+            # untouched section is read from file, without being loaded
+            data_id = lazy.get_section_names().index('.data')
+            self.assertIsNone(lazy.Elf.sections[data_id].blob)
+        finally:
+            os.remove(path)
+
+if __name__ == '__main__':
+    unittest.main()
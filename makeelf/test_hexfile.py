@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import io
+import unittest
+import makeelf.hexfile
+from makeelf.elf import *
+
+class HexFileTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = elf.append_section('.text', bytes(range(40)), 0xfff0)
+        elf.append_segment(text_id)
+        elf.Elf.Ehdr.e_entry = 0x10000
+        bytes(elf)
+        return elf
+
+    def test_ihex(self):
+        elf = self.create()
+        fp = io.BytesIO()
+
+        actual = makeelf.hexfile.write_ihex(elf.Elf, fp)
+
+        self.assertEqual(40, actual)
+        lines = fp.getvalue().decode().split()
+        self.assertEqual(':10FFF000000102030405060708090A0B0C0D0E0F89',
+                lines[0])
+        self.assertEqual(':020000040001F9', lines[1])
+        self.assertEqual(':00000001FF', lines[-1])
+        self.assertEqual(':0400000500010000F6', lines[-2])
+
+    def test_srec(self):
+        elf = self.create()
+        fp = io.BytesIO()
+
+        actual = makeelf.hexfile.write_srec(elf.Elf, fp, record_size=16)
+
+        self.assertEqual(40, actual)
+        lines = fp.getvalue().decode().split()
+        self.assertEqual('S0', lines[0][:2])
+        self.assertEqual('S21400FFF0000102030405060708090A0B0C0D0E0F84',
+                lines[1])
+        self.assertEqual('S5030003F9', lines[-2])
+        self.assertEqual('S804010000FA', lines[-1])
+
+    def test_roundtrip(self):
+        elf = self.create()
+        for write, read in [
+                (makeelf.hexfile.write_ihex, makeelf.hexfile.read_ihex),
+                (makeelf.hexfile.write_srec, makeelf.hexfile.read_srec)]:
+            fp = io.BytesIO()
+            write(elf.Elf, fp)
+
+            actual = read(io.StringIO(fp.getvalue().decode()),
+                    e_machine=EM.EM_ARM)
+            bytes(actual)
+
+            self.assertEqual(EM.EM_ARM, actual.Elf.Ehdr.e_machine)
+            self.assertEqual(0x10000, actual.Elf.Ehdr.e_entry)
+            self.assertEqual(elf.to_flat_image(), actual.to_flat_image())
+
+    def test_merge(self):
+        fp = io.StringIO(':020010000102EB\n:020012000304E5\n:02000000AABB99\n'
+                ':00000001FF\n')
+
+        actual = makeelf.hexfile.read_ihex(fp)
+
+        self.assertEqual([b'\xaa\xbb', b'\1\2\3\4'],
+                [bytes(s) for s in actual.Elf.sections[2:]])
+        self.assertEqual([0, 0x10], [Shdr.sh_addr for Shdr in
+            actual.Elf.Shdr_table[2:]])
+
+    def test_checksum(self):
+        fp = io.StringIO(':0200100001020C\n')
+
+        with self.assertRaises(Exception):
+            makeelf.hexfile.read_ihex(fp)
+
+if __name__ == '__main__':
+    unittest.main()
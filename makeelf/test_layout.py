@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import unittest
+import makeelf.layout
+from makeelf.elf import *
+
+class LayoutTests(unittest.TestCase):
+
+    def test_addralign(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        elf.append_section('.a', b'\1\2\3', 0)
+        b_id = elf._append_section('.b', b'\4' * 8, 0, sh_addralign=16)
+
+        b = bytes(elf)
+
+        Shdr = elf.Elf.Shdr_table[b_id]
+        self.assertEqual(0, Shdr.sh_offset % 16)
+        self.assertEqual(b'\4' * 8, b[Shdr.sh_offset:Shdr.sh_offset + 8])
+
+    def test_segment(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = elf.append_section('.text', b'\x90' * 10, 0x8048123)
+        data_id = elf.append_section('.data', b'\1' * 4, 0x8048140)
+        bss_id = elf._append_section('.bss', b'', 0x8048144,
+                sh_type=SHT.SHT_NOBITS)
+        elf.Elf.Shdr_table[bss_id].sh_size = 0x100
+        seg_id = elf.append_segment(text_id, mem_size=0x121)
+
+        b = bytes(elf)
+
+        Phdr = elf.Elf.Phdr_table[seg_id]
+        text = elf.Elf.Shdr_table[text_id]
+        data = elf.Elf.Shdr_table[data_id]
+        bss = elf.Elf.Shdr_table[bss_id]
+        self.assertEqual(Phdr.p_vaddr % PAGE_SIZE, Phdr.p_offset % PAGE_SIZE)
+        self.assertEqual(text.sh_offset, Phdr.p_offset)
+        self.assertEqual(0x1d, data.sh_offset - text.sh_offset)
+        self.assertEqual(0x21, Phdr.p_filesz)
+        self.assertEqual(0x121, Phdr.p_memsz)
+        self.assertEqual(0x100, bss.sh_size)
+        self.assertEqual(data.sh_offset + 4, bss.sh_offset)
+        self.assertEqual(b'\1' * 4, b[data.sh_offset:data.sh_offset + 4])
+
+    def test_members(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        a_id = elf.append_section('.a', b'\0' * 16, 0x1000)
+        b_id = elf.append_section('.b', b'\0' * 16, 0x1010)
+        elf.append_section('.c', b'\0' * 16, 0x2000)
+        seg_a = elf.append_segment(a_id, mem_size=0x20)
+        seg_b = elf.append_segment(b_id)
+
+        actual = makeelf.layout.members(elf.Elf)
+
+        self.assertEqual([], actual[0])
+        self.assertEqual([a_id, b_id], actual[seg_a])
+        self.assertEqual([b_id], actual[seg_b])
+
+    def test_roundtrip(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        ids = []
+        for i in range(20):
+            ids.append(elf._append_section('.s%d' % i, bytes([i]) * (i + 1),
+                0x10000 + 0x100 * i, sh_addralign=1 << (i % 5)))
+            elf.append_segment(ids[-1])
+
+        actual, _ = ELF.from_bytes(bytes(elf))
+
+        for i, sec_id in enumerate(ids):
+            self.assertEqual(bytes([i]) * (i + 1),
+                    bytes(actual.Elf.sections[sec_id]))
+            Phdr = actual.Elf.Phdr_table[i + 1]
+            self.assertEqual(Phdr.p_vaddr % PAGE_SIZE,
+                    Phdr.p_offset % PAGE_SIZE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import unittest
+import makeelf
+from makeelf.elf import *
+
+class MergeTests(unittest.TestCase):
+
+    def create(self, text, symbols, relocations, e_class=ELFCLASS.ELFCLASS64,
+            Rel=Elf64_Rela):
+        elf = ELF(e_class=e_class, e_data=ELFDATA.ELFDATA2LSB,
+                e_type=ET.ET_REL, e_machine=EM.EM_X86_64)
+        text_id = elf._append_section('.text', text, 0,
+                sh_flags=int(SHF.SHF_ALLOC) | int(SHF.SHF_EXECINSTR),
+                sh_addralign=4)
+        elf.append_symbol(None, text_id, 0, 0, sym_type=STT.STT_SECTION)
+        for name, shndx, value, binding in symbols:
+            elf.append_symbol(name, shndx, value, 0, sym_binding=binding)
+        symtab_id = elf.get_section_names().index('.symtab')
+        rela = Rel == Elf64_Rela
+        elf._append_section('.rela.text' if rela else '.rel.text',
+                b''.join(bytes(r) for r in relocations), 0,
+                sh_type=SHT.SHT_RELA if rela else SHT.SHT_REL,
+                sh_link=symtab_id, sh_info=text_id, sh_entsize=len(Rel()))
+        return ELF.from_bytes(bytes(elf))[0]
+
+    def relocations(self, elf, name, Rel):
+        b = bytes(elf.get_section_by_name(name)[1])
+        return Rel.table_from_bytes(b, 0, len(b) // len(Rel()), True)
+
+    def symbols(self, elf):
+        names = elf.get_section_names()
+        Shdr, symtab = elf.get_section_by_name('.symtab')
+        strtab = bytes(elf.Elf.sections[Shdr.sh_link])
+        ret = []
+        for sym in symtab.lst:
+            name = strtab[sym.st_name:strtab.find(b'\0', sym.st_name)]
+            ret.append((name.decode(), names[sym.st_shndx] if 0 <
+                sym.st_shndx < len(names) else sym.st_shndx, sym.st_value))
+        return ret
+
+    def test_merge(self):
+        a = self.create(b'\xaa' * 6, [('a', 1 + 1, 2, STB.STB_GLOBAL),
+            ('b', 0, 0, STB.STB_GLOBAL)],
+            [Elf64_Rela(1, (3 << 32) | 2, -4, little=True)])
+        b = self.create(b'\xbb' * 4, [('helper', 2, 0, STB.STB_LOCAL),
+            ('b', 2, 1, STB.STB_GLOBAL)],
+            # relative to section symbol of .text
+            [Elf64_Rela(0, (1 << 32) | 1, 2, little=True)])
+
+        actual = makeelf.merge([a, b])
+
+        self.assertEqual(ET.ET_REL, actual.Elf.Ehdr.e_type)
+        self.assertEqual(b'\xaa' * 6 + b'\0\0' + b'\xbb' * 4,
+                bytes(actual.get_section_by_name('.text')[1]))
+        symbols = self.symbols(actual)
+        self.assertIn(('helper', '.text', 8), symbols)
+        self.assertIn(('a', '.text', 2), symbols)
+        # undefined reference resolved by definition from other object
+        self.assertIn(('b', '.text', 9), symbols)
+        self.assertEqual(1, len([s for s in symbols if s[0] == 'b']))
+
+        relocations = self.relocations(actual, '.rela.text', Elf64_Rela)
+        self.assertEqual([1, 8], [r.r_offset for r in relocations])
+        self.assertEqual('b', symbols[relocations[0].r_sym][0])
+        self.assertEqual(('', '.text', 0), symbols[relocations[1].r_sym])
+        self.assertEqual(8 + 2, relocations[1].r_addend)
+
+        # result can be merged again
+        again = makeelf.merge([bytes(actual), self.create(b'\xcc' * 4, [],
+            [])])
+        self.assertEqual(16, len(again.get_section_by_name('.text')[1]))
+
+    def test_rel(self):
+        a = self.create(b'\xaa' * 2, [], [], ELFCLASS.ELFCLASS32, Elf32_Rel)
+        b = self.create(b'\xbb' * 4, [], [Elf32_Rel(0, (1 << 8) | 1,
+            little=True)], ELFCLASS.ELFCLASS32, Elf32_Rel)
+
+        actual = makeelf.merge([a, b])
+
+        # implicit addend cannot change, so symbol marks start of input
+        relocations = self.relocations(actual, '.rel.text', Elf32_Rel)
+        self.assertEqual(4, relocations[0].r_offset)
+        self.assertEqual(('', '.text', 4),
+                self.symbols(actual)[relocations[0].r_sym])
+
+    def test_errors(self):
+        a = self.create(b'\0', [('a', 2, 0, STB.STB_GLOBAL)], [])
+        b = self.create(b'\0', [('a', 2, 0, STB.STB_GLOBAL)], [])
+        weak = self.create(b'\0', [('a', 2, 0, STB.STB_WEAK)], [])
+
+        with self.assertRaises(Exception):
+            makeelf.merge([a, b])
+        with self.assertRaises(Exception):
+            makeelf.merge([])
+        self.assertIn(('a', '.text', 4), self.symbols(makeelf.merge([weak,
+            b])))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import unittest
+from makeelf.elf import *
+
+class MemoryReportTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        elf.append_section('.data', b'\1' * 64, 0x1000)
+        elf.append_symbol('data', 2, 0, 64)
+        return elf
+
+    def test_kinds(self):
+        elf = self.create()
+
+        actual = elf.memory_report()
+
+        kinds = dict((name, kind) for _, name, kind, _ in actual['sections'])
+        self.assertEqual('owned', kinds['.data'])
+        self.assertEqual('handler', kinds['.symtab'])
+        self.assertEqual('handler', kinds['.shstrtab'])
+        self.assertEqual(actual['total'], actual['headers'] +
+                sum(actual['contents'].values()) + actual['buffers'] +
+                actual['caches'])
+
+    def test_shared_and_duplicated(self):
+        elf = self.create()
+        data = elf.Elf.sections[2]
+        elf.append_section('.copy', bytes(bytearray(data)), 0x2000)
+        elf.append_section('.same', data, 0x3000)
+
+        actual = elf.memory_report()
+
+        kinds = dict((name, kind) for _, name, kind, _ in actual['sections'])
+        self.assertEqual('owned', kinds['.copy'])
+        self.assertEqual('shared', kinds['.same'])
+        self.assertGreaterEqual(actual['duplicated'], 64)
+
+    def test_borrowed(self):
+        elf = self.create()
+        buf = bytes(4096)
+        elf.Elf.sections[2] = memoryview(buf)[:64]
+
+        actual = elf.memory_report()
+
+        self.assertEqual('borrowed', actual['sections'][2][2])
+        self.assertGreaterEqual(actual['buffers'], 4096)
+
+    def test_clone(self):
+        elf = self.create()
+        bytes(elf)
+        clone = elf.clone()
+
+        actual = clone.memory_report()
+
+        # packed header tables are not decoded by report
+        self.assertNotIn('Shdr_table', clone.Elf.__dict__)
+        self.assertEqual(elf.get_section_names(), [name for _, name, _, _ in
+            actual['sections']])
+
+    def test_empty(self):
+        elf = self.create()
+        elf.append_section('.empty1', b'', 0)
+        elf.append_section('.empty2', b'', 0)
+
+        actual = elf.memory_report()
+
+        kinds = dict((name, (kind, size)) for _, name, kind, size in
+                actual['sections'])
+        self.assertEqual(('owned', 0), kinds['.empty1'])
+        self.assertEqual(('owned', 0), kinds['.empty2'])
+
+if __name__ == '__main__':
+    unittest.main()
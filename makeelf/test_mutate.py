@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import random
+import struct
+import unittest
+from makeelf.elf import *
+from makeelf.mutate import Mutator
+
+class MutatorTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = elf.append_section('.text', b'\x90' * 16, 0x1000)
+        elf.append_segment(text_id)
+        elf.append_symbol('main', text_id, 0, 16)
+        return Mutator(elf, random.Random(0))
+
+    def test_fields(self):
+        m = self.create()
+        field, = m.find('Ehdr', 'e_shnum')
+        actual = struct.unpack_from('<H', m.seed, field.offset)[0]
+
+        elf, _ = ELF.from_bytes(m.seed)
+        self.assertEqual(elf.Elf.Ehdr.e_shnum, actual)
+        self.assertEqual(len(elf.Elf.Shdr_table), len(m.find('Shdr',
+            'sh_offset')))
+        self.assertEqual(2, len(m.find('Sym', 'st_name')))
+
+    def test_mutate(self):
+        m = self.create()
+        field, = m.find('Shdr', 'sh_offset')[1:2]
+
+        actual = m.mutate([(field, 0xdeadbeef)])
+
+        self.assertEqual(len(m.seed), len(actual))
+        self.assertEqual(0xdeadbeef, struct.unpack_from('<I', actual,
+            field.offset)[0])
+        self.assertEqual(m.seed[:field.offset], actual[:field.offset])
+        self.assertEqual(m.seed[field.offset + 4:], actual[field.offset + 4:])
+
+    def test_values(self):
+        m = self.create()
+        field, = m.find('Ehdr', 'e_shnum')
+
+        actual = m.values(field)
+
+        self.assertIn(0xffff, actual)
+        self.assertIn(len(m.find('Shdr', 'sh_name')) + 1, actual)
+        self.assertEqual(len(set(actual)), len(actual))
+
+    def test_mutants(self):
+        m = self.create()
+
+        actual = list(m.mutants(100, depth=3))
+
+        self.assertEqual(100, len(actual))
+        self.assertTrue(all(len(b) == len(m.seed) for b in actual))
+        self.assertTrue(any(b != m.seed for b in actual))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import unittest
+from makeelf.elf import *
+
+class StripTests(unittest.TestCase):
+
+    def create(self):
+        elf = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB,
+                e_type=ET.ET_REL)
+        text_id = elf.append_section('.text', b'\x90' * 16, 0)
+        debug_id = elf.append_section('.debug_info', b'\1\2\3\4', 0)
+        data_id = elf.append_section('.data', b'\0' * 8, 0)
+        elf.append_symbol(None, debug_id, 0, 0, sym_type=STT.STT_SECTION)
+        elf.append_symbol('local', text_id, 4, 4)
+        elf.append_symbol('main', text_id, 0, 16, sym_binding=STB.STB_GLOBAL)
+        elf.append_symbol('var', data_id, 0, 8, sym_binding=STB.STB_GLOBAL)
+        symtab_id = elf.get_section_names().index('.symtab')
+        # symtab_id + 1 is index of section, which will hold relocations
+        rela = [Elf64_Rela(0, (4 << 32) | 2, -4, little=True)]
+        elf._append_section('.rela.text', b''.join(bytes(r) for r in rela),
+                0, sh_type=SHT.SHT_RELA, sh_link=symtab_id, sh_info=text_id,
+                sh_addralign=8, sh_entsize=len(Elf64_Rela()))
+        debug_rela = [Elf64_Rela(0, (1 << 32) | 10, 0, little=True)]
+        elf._append_section('.rela.debug_info', b''.join(bytes(r) for r in
+            debug_rela), 0, sh_type=SHT.SHT_RELA, sh_link=symtab_id,
+            sh_info=debug_id, sh_addralign=8, sh_entsize=len(Elf64_Rela()))
+        return ELF.from_bytes(bytes(elf))[0]
+
+    def symbols(self, elf):
+        symtab_id = elf.get_section_names().index('.symtab')
+        Shdr = elf.Elf.Shdr_table[symtab_id]
+        strtab = bytes(elf.Elf.sections[Shdr.sh_link])
+        b = bytes(elf.Elf.sections[symtab_id])
+        ret = []
+        for sym in Elf64_Sym.table_from_bytes(b, 0, len(b) // 24, True):
+            end = strtab.find(b'\0', sym.st_name)
+            ret.append((strtab[sym.st_name:end].decode(), sym.st_shndx))
+        return ret
+
+    def test_strip_debug(self):
+        elf = self.create()
+        names = elf.get_section_names()
+        first_global = elf.Elf.Shdr_table[names.index('.symtab')].sh_info
+
+        actual = elf.strip()
+
+        self.assertEqual(None, actual[names.index('.debug_info')])
+        self.assertEqual(None, actual[names.index('.rela.debug_info')])
+        expected = [n for n in names if 'debug' not in n]
+        self.assertEqual(expected, elf.get_section_names())
+        self.assertEqual(expected.index('.shstrtab'),
+                elf.Elf.Ehdr.e_shstrndx)
+        text_id = expected.index('.text')
+        data_id = expected.index('.data')
+        self.assertEqual([('', 0), ('local', text_id), ('main', text_id),
+            ('var', data_id)], self.symbols(elf))
+
+        # relocation follows renumbered symbol and section
+        rela_id = expected.index('.rela.text')
+        Shdr = elf.Elf.Shdr_table[rela_id]
+        self.assertEqual(expected.index('.symtab'), Shdr.sh_link)
+        self.assertEqual(text_id, Shdr.sh_info)
+        rela, _ = Elf64_Rela.from_bytes(bytes(elf.Elf.sections[rela_id]),
+                True)
+        self.assertEqual(3, rela.r_sym)
+        # section symbol of .debug_info was local
+        self.assertEqual(first_global - 1, elf.Elf.Shdr_table[
+            expected.index('.symtab')].sh_info)
+
+        # stripped object survives serialization
+        self.assertEqual(expected, ELF.from_bytes(bytes(elf))[0]
+                .get_section_names())
+
+    def test_keep_symbols(self):
+        elf = self.create()
+
+        elf.strip(['.debug_info'], keep_symbols=['main'])
+
+        # var is used by relocation
+        self.assertEqual(['', 'main', 'var'], [name for name, _ in
+            self.symbols(elf)])
+        rela_id = elf.get_section_names().index('.rela.text')
+        rela, _ = Elf64_Rela.from_bytes(bytes(elf.Elf.sections[rela_id]),
+                True)
+        self.assertEqual(2, rela.r_sym)
+
+    def test_errors(self):
+        elf = self.create()
+
+        with self.assertRaises(Exception):
+            elf.strip(['.shstrtab'])
+        with self.assertRaises(Exception):
+            elf.strip(['.strtab'])
+        with self.assertRaises(Exception):
+            elf.strip(['.nonexistent'])
+        # var is used by relocation of .text
+        with self.assertRaises(Exception):
+            elf.strip(['.data'])
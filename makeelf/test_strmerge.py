@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import unittest
+from makeelf.elf import *
+from makeelf.strmerge import merge, split
+
+class MergeTests(unittest.TestCase):
+
+    tv_strings = ['hello', 'lo', 'hello', 'world', '', 'o', b'ld']
+
+    tv_blob = b'hello\0world\0'
+
+    tv_offsets = [0, 3, 0, 6, 11, 4, 9]
+
+    def test_merge(self):
+        actual = merge(MergeTests.tv_strings)
+
+        self.assertEqual((MergeTests.tv_blob, MergeTests.tv_offsets), actual)
+
+    def test_wide(self):
+        strings = ['abc'.encode('utf-16-le'), 'bc'.encode('utf-16-le'),
+                # not a suffix on character boundary
+                b'\0c\0']
+        with self.assertRaises(Exception):
+            merge(strings, 2)
+
+        blob, offsets = merge(strings[:2], 2)
+
+        self.assertEqual('abc\0'.encode('utf-16-le'), blob)
+        self.assertEqual([0, 2], offsets)
+
+    def test_nul(self):
+        with self.assertRaises(Exception):
+            merge(['a\0b'])
+
+    def test_split(self):
+        self.assertEqual([(0, b''), (1, b'abc'), (5, b'c')],
+                split(b'\0abc\0c\0'))
+        self.assertEqual([(0, b'a\0'), (4, b'')], split(b'a\0\0\0\0\0', 2))
+
+    def test_many(self):
+        strings = ['sym%d' % (i % 5000) for i in range(20000)] + \
+                ['m%d' % i for i in range(5000)]
+
+        blob, offsets = merge(strings)
+
+        for s, off in zip(strings, offsets):
+            self.assertEqual(bytes(s, 'utf-8') + b'\0',
+                    blob[off:off + len(s) + 1])
+        self.assertEqual(sum(len(s) + 1 for s in strings[:5000]), len(blob))
+
+class ELFMergeTests(unittest.TestCase):
+
+    def test_append_merged_strings(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+
+        sec_id, offsets = elf.append_merged_strings('.rodata.str1.1',
+                ['foo', 'barfoo', 'foo'])
+
+        self.assertEqual([3, 0, 3], offsets)
+        self.assertEqual(b'barfoo\0', elf.Elf.sections[sec_id])
+        Shdr = elf.Elf.Shdr_table[sec_id]
+        self.assertEqual(int(SHF.SHF_ALLOC) | int(SHF.SHF_MERGE) |
+                int(SHF.SHF_STRINGS), Shdr.sh_flags)
+        self.assertEqual(1, Shdr.sh_entsize)
+
+    def test_merge_strings(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        elf.append_section('.rela.text', b'', 0)
+        elf.append_section('.text', b'', 0)
+
+        remap = elf.merge_strings('.shstrtab')
+
+        self.assertEqual({0: 0, 1: 1, 11: 11, 22: 16}, remap)
+        self.assertEqual(b'\0.shstrtab\0.rela.text\0',
+                bytes(elf.Elf.sections[1]))
+        self.assertEqual(['', '.shstrtab', '.rela.text', '.text'],
+                [n for n in elf.get_section_names()])
+
+    def symbol_names(self, elf):
+        _, strtab = elf.get_section_by_name('.strtab')
+        _, symtab = elf.get_section_by_name('.symtab')
+        strtab = bytes(strtab)
+        b = bytes(symtab)
+        return [strtab[sym.st_name:strtab.find(b'\0', sym.st_name)] for sym
+                in Elf32_Sym.table_from_bytes(b, 0, len(b) // 16, True)]
+
+    def test_merge_symbol_names(self):
+        invector = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        text_id = invector.append_section('.text', b'\0' * 16, 0)
+        names = ['foo_bar', 'bar', 'foo_bar2', 'x', 'bar']
+        for name in names:
+            invector.append_symbol(name, text_id, 0, 0)
+        parsed, _ = ELF.from_bytes(bytes(invector))
+
+        for elf in [invector, parsed]:
+            old_len = len(elf.get_section_by_name('.strtab')[1])
+            elf.merge_strings('.strtab')
+            elf, _ = ELF.from_bytes(bytes(elf))
+
+            self.assertEqual([b''] + [bytes(n, 'utf-8') for n in names],
+                    self.symbol_names(elf))
+            self.assertLess(len(elf.get_section_by_name('.strtab')[1]),
+                    old_len)
+
+    def test_merge_dynamic_strings(self):
+        elf = ELF(e_data=ELFDATA.ELFDATA2LSB)
+        str_id = elf.append_special_section('.strtab')
+        elf._append_section('.dynamic', b'\0' * 16, 0,
+                sh_type=SHT.SHT_DYNAMIC, sh_link=str_id)
+
+        with self.assertRaises(Exception):
+            elf.merge_strings('.strtab')
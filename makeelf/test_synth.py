@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import io
+import unittest
+import makeelf.synth
+from makeelf.elf import *
+
+class SynthTests(unittest.TestCase):
+
+    def test_deterministic(self):
+        kwargs = dict(sections=20, symbols=50, progbits=3000, segments=2,
+                seed=7)
+
+        expected = bytes(makeelf.synth.generate(**kwargs))
+
+        self.assertEqual(expected, bytes(makeelf.synth.generate(**kwargs)))
+        self.assertNotEqual(expected, bytes(makeelf.synth.generate(
+            sections=20, symbols=50, progbits=3000, segments=2, seed=8)))
+
+    def test_structure(self):
+        elf = makeelf.synth.generate(sections=300, symbols=10, progbits=100,
+                segments=3, little=False, e_class=ELFCLASS.ELFCLASS64)
+
+        actual, _ = ELF.from_bytes(bytes(elf))
+
+        self.assertFalse(actual.little)
+        self.assertEqual(64, actual.Elf.bits)
+        names = actual.get_section_names()
+        self.assertIn('.sect299', names)
+        self.assertIn('.data', names)
+        self.assertEqual(4, len(actual.Elf.Phdr_table))
+        _, symtab = actual.get_section_by_name('.symtab')
+        self.assertEqual(11 * 24, len(symtab))
+        nobits = [i for i, Shdr in enumerate(elf.Elf.Shdr_table) if
+                Shdr.sh_type == SHT.SHT_NOBITS]
+        self.assertGreater(len(nobits), 0)
+        for i in nobits:
+            self.assertEqual(b'', elf.Elf.sections[i])
+            self.assertGreater(elf.Elf.Shdr_table[i].sh_size, 0)
+
+    def test_write(self):
+        elf = makeelf.synth.generate(sections=5, symbols=5, progbits=3 *
+                makeelf.synth.CHUNK // 2)
+        expected = bytes(elf)
+        fp = io.BytesIO()
+
+        actual = makeelf.synth.write(fp, sections=5, symbols=5, progbits=3 *
+                makeelf.synth.CHUNK // 2)
+
+        self.assertEqual(len(expected), actual)
+        self.assertEqual(expected, fp.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
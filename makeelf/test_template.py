@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import io
+import unittest
+from makeelf.elf import *
+
+class TemplateTests(unittest.TestCase):
+
+    def create(self, e_type=ET.ET_EXEC):
+        elf = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB,
+                e_type=e_type)
+        # symbol values of relocatable objects are offsets in section
+        addr = 0x1000 if e_type == ET.ET_EXEC else 0
+        data_id = elf.append_section('.data', b'\0' * 8 + b'SERIAL00' +
+                b'\xff' * 16, addr)
+        elf.append_symbol('serial', data_id, addr + 8, 8)
+        elf.append_symbol('key', data_id, addr + 0x10, 16)
+        return elf
+
+    def test_render(self):
+        elf = self.create()
+        t = elf.template()
+        t.header('entry', 'e_entry')
+        t.header('data_addr', 'sh_addr', '.data')
+        t.symbol('key_addr', 'key')
+        t.data('serial', 'serial')
+        t.data('key', 'key', offset=4, size=8)
+
+        b = t.render({'entry': 0x401000, 'data_addr': 0x2000,
+            'key_addr': 0x1234, 'serial': 'SN42', 'key': b'\1' * 8})
+
+        actual, _ = ELF.from_bytes(b)
+        data_id = actual.get_section_names().index('.data')
+        symtab_id = actual.get_section_names().index('.symtab')
+        self.assertEqual(0x401000, actual.Elf.Ehdr.e_entry)
+        self.assertEqual(0x2000, actual.Elf.Shdr_table[data_id].sh_addr)
+        self.assertEqual(b'\0' * 8 + b'SN42\0\0\0\0' + b'\xff' * 4 +
+                b'\1' * 8 + b'\xff' * 4, actual.Elf.sections[data_id])
+        syms = Elf64_Sym.table_from_bytes(actual.Elf.sections[symtab_id], 0,
+                3, True)
+        self.assertEqual(0x1234, syms[2].st_value)
+        # fields not given keep base values
+        self.assertEqual(bytes(elf), t.render({}))
+
+    def test_render_file(self):
+        t = self.create(ET.ET_REL).template()
+        t.data('serial', 'serial')
+        expected = t.render({'serial': b'12345678'})
+        fp = io.BytesIO()
+
+        self.assertEqual(len(expected), t.render({'serial': b'12345678'}, fp))
+
+        self.assertEqual(expected, fp.getvalue())
+        self.assertIn(b'12345678', expected)
+
+    def test_base(self):
+        b = bytes(self.create()) + b'trailer'
+        elf, _ = ELF.from_bytes(b)
+        t = elf.template(b)
+        t.data('serial', 'serial')
+
+        actual = t.render({'serial': 'SN42'})
+
+        self.assertEqual(b.replace(b'SERIAL00', b'SN42\0\0\0\0'), actual)
+
+    def test_base_mismatch(self):
+        elf = self.create()
+        b = bytes(elf)
+        data_id = elf.get_section_names().index('.data')
+
+        with self.assertRaises(Exception):
+            elf.template(b'\0' + b[1:])
+        elf.Elf.Shdr_table[data_id].sh_offset += 16
+        with self.assertRaises(Exception):
+            elf.template(b)
+
+    def test_unterminated_name(self):
+        elf = self.create(ET.ET_REL)
+        strtab_id = elf.get_section_names().index('.strtab')
+        # last name loses its terminator
+        elf.Elf.sections[strtab_id] = bytes(elf.Elf.sections[strtab_id])[:-1]
+        t = elf.template()
+
+        t.data('key', 'key')
+
+        self.assertIn('key', t.fields)
+
+    def test_errors(self):
+        t = self.create().template()
+        t.data('serial', 'serial')
+        t.header('shnum', 'e_shnum')
+
+        with self.assertRaises(Exception):
+            t.data('overlap', section='.data', offset=12, size=8)
+        with self.assertRaises(Exception):
+            t.data('missing', 'missing')
+        with self.assertRaises(Exception):
+            t.render({'serial': b'123456789'})
+        with self.assertRaises(Exception):
+            t.render({'shnum': 1 << 16})
+        with self.assertRaises(Exception):
+            t.render({'unknown': 0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import io
+import json
+import unittest
+import makeelf.synth
+import makeelf.trace
+from makeelf.elf import *
+from makeelf.trace import Recorder
+
+class TraceTests(unittest.TestCase):
+
+    def test_phases(self):
+        elf = makeelf.synth.generate(sections=10, symbols=10, segments=1)
+
+        with Recorder() as rec:
+            b = bytes(elf)
+            ELF.from_bytes(b)
+
+        actual = rec.summary()
+        self.assertEqual(['serialize.layout', 'serialize.encode',
+            'serialize.emit', 'parse.Ehdr', 'parse.Phdr_table',
+            'parse.Shdr_table', 'parse.sections', 'parse.handlers'],
+            list(actual))
+        self.assertEqual(len(b), actual['serialize.emit'][2])
+        self.assertEqual(len(elf.Elf.Shdr_table),
+                actual['parse.Shdr_table'][3])
+
+    def test_handlers(self):
+        elf = ELF(e_class=ELFCLASS.ELFCLASS64, e_data=ELFDATA.ELFDATA2LSB)
+        elf.append_section('.debug_info', b'\1' * 256, 0)
+        elf.append_section('.debug_str', b'\2' * 256, 0)
+        elf.compress_sections(['.debug_info', '.debug_str'])
+        b = bytes(elf)
+
+        with Recorder() as rec:
+            actual, _ = ELF.from_bytes(b)
+
+        handlers = [e for e in rec.events if e.name == 'parse.handlers']
+        self.assertEqual(1, len(handlers))
+        self.assertEqual(2, handlers[0].objects)
+        names = actual.get_section_names()
+        self.assertEqual(sum(actual.Elf.Shdr_table[names.index(name)].sh_size
+            for name in ['.debug_info', '.debug_str']), handlers[0].nbytes)
+
+    def test_disabled(self):
+        rec = Recorder()
+        with rec:
+            pass
+
+        bytes(makeelf.synth.generate())
+
+        self.assertEqual((), makeelf.trace.hooks)
+        self.assertEqual([], rec.events)
+
+    def test_chrome_trace(self):
+        with Recorder() as rec:
+            bytes(makeelf.synth.generate())
+        fp = io.StringIO()
+
+        rec.save(fp)
+
+        actual = json.loads(fp.getvalue())['traceEvents']
+        self.assertEqual(3, len(actual))
+        self.assertEqual('X', actual[0]['ph'])
+        self.assertEqual('serialize', actual[0]['cat'])
+
+if __name__ == '__main__':
+    unittest.main()
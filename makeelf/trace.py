@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+## \file trace.py
+#  \brief Timing of parsing and serialization phases
+#  \details Instrumented code checks whether any hook is registered before
+#  reading the clock, so when tracing is disabled it costs a single truth test
+#  per phase. Every finished phase is passed to all registered hooks
+import json
+import os
+import threading
+from collections import namedtuple
+from time import perf_counter
+
+## \class Event
+#  \brief Single finished phase
+#  \details name is name of phase, e.g. 'parse.Shdr_table', start is value of
+#  time.perf_counter() at its beginning, duration is its wall time in seconds,
+#  nbytes is number of bytes read or produced, objects is number of objects
+#  created and thread is identifier of thread that executed it
+Event = namedtuple('Event', ['name', 'start', 'duration', 'nbytes', 'objects',
+    'thread'])
+
+## Registered hooks
+#  \details Tuple is replaced instead of modified, so it can be iterated without
+#  locking. Instrumented code tests it before reading the clock. Use
+#  \link add_hook \endlink and \link remove_hook \endlink to modify it
+hooks = ()
+_lock = threading.Lock()
+
+
+def add_hook(hook):
+    """Registers function called with Event after every finished phase"""
+    global hooks
+    with _lock:
+        hooks = hooks + (hook,)
+
+
+def remove_hook(hook):
+    """Unregisters hook added with add_hook"""
+    global hooks
+    with _lock:
+        remaining = list(hooks)
+        remaining.remove(hook)
+        hooks = tuple(remaining)
+
+
+def enabled():
+    """Returns True if any hook is registered"""
+    return len(hooks) > 0
+
+
+def emit(name, start, nbytes=0, objects=0):
+    """Reports phase, that started at start, which is perf_counter() value"""
+    event = Event(name, start, perf_counter() - start, nbytes, objects,
+            threading.get_ident())
+    for hook in hooks:
+        hook(event)
+
+
+class Recorder:
+    """Hook collecting events, usable as context manager
+
+    Collected events can be summarized or exported in Chrome trace format,
+    readable by chrome://tracing and Perfetto"""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_hook(self)
+
+    def summary(self):
+        """Returns dict mapping phase name to tuple of number of occurrences,
+        total duration, bytes and objects"""
+        ret = {}
+        for e in self.events:
+            count, duration, nbytes, objects = ret.get(e.name, (0, 0, 0, 0))
+            ret[e.name] = (count + 1, duration + e.duration, nbytes + e.nbytes,
+                    objects + e.objects)
+        return ret
+
+    def chrome_trace(self):
+        """Returns events as Chrome trace object, ready for json.dump"""
+        pid = os.getpid()
+        return {'traceEvents': [{
+            'name': e.name,
+            'cat': e.name.split('.')[0],
+            'ph': 'X',
+            'ts': e.start * 1e6,
+            'dur': e.duration * 1e6,
+            'pid': pid,
+            'tid': e.thread,
+            'args': {'bytes': e.nbytes, 'objects': e.objects},
+            } for e in self.events], 'displayTimeUnit': 'ms'}
+
+    def save(self, fp):
+        """Writes Chrome trace JSON to text file object fp"""
+        json.dump(self.chrome_trace(), fp)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+## \file record.py
+#  \brief Table-driven codecs for fixed-size ELF records
+import struct
+
+## Struct format characters of ELF data types for each file class
+#  \details Xword and Sxword fields are only present in 64-bit structures, in
+#  32-bit ones the same fields are of Word and Sword types respectively
+TYPES = {
+        32: {'uchar': 'B', 'Half': 'H', 'Word': 'I', 'Sword': 'i',
+            'Addr': 'I', 'Off': 'I', 'Xword': 'I', 'Sxword': 'i'},
+        64: {'uchar': 'B', 'Half': 'H', 'Word': 'I', 'Sword': 'i',
+            'Addr': 'Q', 'Off': 'Q', 'Xword': 'Q', 'Sxword': 'q'},
+        }
+
+
+## \class Layout
+#  \brief Field layout of single ELF record type
+#  \details Describes fields of record in a way independent of ELF class, so
+#  the same table serves both 32-bit and 64-bit variant of structure.
+#  Precompiled struct.Struct objects are created once per class and endianness
+#  and reused for every record of that type
+class Layout:
+
+    ##
+    # \brief The constructor
+    #
+    # \param fields List of (name, type) tuples, in order of 32-bit structure
+    # \param order64 Field names in order of 64-bit structure, if different
+    def __init__(self, fields, order64=None):
+        ## Tuple of (name, type) tuples
+        self.fields = tuple(fields)
+        names32 = tuple(name for name, _ in self.fields)
+        if order64 is None:
+            order64 = names32
+        if sorted(order64) != sorted(names32):
+            raise Exception('64-bit field order does not match field list')
+        self._names = {32: names32, 64: tuple(order64)}
+        self._types = dict(self.fields)
+        self._codecs = {}
+
+    ## Get field names in order they are serialized
+    #  \param bits Class of ELF file, either 32 or 64
+    #  \returns tuple of field names
+    def names(self, bits=32):
+        return self._names[bits]
+
+    ## Get precompiled codec for given ELF class and endianness
+    #  \param bits Class of ELF file, either 32 or 64
+    #  \param little True if little-endian codec is requested
+    #  \returns instance of struct.Struct
+    def codec(self, bits=32, little=False):
+        key = (bits, bool(little))
+        codec = self._codecs.get(key)
+        if codec is None:
+            fmt = '<' if little else '>'
+            for name in self._names[bits]:
+                fmt += TYPES[bits][self._types[name]]
+            codec = struct.Struct(fmt)
+            self._codecs[key] = codec
+        return codec
+
+    ## Get offset and struct format of field inside record
+    #  \param name Name of the field
+    #  \param bits Class of ELF file, either 32 or 64
+    #  \returns tuple of offset in bytes and format character
+    def field(self, name, bits=32):
+        off = 0
+        for n in self._names[bits]:
+            fmt = TYPES[bits][self._types[n]]
+            if n == name:
+                return off, fmt
+            off += struct.calcsize('<' + fmt)
+        raise Exception('No field %s in layout' % name)
+
+    ## Size of record
+    #  \param bits Class of ELF file, either 32 or 64
+    #  \returns size of serialized record in bytes
+    def size(self, bits=32):
+        return self.codec(bits).size
+
+
+## \class Record
+#  \brief Base for fixed-size ELF records
+#  \details Classes deriving from this one have to set layout to an instance of
+#  \link Layout \endlink and bits to class of ELF file. Every field named in
+#  layout has to be stored as attribute convertible to int
+class Record:
+
+    ## Class of ELF file record belongs to
+    bits = 32
+
+    ## Instance of \link Layout \endlink describing record fields
+    layout = None
+
+    def _values(self):
+        return [int(getattr(self, name)) for name in
+                self.layout.names(self.bits)]
+
+    def __bytes__(self):
+        codec = self.layout.codec(self.bits, self.little)
+        return codec.pack(*self._values())
+
+    def __len__(self):
+        return self.layout.codec(self.bits).size
+
+    @classmethod
+    def _from_values(cls, values, little=False):
+        kwargs = dict(zip(cls.layout.names(cls.bits), values))
+        return cls(little=little, **kwargs)
+
+    ##
+    # \brief Deserialization of object
+    #
+    # \param b bytes object with serialized data on the beginning
+    # \param little endianness of data
+    #
+    # \return tuple of deserialized object and rest of bytes
+    @classmethod
+    def from_bytes(cls, b, little=False):
+        codec = cls.layout.codec(cls.bits, little)
+        return cls._from_values(codec.unpack_from(b), little), b[codec.size:]
+
+    ##
+    # \brief Deserialization of table of records
+    # \details Decodes records directly from buffer, without slicing it
+    #
+    # \param b bytes-like object containing table
+    # \param offset offset of first record in b
+    # \param count number of records in table
+    # \param little endianness of data
+    # \param entsize distance between records, defaults to size of record
+    #
+    # \return list of deserialized objects
+    @classmethod
+    def table_from_bytes(cls, b, offset, count, little=False, entsize=None):
+        codec = cls.layout.codec(cls.bits, little)
+        if not entsize:
+            entsize = codec.size
+        unpack_from = codec.unpack_from
+        from_values = cls._from_values
+        return [from_values(unpack_from(b, offset + i * entsize), little)
+                for i in range(count)]
@@ -19,6 +19,9 @@ class uint24:
     def __str__(self):
         return "%d" % self.integer
 
+    def __int__(self):
+        return int(self.integer)
+
     def __len__(self):
         return len(bytes(self))
 
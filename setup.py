@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
-from distutils.core import setup
+from setuptools import setup
 
 setup(
         name = 'makeelf',
-        packages = ['makeelf', 'makeelf.type'],
+        packages = ['makeelf', 'makeelf.type', 'makeelf.bench'],
         version = '0.3.5',
         description = 'ELF reader-writer library',
         url = 'https://github.com/v3l0c1r4pt0r/makeelf',
         author = 'v3l0c1r4pt0r',
         author_email = 'v3l0c1r4pt0r@gmail.com',
+        python_requires = '>=3.7',
+        entry_points = {
+            'console_scripts': ['makeelf = makeelf.cli:main'],
+            },
         classifiers = [
             'Programming Language :: Python',
             'Programming Language :: Python :: 3',